@@ -23,7 +23,7 @@ fileConfig(config.config_file_name)
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from app.db.database import Base
-from app.models import user, task  # Importar los modelos para que Alembic los detecte
+from app.models import user, task, task_stats, task_tombstone, idempotency_key  # Importar los modelos para que Alembic los detecte
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
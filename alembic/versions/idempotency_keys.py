@@ -0,0 +1,43 @@
+"""idempotency keys
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Respuestas guardadas por Idempotency-Key (IDEMPOTENCY_BACKEND=database); las
+    # filas sin status_code son peticiones todavía en curso
+    op.create_table(
+        'idempotency_keys',
+        sa.Column(
+            'user_id',
+            UUID(as_uuid=True),
+            sa.ForeignKey('users.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('key', sa.String(255), primary_key=True),
+        sa.Column('fingerprint', sa.String(64), nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('headers', sa.Text(), nullable=True),
+        sa.Column('body', sa.LargeBinary(), nullable=True),
+        sa.Column('locked_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_idempotency_keys_expires_at', 'idempotency_keys', ['expires_at'])
+
+
+def downgrade():
+    op.drop_table('idempotency_keys')
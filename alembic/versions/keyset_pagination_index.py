@@ -0,0 +1,31 @@
+"""keyset pagination index
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Índice compuesto para la paginación por cursor (user_id, created_at, id)
+    op.create_index(
+        'ix_tasks_user_id_created_at_id', 'tasks', ['user_id', 'created_at', 'id']
+    )
+    
+    # El índice compuesto cubre las búsquedas por user_id
+    op.drop_index('ix_tasks_user_id', table_name='tasks')
+
+
+def downgrade():
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id'])
+    op.drop_index('ix_tasks_user_id_created_at_id', table_name='tasks')
@@ -0,0 +1,60 @@
+"""task change versions and tombstones
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versión de cambios por tarea y último valor asignado por usuario; las
+    # tareas existentes quedan en la versión 0, que la sincronización completa incluye
+    op.add_column(
+        'tasks',
+        sa.Column('change_version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.add_column(
+        'task_stats',
+        sa.Column('change_version', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_index(
+        'ix_tasks_user_id_change_version_id', 'tasks', ['user_id', 'change_version', 'id']
+    )
+    
+    # Tareas eliminadas que el feed de cambios debe informar
+    op.create_table(
+        'task_tombstones',
+        sa.Column('task_id', UUID(as_uuid=True), primary_key=True),
+        sa.Column(
+            'user_id',
+            UUID(as_uuid=True),
+            sa.ForeignKey('users.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column('change_version', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(
+        'ix_task_tombstones_user_id_change_version_task_id',
+        'task_tombstones',
+        ['user_id', 'change_version', 'task_id'],
+    )
+    op.create_index('ix_task_tombstones_deleted_at', 'task_tombstones', ['deleted_at'])
+
+
+def downgrade():
+    op.drop_table('task_tombstones')
+    op.drop_index('ix_tasks_user_id_change_version_id', table_name='tasks')
+    op.drop_column('task_stats', 'change_version')
+    op.drop_column('tasks', 'change_version')
@@ -0,0 +1,48 @@
+"""task list filter indexes
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Ordenación por updated_at / title y filtro updated_since
+    op.create_index(
+        'ix_tasks_user_id_updated_at_id', 'tasks', ['user_id', 'updated_at', 'id']
+    )
+    op.create_index(
+        'ix_tasks_user_id_title_id', 'tasks', ['user_id', 'title', 'id']
+    )
+    
+    # Filtro is_completed con la ordenación por defecto (created_at, id)
+    op.create_index(
+        'ix_tasks_user_id_is_completed_created_at_id',
+        'tasks',
+        ['user_id', 'is_completed', 'created_at', 'id'],
+    )
+    
+    # Índice parcial de las tareas pendientes por fecha de modificación
+    op.create_index(
+        'ix_tasks_pending_user_id_updated_at_id',
+        'tasks',
+        ['user_id', 'updated_at', 'id'],
+        postgresql_where=sa.text('is_completed = false'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tasks_pending_user_id_updated_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_is_completed_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_title_id', table_name='tasks')
+    op.drop_index('ix_tasks_user_id_updated_at_id', table_name='tasks')
@@ -0,0 +1,48 @@
+"""task stats counters
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Contadores de tareas por usuario
+    op.create_table(
+        'task_stats',
+        sa.Column(
+            'user_id',
+            UUID(as_uuid=True),
+            sa.ForeignKey('users.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed', sa.Integer(), nullable=False, server_default='0'),
+    )
+    
+    # Rellenar los contadores con las tareas existentes
+    op.execute(
+        """
+        INSERT INTO task_stats (user_id, total, completed)
+        SELECT users.id,
+               count(tasks.id),
+               coalesce(sum(CASE WHEN tasks.is_completed THEN 1 ELSE 0 END), 0)
+        FROM users LEFT OUTER JOIN tasks ON tasks.user_id = users.id
+        GROUP BY users.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table('task_stats')
@@ -3,11 +3,13 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.deps import authenticate_user
-from app.core.security import create_access_token, get_password_hash
+from app.core.ratelimit import rate_limit
+from app.core.security import create_access_token, password_hasher, token_verifier
 from app.db.database import get_db
 from app.models.user import User
 from app.schemas.user import Token, UserCreate, UserResponse
@@ -15,13 +17,18 @@ from app.schemas.user import Token, UserCreate, UserResponse
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register"))],
+)
+async def register_user(user_in: UserCreate, db: AsyncSession = Depends(get_db)) -> Any:
     """
     Registra un nuevo usuario.
     """
     # Verificar si el email ya está registrado
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = await db.scalar(select(User).where(User.email == user_in.email))
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -29,34 +36,34 @@ def register_user(user_in: UserCreate, db: Session = Depends(get_db)) -> Any:
         )
     
     # Verificar si el username ya está registrado
-    user = db.query(User).filter(User.username == user_in.username).first()
+    user = await db.scalar(select(User).where(User.username == user_in.username))
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="El nombre de usuario ya está registrado",
         )
     
-    # Crear el usuario
+    # Crear el usuario (bcrypt se ejecuta en el pool de procesos dedicado)
     user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await password_hasher.hash(user_in.password),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
 
-@router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit("login"))])
+async def login_for_access_token(
+    db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     Obtiene un token de acceso para un usuario.
     """
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,3 +78,12 @@ def login_for_access_token(
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get("/jwks")
+async def read_jwks() -> Any:
+    """
+    Clave pública de verificación de los tokens (JWKS), para que otros servicios
+    los verifiquen sin el secreto. Vacía si se firma con un algoritmo simétrico.
+    """
+    return token_verifier.jwks()
@@ -0,0 +1,33 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core.config import settings
+from app.core.deps import require_static_token
+from app.db.database import get_pool_status
+
+router = APIRouter(
+    prefix="/internal",
+    tags=["internal"],
+    dependencies=[Depends(require_static_token("INTERNAL_ENDPOINTS_TOKEN"))],
+)
+
+
+@router.get("/pool", include_in_schema=False)
+async def read_pool_status() -> Dict[str, Any]:
+    """
+    Informa del estado en vivo de los pools de conexiones de este proceso:
+    conexiones en uso, inactivas y de overflow, y el tiempo de espera acumulado.
+    Sirve para dimensionar el pool de cada worker.
+    """
+    return {
+        "config": {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE,
+            "pool_pre_ping": settings.DB_POOL_PRE_PING,
+            "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS,
+        },
+        "engines": get_pool_status(),
+    }
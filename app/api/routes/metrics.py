@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.core.deps import require_static_token
+from app.core.metrics import registry
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(require_static_token("METRICS_TOKEN"))],
+)
+async def read_metrics() -> PlainTextResponse:
+    """
+    Exporta las métricas del proceso en el formato de texto de Prometheus.
+    """
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
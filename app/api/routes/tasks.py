@@ -1,70 +1,762 @@
-from typing import Any, List
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    any_,
+    bindparam,
+    delete,
+    false,
+    insert,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_current_user
+from app.core.config import settings
+from app.core.deps import get_current_user, get_read_db, open_read_session
+from app.core.etag import etag_matches, not_modified, weak_etag
+from app.core.events import get_task_event_broker, record_task_event, task_event_stream
+from app.core.idempotency import idempotent
+from app.core.importer import (
+    LineTooLongError,
+    iter_csv_records,
+    iter_file,
+    iter_lines,
+    iter_ndjson_records,
+    spool_body,
+    validation_message,
+)
+from app.core.pagination import (
+    InvalidCursorError,
+    decode_cursor,
+    decode_sync_token,
+    encode_cursor,
+    encode_sync_token,
+)
+from app.core.ratelimit import rate_limit
+from app.core.serialization import (
+    TASK_RESPONSE_COLUMNS,
+    task_changes_response,
+    task_rows_csv,
+    task_rows_ndjson,
+    task_rows_response,
+)
+from app.db.bulk import bulk_insert_tasks
 from app.db.database import get_db
+from app.db.task_stats import adjust_task_stats, completion_delta, next_change_version
+from app.db.tombstones import add_task_tombstones
 from app.models.task import Task
+from app.models.task_stats import TaskStats
+from app.models.task_tombstone import TaskTombstone
 from app.models.user import User
-from app.schemas.task import TaskCreate, TaskResponse, TaskUpdate
+from app.schemas.task import (
+    TaskBatchCreate,
+    TaskBatchDelete,
+    TaskBatchResponse,
+    TaskBatchResult,
+    TaskBatchUpdate,
+    TaskChangesResponse,
+    TaskCreate,
+    TaskFileFormat,
+    TaskImportResult,
+    TaskResponse,
+    TaskSort,
+    TaskStatsResponse,
+    TaskUpdate,
+)
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# Tipo de contenido de cada formato de exportación/importación
+TASK_FILE_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
 
-@router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-def create_task(
+# Columnas por las que se puede ordenar el listado
+TASK_SORT_COLUMNS = {
+    "created_at": Task.created_at,
+    "updated_at": Task.updated_at,
+    "title": Task.title,
+}
+
+
+def _check_batch_size(size: int) -> None:
+    """Rechaza los lotes que superan el máximo configurado."""
+    if size > settings.TASK_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El lote supera el máximo de {settings.TASK_BATCH_MAX_SIZE} operaciones",
+        )
+
+
+def _task_id_in(db: AsyncSession, ids: List[UUID]) -> Any:
+    """
+    Condición ``Task.id IN ids``.
+    
+    En PostgreSQL se emite como ``id = ANY(:ids)`` con un único parámetro de tipo
+    array, de modo que la sentencia no cambia con el tamaño del lote.
+    """
+    if db.bind.dialect.name == "postgresql":
+        ids_param = bindparam(None, ids, type_=ARRAY(PG_UUID(as_uuid=True)))
+        return Task.id == any_(ids_param)
+    return Task.id.in_(ids)
+
+
+async def _raise_task_not_accessible(
+    db: AsyncSession, task_id: UUID, forbidden_detail: str
+) -> None:
+    """
+    Se llama cuando una sentencia acotada al usuario no afectó ninguna fila:
+    comprueba si la tarea existe para responder 404 o 403.
+    """
+    if await db.scalar(select(Task.id).where(Task.id == task_id)) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Tarea no encontrada",
+        )
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=forbidden_detail,
+    )
+
+
+def _as_naive_utc(value: datetime) -> datetime:
+    """Las fechas se guardan en UTC sin zona horaria; normaliza los filtros."""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def _task_list_version(db: AsyncSession, user_id: UUID) -> Any:
+    """
+    Versión barata de las tareas de un usuario, leída de su fila de
+    ``task_stats``: número de tareas y última versión de cambios, que cualquier
+    alta, modificación o baja incrementa.
+    """
+    version = (
+        await db.execute(
+            select(TaskStats.total, TaskStats.change_version).where(
+                TaskStats.user_id == user_id
+            )
+        )
+    ).first()
+    return version if version is not None else (0, 0)
+
+
+@router.post(
+    "",
+    response_model=TaskResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+@idempotent
+async def create_task(
     task_in: TaskCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Crea una nueva tarea para el usuario autenticado.
     """
     task = Task(
+        id=uuid.uuid4(),
         title=task_in.title,
         description=task_in.description,
         user_id=current_user.id,
+        change_version=await next_change_version(db, current_user.id),
     )
     db.add(task)
-    db.commit()
-    db.refresh(task)
+    await adjust_task_stats(db, current_user.id, total=1)
+    record_task_event(db, current_user.id, "created", [task.id], task.change_version)
+    await db.commit()
+    await db.refresh(task)
     
     return task
 
 
 @router.get("", response_model=List[TaskResponse])
-def read_tasks(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+async def read_tasks(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    is_completed: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_since: Optional[datetime] = None,
+    sort: TaskSort = "created_at",
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Obtiene todas las tareas del usuario autenticado.
+    
+    Las tareas se pueden filtrar por ``is_completed``, por rango de creación
+    (``created_after``/``created_before``) y por ``updated_since``, y ordenar con
+    ``sort`` por ``created_at``, ``updated_at`` o ``title`` (``-`` delante para
+    orden descendente). Cada combinación se resuelve con un índice por usuario.
+    
+    Si se envía ``cursor`` (vacío para la primera página) se pagina por cursor
+    sobre ``(sort, id)`` y el cursor de la página siguiente se devuelve en la
+    cabecera ``X-Next-Cursor``. Sin ``cursor`` se mantiene la paginación por
+    ``skip``/``limit``.
+    
+    La respuesta lleva un ETag débil derivado de la versión de las tareas del
+    usuario y de los parámetros de la página; si coincide con ``If-None-Match``
+    se responde 304 sin leer ni serializar las tareas.
+    
+    Se seleccionan filas planas (sin objetos ORM) y se serializan con orjson.
     """
-    tasks = (
-        db.query(Task)
-        .filter(Task.user_id == current_user.id)
-        .offset(skip)
-        .limit(limit)
-        .all()
+    total, change_version = await _task_list_version(db, current_user.id)
+    etag = weak_etag(
+        current_user.id, total, change_version, skip, limit, cursor,
+        is_completed, created_after, created_before, updated_since, sort,
     )
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    filters = [Task.user_id == current_user.id]
+    if is_completed is not None:
+        # Literal en lugar de parámetro para que se pueda usar el índice parcial
+        filters.append(Task.is_completed == (true() if is_completed else false()))
+    if created_after is not None:
+        filters.append(Task.created_at > _as_naive_utc(created_after))
+    if created_before is not None:
+        filters.append(Task.created_at < _as_naive_utc(created_before))
+    if updated_since is not None:
+        filters.append(Task.updated_at >= _as_naive_utc(updated_since))
+    
+    sort_key = sort.lstrip("-")
+    descending = sort.startswith("-")
+    sort_column = TASK_SORT_COLUMNS[sort_key]
+    order_by = (sort_column.desc(), Task.id.desc()) if descending else (sort_column, Task.id)
+    query = select(*TASK_RESPONSE_COLUMNS).where(*filters).order_by(*order_by)
+    
+    if cursor is None:
+        rows = (await db.execute(query.offset(skip).limit(limit))).all()
+        return task_rows_response(rows, headers={"ETag": etag})
+    
+    if cursor:
+        try:
+            value, task_id = decode_cursor(
+                cursor, sort, parse=str if sort_key == "title" else datetime.fromisoformat
+            )
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor de paginación inválido",
+            )
+        position = tuple_(sort_column, Task.id)
+        query = query.where(
+            position < (value, task_id) if descending else position > (value, task_id)
+        )
+    
+    # Se pide una fila extra para saber si existe una página siguiente
+    rows = (await db.execute(query.limit(limit + 1))).all()
+    headers = {"ETag": etag}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        headers["X-Next-Cursor"] = encode_cursor(getattr(last, sort_key), last.id, sort)
     
-    return tasks
+    return task_rows_response(rows, headers=headers)
+
+
+@router.post(
+    "/batch",
+    response_model=TaskBatchResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+@idempotent
+async def create_tasks_batch(
+    batch_in: TaskBatchCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Crea varias tareas en una sola transacción con un INSERT multifila.
+    """
+    _check_batch_size(len(batch_in.items))
+    version = await next_change_version(db, current_user.id)
+    rows = [
+        {
+            "title": item.title,
+            "description": item.description,
+            "user_id": current_user.id,
+            "change_version": version,
+        }
+        for item in batch_in.items
+    ]
+    tasks = await db.scalars(
+        insert(Task).returning(Task, sort_by_parameter_order=True), rows
+    )
+    results = [
+        TaskBatchResult(
+            id=task.id,
+            status="created",
+            task=TaskResponse.model_validate(task, from_attributes=True),
+        )
+        for task in tasks
+    ]
+    await adjust_task_stats(db, current_user.id, total=len(results))
+    record_task_event(db, current_user.id, "created", [result.id for result in results], version)
+    await db.commit()
+    
+    return {"results": results}
+
+
+@router.patch(
+    "/batch",
+    response_model=TaskBatchResponse,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+@idempotent
+async def update_tasks_batch(
+    batch_in: TaskBatchUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Actualiza varias tareas del usuario autenticado en una sola transacción.
+    
+    Las actualizaciones con los mismos valores se agrupan en un único
+    ``UPDATE ... WHERE id = ANY(...) AND user_id = ...``. Las tareas que no
+    existen o pertenecen a otro usuario se devuelven como ``not_found``.
+    """
+    _check_batch_size(len(batch_in.items))
+    groups: Dict[tuple, List[UUID]] = {}
+    for item in batch_in.items:
+        update_data = item.dict(exclude_unset=True, exclude={"id"})
+        groups.setdefault(tuple(sorted(update_data.items())), []).append(item.id)
+    
+    updated: Dict[UUID, TaskResponse] = {}
+    version = await next_change_version(db, current_user.id)
+    completed_delta = 0
+    for update_data, ids in groups.items():
+        owned = (_task_id_in(db, ids), Task.user_id == current_user.id)
+        values = dict(update_data)
+        if "is_completed" in values:
+            completed_delta += await completion_delta(db, owned, bool(values["is_completed"]))
+        if update_data:
+            stmt = (
+                update(Task)
+                .where(*owned)
+                .values({**values, "change_version": version})
+                .returning(Task)
+                .execution_options(populate_existing=True)
+            )
+        else:
+            stmt = select(Task).where(*owned)
+        for task in await db.scalars(stmt):
+            updated[task.id] = TaskResponse.model_validate(task, from_attributes=True)
+    await adjust_task_stats(db, current_user.id, completed=completed_delta)
+    if updated:
+        record_task_event(db, current_user.id, "updated", list(updated), version)
+    await db.commit()
+    
+    results = [
+        TaskBatchResult(id=item.id, status="updated", task=updated[item.id])
+        if item.id in updated
+        else TaskBatchResult(id=item.id, status="not_found")
+        for item in batch_in.items
+    ]
+    return {"results": results}
+
+
+@router.delete(
+    "/batch",
+    response_model=TaskBatchResponse,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+@idempotent
+async def delete_tasks_batch(
+    batch_in: TaskBatchDelete,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Elimina varias tareas del usuario autenticado con un único DELETE.
+    """
+    _check_batch_size(len(batch_in.ids))
+    version = await next_change_version(db, current_user.id)
+    stmt = (
+        delete(Task)
+        .where(_task_id_in(db, batch_in.ids), Task.user_id == current_user.id)
+        .returning(Task.id, Task.is_completed)
+    )
+    rows = (await db.execute(stmt)).all()
+    deleted = {row.id for row in rows}
+    await add_task_tombstones(db, current_user.id, [row.id for row in rows], version)
+    if rows:
+        record_task_event(db, current_user.id, "deleted", [row.id for row in rows], version)
+    await adjust_task_stats(
+        db,
+        current_user.id,
+        total=-len(rows),
+        completed=-sum(1 for row in rows if row.is_completed),
+    )
+    await db.commit()
+    
+    results = [
+        TaskBatchResult(id=task_id, status="deleted" if task_id in deleted else "not_found")
+        for task_id in batch_in.ids
+    ]
+    return {"results": results}
+
+
+@router.get("/stats", response_model=TaskStatsResponse)
+async def read_task_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Devuelve el total de tareas del usuario y cuántas están completadas o
+    pendientes, leyendo una sola fila de ``task_stats``.
+    """
+    stats = (
+        await db.execute(
+            select(TaskStats.total, TaskStats.completed).where(
+                TaskStats.user_id == current_user.id
+            )
+        )
+    ).first()
+    total, completed = stats if stats is not None else (0, 0)
+    return {"total": total, "completed": completed, "pending": total - completed}
+
+
+@router.get("/changes", response_model=TaskChangesResponse)
+async def read_task_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Devuelve las tareas creadas o modificadas y los ids de las eliminadas desde
+    el token ``since``, junto con el token para la siguiente llamada.
+    
+    Sin ``since`` se devuelven todas las tareas (sincronización completa). Los
+    cambios se recorren por ``(change_version, id)`` con índices por usuario; si
+    hay más de ``limit``, ``has_more`` es true y ``next_token`` continúa donde se
+    cortó. Un token más antiguo que ``TASK_TOMBSTONE_RETENTION_DAYS`` responde
+    410, porque los tombstones que necesita pueden estar ya compactados.
+    """
+    # Se fija antes de leer la versión: los tombstones posteriores a la versión
+    # leída son siempre más recientes que este instante
+    now = int(time.time())
+    position = None
+    issued_at = now
+    if since:
+        try:
+            version, task_id, issued_at = decode_sync_token(since)
+        except InvalidCursorError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Token de sincronización inválido",
+            )
+        if issued_at < now - settings.TASK_TOMBSTONE_RETENTION_DAYS * 86400:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="El token de sincronización ha caducado; sincroniza de nuevo sin since",
+            )
+        position = (version, task_id)
+    
+    # Cota superior de la página: los cambios confirmados después quedan para
+    # la siguiente llamada
+    current_version = await db.scalar(
+        select(TaskStats.change_version).where(TaskStats.user_id == current_user.id)
+    ) or 0
+    
+    def after(version_column: Any, id_column: Any) -> List[Any]:
+        conditions = [version_column <= current_version]
+        if position is not None:
+            version, task_id = position
+            if task_id is None:
+                conditions.append(version_column > version)
+            else:
+                conditions.append(tuple_(version_column, id_column) > (version, task_id))
+        return conditions
+    
+    # Se pide una fila extra de cada tabla para saber si hay más cambios
+    changes = [
+        (row.change_version, row.id, row)
+        for row in await db.execute(
+            select(*TASK_RESPONSE_COLUMNS, Task.change_version)
+            .where(Task.user_id == current_user.id, *after(Task.change_version, Task.id))
+            .order_by(Task.change_version, Task.id)
+            .limit(limit + 1)
+        )
+    ]
+    if position is not None:
+        changes += [
+            (row.change_version, row.task_id, None)
+            for row in await db.execute(
+                select(TaskTombstone.task_id, TaskTombstone.change_version)
+                .where(
+                    TaskTombstone.user_id == current_user.id,
+                    *after(TaskTombstone.change_version, TaskTombstone.task_id),
+                )
+                .order_by(TaskTombstone.change_version, TaskTombstone.task_id)
+                .limit(limit + 1)
+            )
+        ]
+    changes.sort(key=lambda change: change[:2])
+    
+    has_more = len(changes) > limit
+    if has_more:
+        changes = changes[:limit]
+        last_version, last_id, _ = changes[-1]
+        next_token = encode_sync_token(last_version, last_id, issued_at)
+    elif position is not None and current_version < position[0]:
+        # Una réplica atrasada está por detrás del token recibido
+        next_token = since
+    else:
+        next_token = encode_sync_token(current_version, None, now)
+    
+    return task_changes_response(
+        [row for _, _, row in changes if row is not None],
+        [task_id for _, task_id, row in changes if row is None],
+        next_token,
+        has_more,
+    )
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def task_events(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Canal Server-Sent Events con las altas (``created``), modificaciones
+    (``updated``) y bajas (``deleted``) de las tareas del usuario autenticado.
+    
+    Cada evento lleva los ``ids`` afectados (``null`` en importaciones) y la
+    ``change_version`` de la escritura. ``resync`` indica que se perdieron
+    eventos y el cliente debe ponerse al día con ``GET /api/tasks/changes``.
+    
+    La conexión no retiene la sesión de base de datos: tras autenticar se
+    libera, y cada cliente inactivo solo ocupa una cola acotada en memoria.
+    """
+    await db.close()
+    broker = get_task_event_broker()
+    subscription = broker.subscribe(current_user.id)
+    return StreamingResponse(
+        task_event_stream(broker, subscription, settings.TASK_EVENTS_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _stream_export(
+    request: Request, query: Any, encode: Callable[[List[Any]], bytes], header: bytes = b""
+) -> AsyncIterator[bytes]:
+    """
+    Abre su propia sesión, serializa cada tanda del cursor en cuanto llega y
+    cierra el cursor y la sesión al final.
+    """
+    if header:
+        yield header
+    async with open_read_session(request) as db:
+        result = await db.stream(query)
+        try:
+            async for rows in result.partitions():
+                yield encode(rows)
+        finally:
+            await result.close()
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_tasks(
+    request: Request,
+    export_format: TaskFileFormat = Query("ndjson", alias="format"),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Exporta todas las tareas del usuario autenticado en NDJSON o CSV.
+    
+    Las filas se leen con un cursor del servidor en tandas de
+    ``TASK_EXPORT_BATCH_SIZE`` y cada tanda se envía en cuanto llega, de modo
+    que la memoria no crece con el número de tareas. En CSV, los textos que
+    empiezan por ``=``, ``+``, ``-``, ``@`` o ``'`` se prefijan con ``'`` para
+    que una hoja de cálculo no los evalúe como fórmulas.
+    """
+    query = (
+        select(*TASK_RESPONSE_COLUMNS)
+        .where(Task.user_id == current_user.id)
+        .order_by(Task.created_at, Task.id)
+        .execution_options(yield_per=settings.TASK_EXPORT_BATCH_SIZE)
+    )
+    # El cursor se abre dentro del generador, con una sesión propia que vive
+    # mientras se transmite el cuerpo
+    if export_format == "csv":
+        body = _stream_export(
+            request, query, task_rows_csv, header=task_rows_csv([], header=True)
+        )
+    else:
+        body = _stream_export(request, query, task_rows_ndjson)
+    
+    return StreamingResponse(
+        body,
+        media_type=TASK_FILE_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format}"'},
+    )
+
+
+async def _insert_import_batch(
+    db: AsyncSession, user_id: UUID, batch: List[Dict[str, Any]], version: Optional[int]
+) -> int:
+    """
+    Carga un lote de la importación con la versión de cambios de la transacción.
+    
+    La versión (y el bloqueo de la fila de ``task_stats`` que conlleva) se pide
+    con el primer lote, antes de escribir ninguna tarea.
+    
+    Returns:
+        La versión de cambios con la que se han marcado las tareas.
+    """
+    if version is None:
+        version = await next_change_version(db, user_id)
+    for row in batch:
+        row["change_version"] = version
+    await bulk_insert_tasks(db, batch)
+    return version
+
+
+@router.post(
+    "/import",
+    response_model=TaskImportResult,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+async def import_tasks(
+    request: Request,
+    import_format: TaskFileFormat = Query("ndjson", alias="format"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+) -> Any:
+    """
+    Importa tareas desde un cuerpo NDJSON o CSV (con cabecera).
+    
+    El cuerpo se recibe primero en un fichero temporal (en memoria hasta
+    ``TASK_IMPORT_SPOOL_MEMORY_BYTES``), de modo que una subida lenta no ocupa
+    una conexión ni bloquea las escrituras del usuario. Después se lee por
+    trozos y cada fila se valida con ``TaskCreate``; las filas válidas se cargan
+    en lotes de ``TASK_IMPORT_BATCH_SIZE`` (COPY en PostgreSQL) y se confirman
+    en una sola transacción, con la versión de cambios que se asigna al cargar
+    el primer lote. Las filas inválidas se omiten y se informan con su número de
+    línea (hasta ``TASK_IMPORT_MAX_ERRORS``). Una línea de más de
+    ``TASK_IMPORT_MAX_LINE_BYTES`` cancela la importación con 413.
+    """
+    start_time = time.perf_counter()
+    max_line_bytes = settings.TASK_IMPORT_MAX_LINE_BYTES
+    body = await spool_body(request.stream(), settings.TASK_IMPORT_SPOOL_MEMORY_BYTES)
+    lines = iter_lines(iter_file(body), max_line_bytes)
+    records = (
+        iter_csv_records(lines, max_line_bytes)
+        if import_format == "csv"
+        else iter_ndjson_records(lines)
+    )
+    
+    version = None
+    imported = 0
+    failed = 0
+    errors = []
+    batch = []
+    try:
+        async for line, data, error in records:
+            if error is None:
+                try:
+                    item = TaskCreate.model_validate(data)
+                except ValidationError as e:
+                    error = validation_message(e)
+            if error is not None:
+                failed += 1
+                if len(errors) < settings.TASK_IMPORT_MAX_ERRORS:
+                    errors.append({"line": line, "detail": error})
+                continue
+            
+            now = datetime.utcnow()
+            batch.append({
+                "id": uuid.uuid4(),
+                "title": item.title,
+                "description": item.description,
+                "is_completed": False,
+                "created_at": now,
+                "updated_at": now,
+                "user_id": current_user.id,
+            })
+            if len(batch) >= settings.TASK_IMPORT_BATCH_SIZE:
+                version = await _insert_import_batch(db, current_user.id, batch, version)
+                imported += len(batch)
+                batch = []
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El cuerpo debe estar codificado en UTF-8",
+        )
+    except LineTooLongError:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Las líneas no pueden superar {max_line_bytes} bytes",
+        )
+    finally:
+        await body.close()
+    
+    if batch:
+        version = await _insert_import_batch(db, current_user.id, batch, version)
+        imported += len(batch)
+    await adjust_task_stats(db, current_user.id, total=imported)
+    if imported:
+        # Demasiadas tareas para enumerarlas: el cliente consulta /changes
+        record_task_event(db, current_user.id, "created", None, version)
+    await db.commit()
+    
+    seconds = time.perf_counter() - start_time
+    return {
+        "imported": imported,
+        "failed": failed,
+        "errors": errors,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(imported / seconds, 1) if seconds > 0 else 0.0,
+    }
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
-def read_task(
+async def read_task(
     task_id: UUID,
-    db: Session = Depends(get_db),
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Obtiene una tarea específica por su ID.
+    
+    La respuesta lleva un ETag débil derivado de ``updated_at``; si coincide con
+    ``If-None-Match`` se responde 304 sin cargar ni serializar la tarea.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
+    if if_none_match:
+        version = (
+            await db.execute(
+                select(Task.user_id, Task.updated_at).where(Task.id == task_id)
+            )
+        ).first()
+        if version is not None and version.user_id == current_user.id:
+            etag = weak_etag(task_id, version.updated_at)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag)
+    
+    task = await db.scalar(select(Task).where(Task.id == task_id))
     if not task:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -78,68 +770,95 @@ def read_task(
             detail="No tienes permiso para acceder a esta tarea",
         )
     
+    response.headers["ETag"] = weak_etag(task.id, task.updated_at)
     return task
 
 
-@router.put("/{task_id}", response_model=TaskResponse)
-def update_task(
+@router.put(
+    "/{task_id}",
+    response_model=TaskResponse,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+@idempotent
+async def update_task(
     task_id: UUID,
     task_in: TaskUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> Any:
     """
     Actualiza una tarea específica por su ID.
+    
+    La actualización y la verificación de pertenencia se hacen en un único
+    ``UPDATE ... WHERE id = :id AND user_id = :uid RETURNING``.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Tarea no encontrada",
+    owned = (Task.id == task_id, Task.user_id == current_user.id)
+    update_data = task_in.dict(exclude_unset=True)
+    if update_data:
+        update_data["change_version"] = await next_change_version(db, current_user.id)
+    if "is_completed" in update_data:
+        # Solo las transiciones de is_completed cambian los contadores
+        await adjust_task_stats(
+            db,
+            current_user.id,
+            completed=await completion_delta(db, owned, bool(update_data["is_completed"])),
         )
-    
-    # Verificar que la tarea pertenezca al usuario autenticado
-    if task.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para actualizar esta tarea",
+    if update_data:
+        stmt = (
+            update(Task)
+            .where(*owned)
+            .values(update_data)
+            .returning(Task)
+            .execution_options(populate_existing=True)
         )
+    else:
+        stmt = select(Task).where(*owned)
     
-    # Actualizar los campos de la tarea
-    update_data = task_in.dict(exclude_unset=True)
-    for field, value in update_data.items():
-        setattr(task, field, value)
+    task = await db.scalar(stmt)
+    if task is None:
+        await _raise_task_not_accessible(
+            db, task_id, "No tienes permiso para actualizar esta tarea"
+        )
+    if update_data:
+        record_task_event(db, current_user.id, "updated", [task.id], task.change_version)
     
-    db.commit()
-    db.refresh(task)
+    await db.commit()
     
     return task
 
 
-@router.delete("/{task_id}", status_code=status.HTTP_200_OK)
-def delete_task(
+@router.delete(
+    "/{task_id}",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(rate_limit("task_write"))],
+)
+@idempotent
+async def delete_task(
     task_id: UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ) -> dict:
     """
-    Elimina una tarea específica por su ID.
+    Elimina una tarea específica por su ID con un único
+    ``DELETE ... WHERE id = :id AND user_id = :uid RETURNING id``.
     """
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Tarea no encontrada",
-        )
-    
-    # Verificar que la tarea pertenezca al usuario autenticado
-    if task.user_id != current_user.id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tienes permiso para eliminar esta tarea",
+    version = await next_change_version(db, current_user.id)
+    stmt = (
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == current_user.id)
+        .returning(Task.id, Task.is_completed)
+    )
+    deleted = (await db.execute(stmt)).first()
+    if deleted is None:
+        await _raise_task_not_accessible(
+            db, task_id, "No tienes permiso para eliminar esta tarea"
         )
     
-    db.delete(task)
-    db.commit()
+    await add_task_tombstones(db, current_user.id, [deleted.id], version)
+    record_task_event(db, current_user.id, "deleted", [deleted.id], version)
+    await adjust_task_stats(
+        db, current_user.id, total=-1, completed=-1 if deleted.is_completed else 0
+    )
+    await db.commit()
     
     return {"message": "Tarea eliminada satisfactoriamente"}
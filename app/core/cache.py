@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """
+    Caché en memoria acotada, con expiración por TTL y desalojo LRU.
+    
+    Es segura entre hilos y lleva contadores de aciertos y fallos para poder
+    medir su efecto.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Devuelve el valor asociado a la clave o None si no existe o expiró."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Guarda un valor; ``ttl`` permite acortar la vida de esta entrada."""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Elimina la entrada asociada a la clave, si existe."""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Vacía la caché y reinicia los contadores."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self) -> Dict[str, int]:
+        """Devuelve los contadores de uso de la caché."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,5 +1,5 @@
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import PostgresDsn, validator
 from pydantic_settings import BaseSettings
@@ -13,9 +13,129 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Claves PEM para algoritmos asimétricos (RS256, ES256...): con la privada se
+    # firman los tokens; con solo la pública el servicio únicamente los verifica
+    JWT_PRIVATE_KEY: Optional[str] = None
+    JWT_PUBLIC_KEY: Optional[str] = None
+    # Verificaciones de tokens en caché (cada una vive hasta el exp del token)
+    TOKEN_CACHE_SIZE: int = 10000
+    
+    # Servidor de producción (python -m app.server): SERVER_WORKERS procesos (None
+    # usa uno por CPU). Al parar, cada worker deja de aceptar conexiones y espera
+    # a las peticiones en curso hasta SERVER_GRACEFUL_SHUTDOWN_SECONDS
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: Optional[int] = None
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_BACKLOG: int = 2048
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    
+    # Pool de procesos para bcrypt (None usa un proceso por CPU, repartidas entre
+    # los workers de app.server; 0 usa el threadpool) y número máximo de hashes
+    # en espera antes de responder 503
+    PASSWORD_HASH_WORKERS: Optional[int] = None
+    PASSWORD_HASH_QUEUE_SIZE: int = 32
+    
+    # Caché de usuarios autenticados (0 la desactiva)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
     
     # Database
     DATABASE_URL: PostgresDsn
+    # Usa el driver asíncrono (asyncpg); con False las rutas usan el driver
+    # síncrono en el threadpool
+    DATABASE_ASYNC: bool = True
+    
+    # Pool de conexiones de cada proceso. DB_POOL_RECYCLE en segundos (-1 no
+    # recicla); DB_POOL_PRE_PING descarta conexiones caídas tras un failover
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # statement_timeout de PostgreSQL en milisegundos (0 lo desactiva)
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+    
+    # Conexiones máximas a la base de datos entre todos los workers de app.server
+    # (None no limita): cada worker recibe como mucho DB_MAX_CONNECTIONS / workers
+    # y reduce DB_POOL_SIZE y DB_MAX_OVERFLOW para no superarlo
+    DB_MAX_CONNECTIONS: Optional[int] = None
+    
+    # Réplicas de lectura (vacío: todo va al primario). Tras escribir, un usuario
+    # lee del primario durante DATABASE_REPLICA_PIN_SECONDS; una réplica que
+    # falla sale de la rotación durante DATABASE_REPLICA_RETRY_SECONDS
+    DATABASE_REPLICA_URLS: List[str] = []
+    DATABASE_REPLICA_PIN_SECONDS: float = 5.0
+    DATABASE_REPLICA_RETRY_SECONDS: float = 30.0
+    
+    # Endpoints internos de diagnóstico (/internal/...): desactivados por defecto.
+    # Con INTERNAL_ENDPOINTS_TOKEN exigen la cabecera "Authorization: Bearer <token>"
+    INTERNAL_ENDPOINTS_ENABLED: bool = False
+    INTERNAL_ENDPOINTS_TOKEN: Optional[str] = None
+    
+    # Número máximo de operaciones por petición en los endpoints batch
+    TASK_BATCH_MAX_SIZE: int = 500
+    # Filas que la exportación lee del cursor del servidor en cada tanda
+    TASK_EXPORT_BATCH_SIZE: int = 1000
+    # Filas por lote en la importación y máximo de errores por fila que se devuelven
+    TASK_IMPORT_BATCH_SIZE: int = 5000
+    TASK_IMPORT_MAX_ERRORS: int = 100
+    # Bytes máximos de una línea (o registro CSV) de la importación; por encima, 413
+    TASK_IMPORT_MAX_LINE_BYTES: int = 1024 * 1024
+    # Bytes del cuerpo de la importación que se guardan en memoria antes de pasar
+    # a un fichero temporal en disco
+    TASK_IMPORT_SPOOL_MEMORY_BYTES: int = 1024 * 1024
+    # Días que se conservan los tombstones de tareas eliminadas; los tokens del
+    # feed de cambios más antiguos caducan y el cliente debe sincronizar de cero
+    TASK_TOMBSTONE_RETENTION_DAYS: int = 30
+    
+    # Eventos en tiempo real (GET /api/tasks/events): "memory" para un solo
+    # worker o "postgres" (LISTEN/NOTIFY) para varios. Cada conexión tiene una
+    # cola de TASK_EVENTS_QUEUE_SIZE eventos; al llenarse el cliente recibe resync
+    TASK_EVENTS_BACKEND: str = "memory"
+    TASK_EVENTS_CHANNEL: str = "task_events"
+    TASK_EVENTS_QUEUE_SIZE: int = 100
+    TASK_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+    TASK_EVENTS_RECONNECT_SECONDS: float = 5.0
+    
+    # Límites de peticiones (token bucket "<clave>:<n>/<periodo>", claves ip,
+    # user o email). "memory" cuenta por worker; "redis" comparte los buckets
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMITS: Dict[str, List[str]] = {
+        "login": ["ip:60/minute", "email:10/minute"],
+        "register": ["ip:10/minute"],
+        "task_write": ["user:600/minute"],
+    }
+    
+    # Idempotency-Key en las escrituras de tareas: "memory" guarda las respuestas
+    # en cada worker (como mucho IDEMPOTENCY_MAX_KEYS) y "database" en la tabla
+    # idempotency_keys. Un duplicado espera a la petición original hasta
+    # IDEMPOTENCY_WAIT_SECONDS; una reserva más antigua que IDEMPOTENCY_LOCK_SECONDS
+    # se considera abandonada
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL_SECONDS: int = 86400
+    IDEMPOTENCY_WAIT_SECONDS: float = 10.0
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+    IDEMPOTENCY_MAX_KEYS: int = 10000
+    
+    # Cabecera X-Query-Count con las sentencias SQL de cada petición (depuración)
+    QUERY_COUNT_HEADER: bool = False
+    
+    # Logging: nivel y fracción de respuestas correctas (< 400) que se registran
+    LOG_LEVEL: str = "INFO"
+    LOG_SUCCESS_SAMPLE_RATE: float = 1.0
+    
+    # Esquema OpenAPI serializado al construir la imagen (python -m app.core.openapi);
+    # sin fichero válido se genera en la primera petición a /docs
+    OPENAPI_SCHEMA_PATH: Optional[str] = None
+    
+    # Métricas en formato Prometheus (/metrics): desactivadas por defecto. Con
+    # METRICS_TOKEN, /metrics exige la cabecera "Authorization: Bearer <token>"
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: Optional[str] = None
     
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
@@ -1,23 +1,197 @@
-from typing import Generator, Optional
+import hmac
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, List, Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
 
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.security import verify_password
+from app.core.metrics import registry, sample_lines
+from app.core.security import password_hasher, token_verifier
 from app.db.database import get_db
+from app.db.replicas import ReplicaReadSession, get_replica_set
 from app.models.user import User
-from app.schemas.user import TokenData
 
 # Configuración de OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
+# Variante opcional: get_read_db solo la usa para enrutar, no para autenticar
+optional_oauth2_scheme = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/auth/login", auto_error=False
+)
 
+# Caché de usuarios activos autenticados, indexada por id de usuario
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
+
+@registry.register_collector
+def _principal_cache_metrics() -> List[str]:
+    """Exporta los contadores de la caché de usuarios autenticados."""
+    stats = principal_cache.stats()
+    lines = sample_lines(
+        "auth_principal_cache_size", "Usuarios en caché.", "gauge", [({}, stats["size"])]
+    )
+    for key in ("hits", "misses", "evictions"):
+        lines += sample_lines(
+            f"auth_principal_cache_{key}_total",
+            f"Caché de usuarios autenticados: {key}.",
+            "counter",
+            [({}, stats[key])],
+        )
+    return lines
+
+
+@registry.register_collector
+def _token_cache_metrics() -> List[str]:
+    """Exporta los contadores de la caché de tokens verificados."""
+    stats = token_verifier.cache.stats()
+    lines = sample_lines(
+        "auth_token_cache_size", "Tokens verificados en caché.", "gauge", [({}, stats["size"])]
+    )
+    for key in ("hits", "misses", "evictions"):
+        lines += sample_lines(
+            f"auth_token_cache_{key}_total",
+            f"Caché de tokens verificados: {key}.",
+            "counter",
+            [({}, stats[key])],
+        )
+    return lines
+
+
+def invalidate_principal(user_id: UUID) -> None:
+    """
+    Elimina un usuario de la caché de autenticación.
+    
+    Los cambios hechos a través del ORM se invalidan solos; esta función es
+    para los cambios que no pasan por él (p. ej. un UPDATE masivo).
+    """
+    principal_cache.invalidate(user_id)
+
+
+def _snapshot(user: User) -> User:
+    """Crea una copia del usuario desvinculada de la sesión para guardarla en caché."""
+    return User(
+        id=user.id,
+        email=user.email,
+        username=user.username,
+        is_active=user.is_active,
+        created_at=user.created_at,
+        updated_at=user.updated_at,
+    )
+
+
+@event.listens_for(User, "after_update")
+def _track_principal_changes(mapper, connection, target: User) -> None:
+    """Anota los usuarios desactivados o con contraseña nueva en la sesión."""
+    state = inspect(target)
+    if not (
+        state.attrs.is_active.history.has_changes()
+        or state.attrs.hashed_password.history.has_changes()
+    ):
+        return
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_principals", set()).add(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _track_principal_deletes(mapper, connection, target: User) -> None:
+    """Anota los usuarios eliminados en la sesión."""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_principals", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session: Session) -> None:
+    """Invalida en caché los usuarios modificados una vez confirmado el cambio."""
+    for user_id in session.info.pop("invalidated_principals", ()):
+        invalidate_principal(user_id)
+
+
+def _replica_pin_key(token: Optional[str]) -> Optional[str]:
+    """
+    Identifica al usuario del token sin verificar la firma. Solo decide si la
+    lectura va al primario; la autenticación la hace ``get_current_user``.
+    """
+    if not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+async def get_read_db(
+    db: AsyncSession = Depends(get_db),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Obtiene una sesión de solo lectura.
+    
+    Con ``DATABASE_REPLICA_URLS`` configurado, las lecturas se reparten entre
+    las réplicas sanas; si no hay ninguna disponible, o el usuario escribió
+    hace menos de ``DATABASE_REPLICA_PIN_SECONDS``, se usa el primario. Si la
+    réplica elegida no responde, la lectura se repite en el primario.
+    
+    Args:
+        db: Sesión del primario de esta petición.
+        token: Token JWT, si lo hay.
+        
+    Returns:
+        La sesión con la que leer.
+    """
+    pin_key = _replica_pin_key(token)
+    if pin_key is not None:
+        # Si esta petición escribe en el primario, el commit fija al usuario
+        db.info["replica_pin_key"] = pin_key
+    
+    async with _replica_or_primary(db, pin_key) as read_db:
+        yield read_db
+
+
+@asynccontextmanager
+async def _replica_or_primary(db: AsyncSession, pin_key: Optional[str]) -> AsyncIterator[Any]:
+    """Sesión de una réplica sana con recuperación en ``db``, o ``db`` si no hay ninguna."""
+    replica_set = get_replica_set()
+    replica = replica_set.choose(pin_key) if replica_set is not None else None
+    if replica is None:
+        yield db
+        return
+    
+    async with replica.session() as read_db:
+        yield ReplicaReadSession(replica_set, replica, read_db, primary=db)
+
+
+@asynccontextmanager
+async def open_read_session(request: Request) -> AsyncIterator[Any]:
+    """
+    Abre una sesión de lectura fuera de las dependencias de la ruta, con el
+    mismo reparto entre réplicas que ``get_read_db``.
+    
+    Es para los generadores de ``StreamingResponse``: según la versión de
+    FastAPI, las dependencias con ``yield`` se cierran antes o después de
+    enviar el cuerpo, así que el generador no puede usar su sesión. Se respetan
+    los ``dependency_overrides`` de ``get_db`` (tests y benchmarks).
+    """
+    provider = request.app.dependency_overrides.get(get_db, get_db)
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    pin_key = _replica_pin_key(token if scheme.lower() == "bearer" else None)
+    async with asynccontextmanager(provider)() as db:
+        async with _replica_or_primary(db, pin_key) as read_db:
+            yield read_db
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_read_db), token: str = Depends(oauth2_scheme)
 ) -> User:
     """
     Obtiene el usuario actual a partir del token JWT.
@@ -39,19 +213,25 @@ def get_current_user(
     )
     
     try:
-        # Decodificar el token
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        if user_id is None:
+        # Verificar el token (las verificaciones correctas se sirven de caché)
+        subject = token_verifier.verify(token).get("sub")
+        if subject is None:
             raise credentials_exception
-        token_data = TokenData(user_id=UUID(user_id))
-    except JWTError:
+        user_id = UUID(subject)
+    except (JWTError, ValueError):
         raise credentials_exception
     
+    # Los usuarios activos se sirven desde la caché sin consultar la base de datos
+    cached_user = principal_cache.get(user_id)
+    if cached_user is not None:
+        return cached_user
+    
     # Buscar el usuario en la base de datos
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    query = select(User).where(User.id == user_id)
+    user = await db.scalar(query)
+    if user is None and isinstance(db, ReplicaReadSession):
+        # Un usuario recién registrado puede no haber llegado aún a la réplica
+        user = await db.primary.scalar(query)
     if user is None:
         raise credentials_exception
     if not user.is_active:
@@ -60,10 +240,13 @@ def get_current_user(
             detail="Usuario inactivo",
         )
     
+    principal_cache.set(user.id, _snapshot(user))
     return user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def authenticate_user(
+    db: AsyncSession, email: str, password: str
+) -> Optional[User]:
     """
     Autentica a un usuario por email y contraseña.
     
@@ -75,9 +258,33 @@ def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
     Returns:
         El usuario autenticado o None si las credenciales son inválidas.
     """
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    # bcrypt es costoso en CPU: se ejecuta en el pool de procesos dedicado
+    if not await password_hasher.verify(password, user.hashed_password):
         return None
     return user
+
+
+def require_static_token(setting: str) -> Callable[[Request], Awaitable[None]]:
+    """
+    Dependencia para endpoints de operación (métricas, diagnóstico): si
+    ``settings.<setting>`` tiene un token, exige ``Authorization: Bearer <token>``.
+    
+    Raises:
+        HTTPException: 401 si el token falta o no coincide.
+    """
+    async def check_static_token(request: Request) -> None:
+        expected = getattr(settings, setting)
+        if not expected:
+            return
+        scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), expected.encode()):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    
+    return check_static_token
@@ -0,0 +1,36 @@
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response, status
+
+
+def weak_etag(*parts: Any) -> str:
+    """
+    Construye un ETag débil a partir de los valores que identifican la versión
+    de un recurso.
+    """
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return f'W/"{hashlib.blake2b(raw.encode(), digest_size=8).hexdigest()}"'
+
+
+def _opaque_tag(etag: str) -> str:
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indica si la cabecera ``If-None-Match`` coincide con ``etag`` usando la
+    comparación débil (RFC 9110), que ignora el prefijo ``W/``.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    expected = _opaque_tag(etag)
+    return any(_opaque_tag(tag) == expected for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo para un recurso que el cliente ya tiene."""
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
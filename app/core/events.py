@@ -0,0 +1,335 @@
+"""
+Eventos en tiempo real de cambios en las tareas.
+
+Las rutas registran los eventos en la sesión con ``record_task_event`` y solo se
+publican si la transacción se confirma. El broker los reparte entre las
+suscripciones del usuario (``GET /api/tasks/events``):
+
+- ``memory``: en el propio proceso; basta con un único worker.
+- ``postgres``: ``pg_notify`` dentro de la transacción y una conexión
+  ``LISTEN`` por worker, de modo que todos los workers reciben los eventos.
+
+Cada suscripción tiene una cola acotada: si un cliente lento la llena, se
+descartan sus eventos pendientes y recibe un evento ``resync`` para que se
+ponga al día con ``GET /api/tasks/changes``.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+from uuid import UUID
+
+import orjson
+from sqlalchemy import event, func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import registry, sample_lines
+
+logger = logging.getLogger(__name__)
+
+# Eventos que no vienen de una escritura
+RESYNC_EVENT = {"type": "resync"}
+_CLOSED = object()
+
+# Ids por notificación; el payload de NOTIFY está limitado a 8000 bytes
+NOTIFY_IDS_PER_MESSAGE = 100
+
+
+class SubscriptionClosed(Exception):
+    """El broker se detuvo y la suscripción ya no recibirá eventos."""
+
+
+class Subscription:
+    """Conexión de un cliente suscrito a los eventos de un usuario."""
+    
+    def __init__(self, user_id: UUID, queue_size: int):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[Any]" = asyncio.Queue(queue_size)
+        self.overflowed = False
+    
+    def put(self, task_event: Any) -> None:
+        """Encola un evento sin bloquear; si la cola está llena, marca el desbordamiento."""
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(task_event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+    
+    def _drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+    
+    def close(self) -> None:
+        self._drain()
+        self.overflowed = False
+        self.queue.put_nowait(_CLOSED)
+    
+    async def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Espera el siguiente evento.
+        
+        Returns:
+            El evento, ``RESYNC_EVENT`` tras un desbordamiento o ``None`` si no
+            llegó nada en ``timeout`` segundos.
+        
+        Raises:
+            SubscriptionClosed: Si el broker se detuvo.
+        """
+        if self.overflowed:
+            self._drain()
+            self.overflowed = False
+            return RESYNC_EVENT
+        try:
+            task_event = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if task_event is _CLOSED:
+            raise SubscriptionClosed
+        return task_event
+
+
+class TaskEventBroker:
+    """Broker en proceso: entrega los eventos al confirmar la transacción."""
+    
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[UUID, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.overflows = 0
+    
+    @property
+    def connections(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+    
+    def subscribe(self, user_id: UUID) -> Subscription:
+        """Crea una suscripción; debe llamarse desde el bucle de eventos."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscribers[subscription.user_id]
+    
+    def deliver(self, user_id: UUID, task_event: Dict[str, Any]) -> None:
+        """Entrega un evento a las suscripciones locales del usuario (en el bucle)."""
+        for subscription in self._subscribers.get(user_id, ()):
+            if subscription.overflowed:
+                continue
+            subscription.put(task_event)
+            if subscription.overflowed:
+                self.overflows += 1
+    
+    def _deliver_all(self, events: Sequence[Tuple[UUID, Dict[str, Any]]]) -> None:
+        for user_id, task_event in events:
+            self.deliver(user_id, task_event)
+    
+    def before_commit(self, session: Session, events: List[Tuple[UUID, Dict[str, Any]]]) -> None:
+        """Se llama antes de confirmar una transacción con eventos pendientes."""
+    
+    def after_commit(self, events: List[Tuple[UUID, Dict[str, Any]]]) -> None:
+        """Se llama tras confirmar; puede ejecutarse en un hilo del threadpool."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._deliver_all, events)
+    
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+    
+    def close_subscriptions(self) -> None:
+        """Cierra todas las suscripciones; sus streams terminan."""
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.close()
+        self._subscribers.clear()
+    
+    async def stop(self) -> None:
+        self.close_subscriptions()
+
+
+class PostgresTaskEventBroker(TaskEventBroker):
+    """
+    Broker para varios workers sobre ``LISTEN``/``NOTIFY`` de PostgreSQL.
+    
+    ``NOTIFY`` se emite dentro de la transacción de la escritura, así que solo
+    se entrega si se confirma. Si la conexión ``LISTEN`` se pierde, se
+    reconecta y se envía ``resync`` a todas las suscripciones, porque las
+    notificaciones del intervalo se han perdido.
+    """
+    
+    def __init__(self, database_url: str, channel: str, queue_size: int):
+        super().__init__(queue_size)
+        self.dsn = make_url(database_url).set(drivername="postgresql").render_as_string(
+            hide_password=False
+        )
+        self.channel = channel
+        self._listener: Optional["asyncio.Task[None]"] = None
+    
+    def before_commit(self, session: Session, events: List[Tuple[UUID, Dict[str, Any]]]) -> None:
+        for user_id, task_event in events:
+            ids = task_event.get("ids")
+            chunks = (
+                [ids[start:start + NOTIFY_IDS_PER_MESSAGE]
+                 for start in range(0, len(ids), NOTIFY_IDS_PER_MESSAGE)]
+                if ids else [ids]
+            )
+            for chunk in chunks:
+                payload = orjson.dumps({**task_event, "ids": chunk, "user_id": user_id})
+                session.execute(select(func.pg_notify(self.channel, payload.decode())))
+    
+    def after_commit(self, events: List[Tuple[UUID, Dict[str, Any]]]) -> None:
+        # Los eventos llegan a todos los workers (este incluido) por LISTEN
+        pass
+    
+    def _on_notify(self, connection: Any, pid: int, channel: str, payload: str) -> None:
+        message = orjson.loads(payload)
+        self.deliver(UUID(message.pop("user_id")), message)
+    
+    def _resync_all(self) -> None:
+        for user_id in list(self._subscribers):
+            self.deliver(user_id, RESYNC_EVENT)
+    
+    async def _listen(self) -> None:
+        import asyncpg
+        
+        connected_before = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn)
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(f"No se pudo conectar el LISTEN de eventos: {e}")
+                await asyncio.sleep(settings.TASK_EVENTS_RECONNECT_SECONDS)
+                continue
+            
+            terminated = asyncio.Event()
+            connection.add_termination_listener(lambda _: terminated.set())
+            try:
+                await connection.add_listener(self.channel, self._on_notify)
+                if connected_before:
+                    self._resync_all()
+                connected_before = True
+                await terminated.wait()
+                logger.warning("Se perdió la conexión LISTEN de eventos; reconectando")
+            finally:
+                if not connection.is_closed():
+                    await connection.close()
+    
+    async def start(self) -> None:
+        await super().start()
+        self._listener = asyncio.create_task(self._listen())
+    
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await super().stop()
+
+
+_broker: Optional[TaskEventBroker] = None
+
+
+def get_task_event_broker() -> TaskEventBroker:
+    """Devuelve el broker configurado en ``TASK_EVENTS_BACKEND``."""
+    global _broker
+    if _broker is None:
+        if settings.TASK_EVENTS_BACKEND == "postgres":
+            _broker = PostgresTaskEventBroker(
+                str(settings.DATABASE_URL),
+                settings.TASK_EVENTS_CHANNEL,
+                settings.TASK_EVENTS_QUEUE_SIZE,
+            )
+        else:
+            _broker = TaskEventBroker(settings.TASK_EVENTS_QUEUE_SIZE)
+    return _broker
+
+
+def record_task_event(
+    db: Any,
+    user_id: UUID,
+    event_type: str,
+    ids: Optional[Sequence[UUID]],
+    change_version: int,
+) -> None:
+    """
+    Registra un evento en la transacción de la sesión; se publica al confirmarla.
+    
+    Args:
+        db: Sesión de la escritura.
+        user_id: Usuario dueño de las tareas.
+        event_type: ``created``, ``updated`` o ``deleted``.
+        ids: Tareas afectadas; ``None`` si son demasiadas para enumerarlas (el
+            cliente debe consultar ``GET /api/tasks/changes``).
+        change_version: Versión de cambios de la escritura.
+    """
+    task_event = {
+        "type": event_type,
+        "ids": [str(task_id) for task_id in ids] if ids is not None else None,
+        "change_version": change_version,
+    }
+    db.info.setdefault("task_events", []).append((user_id, task_event))
+
+
+async def task_event_stream(
+    broker: TaskEventBroker, subscription: Subscription, heartbeat: float
+) -> AsyncIterator[bytes]:
+    """
+    Emite los eventos de la suscripción en formato Server-Sent Events, con un
+    comentario cada ``heartbeat`` segundos para mantener viva la conexión.
+    """
+    try:
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                task_event = await subscription.get(heartbeat)
+            except SubscriptionClosed:
+                return
+            if task_event is None:
+                yield b": ping\n\n"
+                continue
+            data = {key: value for key, value in task_event.items() if key != "type"}
+            yield f"event: {task_event['type']}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@registry.register_collector
+def _task_event_metrics() -> List[str]:
+    """Exporta las conexiones suscritas y los desbordamientos de cola."""
+    if _broker is None:
+        return []
+    return sample_lines(
+        "task_event_connections", "Conexiones suscritas a eventos de tareas.", "gauge",
+        [({}, _broker.connections)],
+    ) + sample_lines(
+        "task_event_overflows_total", "Colas de eventos desbordadas (resync).", "counter",
+        [({}, _broker.overflows)],
+    )
+
+
+@event.listens_for(Session, "before_commit")
+def _publish_before_commit(session: Session) -> None:
+    events = session.info.get("task_events")
+    if events and _broker is not None:
+        _broker.before_commit(session, events)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_after_commit(session: Session) -> None:
+    events = session.info.pop("task_events", None)
+    if events and _broker is not None:
+        _broker.after_commit(events)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_events(session: Session) -> None:
+    session.info.pop("task_events", None)
@@ -1,3 +1,5 @@
+from typing import Dict, Optional
+
 from fastapi import HTTPException, status
 
 
@@ -8,8 +10,9 @@ class TaskListException(HTTPException):
         self,
         status_code: int,
         detail: str,
+        headers: Optional[Dict[str, str]] = None,
     ):
-        super().__init__(status_code=status_code, detail=detail)
+        super().__init__(status_code=status_code, detail=detail, headers=headers)
 
 
 class NotFoundException(TaskListException):
@@ -47,3 +50,18 @@ class BadRequestException(TaskListException):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=detail,
         )
+
+
+class ServiceUnavailableException(TaskListException):
+    """Excepción para servicios saturados temporalmente."""
+    
+    def __init__(
+        self,
+        detail: str = "Servicio no disponible temporalmente",
+        retry_after: int = 1,
+    ):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
@@ -0,0 +1,288 @@
+"""
+Soporte de la cabecera ``Idempotency-Key`` en las escrituras de tareas.
+
+La primera respuesta a una clave se guarda por usuario durante
+``IDEMPOTENCY_TTL_SECONDS`` y los reintentos la reciben tal cual (con
+``Idempotent-Replayed: true``) sin volver a ejecutar la ruta. Un duplicado que
+llega mientras la primera petición está en curso espera a que termine.
+Reutilizar la clave con otro cuerpo o en otra ruta responde 422.
+
+- ``memory``: respuestas en el proceso; cada worker tiene las suyas.
+- ``database``: tabla ``idempotency_keys`` compartida por todos los workers.
+
+Las respuestas 5xx y 429 no se guardan: el cliente puede reintentar.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from jose import JWTError
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import token_verifier
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyKeyReused(Exception):
+    """La clave ya se usó con otra petición (otro cuerpo, método o ruta)."""
+
+
+class IdempotencyKeyInProgress(Exception):
+    """La petición original sigue en curso tras esperar el máximo configurado."""
+
+
+class StoredResponse:
+    """Respuesta guardada para una clave, junto con la huella de su petición."""
+    
+    def __init__(
+        self, fingerprint: str, status_code: int, headers: List[Tuple[str, str]], body: bytes
+    ):
+        self.fingerprint = fingerprint
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+    
+    def encode_headers(self) -> str:
+        return json.dumps(self.headers)
+    
+    @staticmethod
+    def decode_headers(raw: Optional[str]) -> List[Tuple[str, str]]:
+        return [tuple(header) for header in json.loads(raw or "[]")]
+
+
+def idempotent(endpoint: Callable) -> Callable:
+    """Marca una ruta para que acepte ``Idempotency-Key``."""
+    endpoint.idempotent = True
+    return endpoint
+
+
+class MemoryIdempotencyStore:
+    """
+    Guarda las respuestas en una ``TTLCache`` del proceso; los duplicados en
+    curso esperan a un ``Future`` de la petición original.
+    """
+    
+    def __init__(self, ttl: float, max_keys: int, wait_seconds: float):
+        self.wait_seconds = wait_seconds
+        self._responses = TTLCache(maxsize=max_keys, ttl=ttl)
+        self._in_flight: Dict[Tuple[UUID, str], Tuple[str, "asyncio.Future[None]"]] = {}
+    
+    async def claim(self, user_id: UUID, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """
+        Reserva la clave para esta petición.
+        
+        Returns:
+            ``None`` si la petición debe ejecutarse, o la respuesta guardada.
+        
+        Raises:
+            IdempotencyKeyReused: Si la clave es de otra petición.
+            IdempotencyKeyInProgress: Si la original no terminó a tiempo.
+        """
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            stored = self._responses.get((user_id, key))
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused
+                return stored
+            
+            in_flight = self._in_flight.get((user_id, key))
+            if in_flight is None:
+                future = asyncio.get_running_loop().create_future()
+                self._in_flight[(user_id, key)] = (fingerprint, future)
+                return None
+            in_flight_fingerprint, future = in_flight
+            if in_flight_fingerprint != fingerprint:
+                raise IdempotencyKeyReused
+            try:
+                await asyncio.wait_for(asyncio.shield(future), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                raise IdempotencyKeyInProgress
+    
+    async def complete(self, user_id: UUID, key: str, response: StoredResponse) -> None:
+        """Guarda la respuesta y despierta a los duplicados en espera."""
+        self._responses.set((user_id, key), response)
+        self._finish(user_id, key)
+    
+    async def release(self, user_id: UUID, key: str) -> None:
+        """Libera la clave sin guardar respuesta; el siguiente duplicado se ejecuta."""
+        self._finish(user_id, key)
+    
+    def _finish(self, user_id: UUID, key: str) -> None:
+        in_flight = self._in_flight.pop((user_id, key), None)
+        if in_flight is not None and not in_flight[1].done():
+            in_flight[1].set_result(None)
+    
+    def clear(self) -> None:
+        self._responses.clear()
+        self._in_flight.clear()
+
+
+_store: Optional[Any] = None
+
+
+def get_idempotency_store() -> Any:
+    """Devuelve el almacén configurado en ``IDEMPOTENCY_BACKEND``."""
+    global _store
+    if _store is None:
+        if settings.IDEMPOTENCY_BACKEND == "database":
+            from app.db.idempotency import DatabaseIdempotencyStore
+            
+            _store = DatabaseIdempotencyStore(
+                ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+                wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+                lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+            )
+        else:
+            _store = MemoryIdempotencyStore(
+                ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+                max_keys=settings.IDEMPOTENCY_MAX_KEYS,
+                wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+            )
+    return _store
+
+
+def _token_subject(headers: Headers) -> Optional[UUID]:
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return UUID(token_verifier.verify(token)["sub"])
+    except (JWTError, KeyError, ValueError):
+        return None
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+class IdempotencyMiddleware:
+    """
+    Middleware ASGI que aplica ``Idempotency-Key`` a las rutas marcadas con
+    ``idempotent``. Sin la cabecera, sin un token válido o en otras rutas, la
+    petición pasa sin cambios (la ruta se encarga de responder 401).
+    """
+    
+    def __init__(self, app: ASGIApp, routes: Optional[Sequence[BaseRoute]] = None):
+        self.app = app
+        self.routes = routes if routes is not None else []
+    
+    def _is_idempotent(self, scope: Scope) -> bool:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(getattr(route, "endpoint", None), "idempotent", False)
+        return False
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        if key is None or not self._is_idempotent(scope):
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            response = JSONResponse(
+                {"detail": f"Idempotency-Key debe tener entre 1 y {MAX_KEY_LENGTH} caracteres"},
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+        user_id = _token_subject(headers)
+        if user_id is None:
+            await self.app(scope, receive, send)
+            return
+        
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(
+            b"\n".join([
+                scope["method"].encode(), scope["path"].encode(), scope["query_string"], body,
+            ])
+        ).hexdigest()
+        
+        store = get_idempotency_store()
+        try:
+            stored = await store.claim(user_id, key, fingerprint)
+        except IdempotencyKeyReused:
+            response = JSONResponse(
+                {"detail": "La Idempotency-Key ya se usó con otra petición"}, status_code=422
+            )
+            await response(scope, receive, send)
+            return
+        except IdempotencyKeyInProgress:
+            response = JSONResponse(
+                {"detail": "La petición original con esta Idempotency-Key sigue en curso"},
+                status_code=409,
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+        
+        if stored is not None:
+            await send({
+                "type": "http.response.start",
+                "status": stored.status_code,
+                "headers": [
+                    (name.encode("latin-1"), value.encode("latin-1"))
+                    for name, value in stored.headers
+                ] + [(b"idempotent-replayed", b"true")],
+            })
+            await send({"type": "http.response.body", "body": stored.body})
+            return
+        
+        body_sent = False
+        
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        
+        status_code = 500
+        response_headers: List[Tuple[str, str]] = []
+        response_body = []
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = [
+                    (name.decode("latin-1"), value.decode("latin-1"))
+                    for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response_body.append(message.get("body", b""))
+            await send(message)
+        
+        try:
+            await self.app(scope, replay_receive, send_wrapper)
+        except BaseException:
+            await store.release(user_id, key)
+            raise
+        
+        if status_code >= 500 or status_code == 429:
+            await store.release(user_id, key)
+        else:
+            await store.complete(
+                user_id,
+                key,
+                StoredResponse(fingerprint, status_code, response_headers, b"".join(response_body)),
+            )
@@ -0,0 +1,173 @@
+import codecs
+import csv
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from pydantic import ValidationError
+from starlette.datastructures import UploadFile
+
+from app.core.serialization import is_csv_escaped
+
+# (número de línea, datos del registro, error) de cada registro leído
+Record = Tuple[int, Optional[Any], Optional[str]]
+
+
+class LineTooLongError(ValueError):
+    """Una línea (o registro CSV) supera el máximo de bytes permitido."""
+
+
+async def spool_body(chunks: AsyncIterator[bytes], max_memory_bytes: int) -> UploadFile:
+    """
+    Copia un cuerpo recibido por trozos a un fichero temporal y lo rebobina.
+    
+    El fichero se mantiene en memoria hasta ``max_memory_bytes`` y después pasa
+    a disco, así que la memoria no crece con el cuerpo y un cliente lento no
+    retiene recursos de la base de datos mientras sube el fichero.
+    
+    Returns:
+        El fichero rebobinado; quien lo recibe debe cerrarlo.
+    """
+    body = UploadFile(SpooledTemporaryFile(max_size=max_memory_bytes))
+    try:
+        async for chunk in chunks:
+            await body.write(chunk)
+        await body.seek(0)
+    except BaseException:
+        await body.close()
+        raise
+    return body
+
+
+async def iter_file(body: UploadFile, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Lee un fichero de ``spool_body`` por trozos de ``chunk_size`` bytes."""
+    while True:
+        chunk = await body.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: Optional[int] = None
+) -> AsyncIterator[str]:
+    """
+    Divide un cuerpo recibido por trozos en líneas UTF-8 sin acumularlo entero.
+    
+    Solo se retiene la línea incompleta; cada trozo se divide una única vez.
+    
+    Args:
+        chunks: Trozos del cuerpo.
+        max_line_bytes: Longitud máxima de una línea, en bytes.
+    
+    Raises:
+        UnicodeDecodeError: Si el cuerpo no es UTF-8 válido.
+        LineTooLongError: Si una línea supera ``max_line_bytes``.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    # Trozos de la línea incompleta y su tamaño en bytes
+    pending: List[str] = []
+    pending_bytes = 0
+    
+    def check(size: int) -> None:
+        if max_line_bytes is not None and size > max_line_bytes:
+            raise LineTooLongError(f"Línea de más de {max_line_bytes} bytes")
+    
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if "\n" not in text:
+            pending.append(text)
+            pending_bytes += len(text.encode())
+            check(pending_bytes)
+            continue
+        first, *lines, rest = text.split("\n")
+        pending.append(first)
+        check(pending_bytes + len(first.encode()))
+        yield "".join(pending).rstrip("\r")
+        for line in lines:
+            check(len(line.encode()))
+            yield line.rstrip("\r")
+        pending = [rest]
+        pending_bytes = len(rest.encode())
+        check(pending_bytes)
+    pending.append(decoder.decode(b"", final=True))
+    last = "".join(pending)
+    if last:
+        yield last.rstrip("\r")
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Record]:
+    """Lee un objeto JSON por línea; las líneas vacías se ignoran."""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            yield line_number, orjson.loads(line), None
+        except orjson.JSONDecodeError:
+            yield line_number, None, "JSON inválido"
+
+
+async def iter_csv_records(
+    lines: AsyncIterator[str], max_record_bytes: Optional[int] = None
+) -> AsyncIterator[Record]:
+    """
+    Lee un CSV con cabecera y devuelve cada fila como dict. Los campos vacíos se
+    omiten para que se apliquen los valores por defecto del esquema.
+    
+    Raises:
+        LineTooLongError: Si un registro con saltos de línea entre comillas
+            supera ``max_record_bytes``.
+    """
+    header = None
+    record_lines: List[str] = []
+    record_bytes = 0
+    quotes = 0
+    record_start = 0
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not record_lines:
+            record_start = line_number
+        record_lines.append(line)
+        quotes += line.count('"')
+        # Un número impar de comillas indica un campo con saltos de línea
+        if quotes % 2:
+            record_bytes += len(line.encode()) + 1
+            if max_record_bytes is not None and record_bytes > max_record_bytes:
+                raise LineTooLongError(f"Registro de más de {max_record_bytes} bytes")
+            continue
+        record = "\n".join(record_lines)
+        record_lines = []
+        record_bytes = 0
+        quotes = 0
+        if not record.strip():
+            continue
+        
+        values = next(csv.reader([record]))
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield record_start, None, "Número de columnas incorrecto"
+            continue
+        yield record_start, {
+            key: _csv_unescape(value) for key, value in zip(header, values) if value != ""
+        }, None
+    
+    if record_lines:
+        yield record_start, None, "Campo entre comillas sin cerrar"
+
+
+def _csv_unescape(value: str) -> str:
+    """Quita el prefijo ``'`` que la exportación añade contra las fórmulas."""
+    return value[1:] if value.startswith("'") and is_csv_escaped(value) else value
+
+
+def validation_message(error: ValidationError) -> str:
+    """Resume los errores de validación de una fila en una sola línea."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'fila'}: {item['msg']}"
+        for item in error.errors()
+    )
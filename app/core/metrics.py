@@ -0,0 +1,274 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base de las métricas: nombre, ayuda, etiquetas y un lock propio."""
+    
+    type_name = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+    
+    def _header(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+    
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monótono."""
+    
+    type_name = "counter"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        lines = self._header()
+        for labels, value in items:
+            lines.append(
+                f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    """Valor que puede subir y bajar."""
+    
+    type_name = "gauge"
+    
+    def dec(self, labels: LabelValues = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """Histograma con cubetas fijas, en el formato acumulado de Prometheus."""
+    
+    type_name = "histogram"
+    
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Por cada combinación de etiquetas: conteo por cubeta (+Inf al final) y suma
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+    
+    def observe(self, labels: LabelValues, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self._values.items()
+            ]
+        lines = self._header()
+        bucket_names = self.labelnames + ("le",)
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(bucket_names, labels + (le,))} {cumulative}"
+                )
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+Collector = Callable[[], Iterable[str]]
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas en proceso que se exporta en el formato de texto de
+    Prometheus, sin depender de un colector externo.
+    """
+    
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+    
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+    
+    def register_collector(self, collector: Collector) -> Collector:
+        """Registra una función que genera líneas de métricas en cada exportación."""
+        self._collectors.append(collector)
+        return collector
+    
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def sample_lines(
+    name: str,
+    documentation: str,
+    type_name: str,
+    samples: Iterable[Tuple[Dict[str, str], float]],
+) -> List[str]:
+    """Formatea muestras calculadas en el momento de exportar (para los colectores)."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {type_name}"]
+    for labels, value in samples:
+        label_str = _format_labels(list(labels), list(labels.values()))
+        lines.append(f"{name}{label_str} {_format_value(value)}")
+    return lines
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "Solicitudes HTTP atendidas.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Duración de las solicitudes HTTP.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge(
+        "http_requests_in_flight",
+        "Solicitudes HTTP en curso.",
+        ("method", "route"),
+    )
+)
+db_queries = registry.register(
+    Counter("db_queries_total", "Sentencias SQL ejecutadas.", ("operation",))
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Duración de las sentencias SQL.",
+        ("operation",),
+        buckets=DB_BUCKETS,
+    )
+)
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+
+def _sql_operation(statement: str) -> str:
+    operation = statement.lstrip()[:6].upper()
+    return operation if operation in SQL_OPERATIONS else "OTHER"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start_time = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_time = getattr(context, "_metrics_start_time", None)
+    if start_time is None:
+        return
+    labels = (_sql_operation(statement),)
+    db_queries.inc(labels)
+    db_query_duration.observe(labels, time.perf_counter() - start_time)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide, por ruta, el número de solicitudes, su latencia y
+    las solicitudes en curso. Las rutas se etiquetan con su plantilla (p. ej.
+    ``/api/tasks/{task_id}``) para mantener acotada la cardinalidad.
+    """
+    
+    def __init__(self, app: ASGIApp, routes: Optional[Sequence[BaseRoute]] = None):
+        self.app = app
+        self.routes = routes if routes is not None else []
+    
+    def _route_template(self, scope: Scope) -> str:
+        partial = None
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+            if match == Match.PARTIAL and partial is None:
+                partial = route.path
+        return partial or "<unmatched>"
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        labels = (scope["method"], self._route_template(scope))
+        status_code = 500
+        
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        http_requests_in_flight.inc(labels)
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_request_duration.observe(labels, time.perf_counter() - start_time)
+            http_requests.inc(labels + (str(status_code),))
+            http_requests_in_flight.dec(labels)
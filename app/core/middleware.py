@@ -1,51 +1,147 @@
 import logging
+import queue
+import random
 import time
-from typing import Callable
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
 
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware
+from app.core.querycount import track_request_queries
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-# Configurar el logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
+# Los registros se encolan en el event loop y un hilo aparte los escribe
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+_log_handler: Optional[QueueHandler] = None
+_log_listener: Optional[QueueListener] = None
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware para registrar información sobre las solicitudes y respuestas."""
+
+def start_logging() -> None:
+    """
+    Configura el logger raíz para enviar los registros a una cola y arranca el
+    hilo que los escribe en la salida estándar. Es idempotente.
+    """
+    global _log_handler, _log_listener
+    if _log_listener is not None:
+        return
+    
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    _log_handler = QueueHandler(_log_queue)
+    root.addHandler(_log_handler)
     
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        start_time = time.time()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _log_listener = QueueListener(_log_queue, stream_handler, respect_handler_level=True)
+    _log_listener.start()
+
+
+def stop_logging() -> None:
+    """
+    Retira el handler de la cola del logger raíz y detiene el hilo de escritura
+    después de vaciarla.
+    """
+    global _log_handler, _log_listener
+    if _log_handler is not None:
+        logging.getLogger().removeHandler(_log_handler)
+        _log_handler = None
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+class LoggingMiddleware:
+    """
+    Middleware ASGI para registrar información sobre las solicitudes y respuestas.
+    
+    Registra método, ruta, cliente, estado y duración en una sola línea. Las
+    respuestas correctas (< 400) se muestrean con ``sample_rate``; los errores
+    se registran siempre.
+    """
+    
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        # Registrar la solicitud
-        logger.info(
-            f"Request: {request.method} {request.url.path} - Client: {request.client.host}"
-        )
+        start_time = time.perf_counter()
+        status_code = 500
         
-        # Procesar la solicitud
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        client = scope.get("client")
+        client_host = client[0] if client else "-"
         try:
-            response = await call_next(request)
-            
-            # Registrar la respuesta
-            process_time = time.time() - start_time
-            logger.info(
-                f"Response: {request.method} {request.url.path} - Status: {response.status_code} - "
-                f"Process time: {process_time:.4f}s"
-            )
-            
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
             # Registrar la excepción
-            process_time = time.time() - start_time
             logger.error(
-                f"Error: {request.method} {request.url.path} - Error: {str(e)} - "
-                f"Process time: {process_time:.4f}s"
+                "Error: %s %s - Client: %s - Error: %s - Process time: %.4fs",
+                scope["method"],
+                scope["path"],
+                client_host,
+                e,
+                time.perf_counter() - start_time,
             )
             raise
+        
+        # Muestrear las respuestas correctas
+        if status_code < 400 and random.random() >= self.sample_rate:
+            return
+        logger.info(
+            "Request: %s %s - Client: %s - Status: %d - Process time: %.4fs",
+            scope["method"],
+            scope["path"],
+            client_host,
+            status_code,
+            time.perf_counter() - start_time,
+        )
+
+
+class QueryCountMiddleware:
+    """
+    Middleware ASGI que añade ``X-Query-Count`` con las sentencias SQL ejecutadas
+    antes de enviar la respuesta (en un streaming, solo las de antes del primer
+    fragmento). Pensado para depuración (``QUERY_COUNT_HEADER``).
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        with track_request_queries() as counter:
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-query-count", str(counter.count).encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+            
+            await self.app(scope, receive, send_wrapper)
 
 
 def setup_middleware(app: FastAPI) -> None:
     """Configura los middlewares para la aplicación."""
-    app.add_middleware(LoggingMiddleware)
+    if settings.QUERY_COUNT_HEADER:
+        app.add_middleware(QueryCountMiddleware)
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware, routes=app.routes)
+    app.add_middleware(LoggingMiddleware, sample_rate=settings.LOG_SUCCESS_SAMPLE_RATE)
@@ -0,0 +1,126 @@
+"""
+Esquema OpenAPI precalculado.
+
+FastAPI genera el esquema en la primera petición a ``/docs`` u ``/openapi.json``
+recorriendo todas las rutas y modelos, y cada worker lo repite. La imagen lo
+serializa al construirse::
+
+    python -m app.core.openapi --output openapi.json
+
+y los workers lo cargan de ``OPENAPI_SCHEMA_PATH``. El fichero guarda una huella
+de lo que determina el esquema: las rutas publicadas, las versiones de FastAPI y
+pydantic y el código fuente de la aplicación (rutas, dependencias y modelos de
+petición y respuesta). Si no coincide (p. ej. cambió un modelo o la configuración
+de rutas) se ignora y el esquema se genera como siempre. La huella no genera el
+esquema: leer y resumir el código cuesta unos milisegundos.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_KEY = "x-schema-fingerprint"
+
+# Raíz del paquete ``app``; los tests no forman parte del esquema
+APP_DIR = Path(__file__).resolve().parents[1]
+
+
+def source_digest(root: Path = APP_DIR) -> str:
+    """Resumen del código fuente de la aplicación (sin los tests)."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(root.rglob("*.py")):
+        relative = path.relative_to(root)
+        if relative.parts[0] == "tests":
+            continue
+        digest.update(relative.as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def schema_fingerprint(app: FastAPI) -> str:
+    """
+    Huella de las entradas del esquema: versión de la API, rutas publicadas,
+    versiones de FastAPI y pydantic y código fuente de la aplicación.
+    """
+    routes = sorted(
+        f"{','.join(sorted(route.methods))} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.include_in_schema
+    )
+    raw = "\n".join(
+        [app.version, fastapi.__version__, pydantic.VERSION, source_digest(), *routes]
+    )
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def load_openapi_schema(app: FastAPI, path: str) -> Optional[Dict[str, Any]]:
+    """
+    Lee el esquema serializado en ``path``.
+    
+    Returns:
+        El esquema, o ``None`` si el fichero no existe, no es válido o se
+        generó a partir de otras rutas o de otro código.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "rb") as f:
+            schema = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Esquema OpenAPI precalculado ilegible ({path}): {e}")
+        return None
+    if schema.pop(FINGERPRINT_KEY, None) != schema_fingerprint(app):
+        logger.warning(f"Esquema OpenAPI precalculado desactualizado ({path}); se regenera")
+        return None
+    return schema
+
+
+def install_openapi_schema(app: FastAPI, path: Optional[str]) -> Callable[[], Dict[str, Any]]:
+    """
+    Sustituye ``app.openapi`` para que use el esquema de ``path`` si es válido;
+    si no, se genera en la primera petición como hace FastAPI.
+    """
+    generate = app.openapi
+    
+    def openapi() -> Dict[str, Any]:
+        if app.openapi_schema is None:
+            schema = load_openapi_schema(app, path) if path else None
+            app.openapi_schema = schema if schema is not None else generate()
+        return app.openapi_schema
+    
+    app.openapi = openapi
+    return openapi
+
+
+def write_openapi_schema(app: FastAPI, path: str) -> None:
+    """Serializa el esquema de ``app`` en ``path`` junto con su huella."""
+    # Se genera siempre de cero, aunque OPENAPI_SCHEMA_PATH apunte a un fichero previo
+    app.openapi_schema = None
+    schema = {**FastAPI.openapi(app), FINGERPRINT_KEY: schema_fingerprint(app)}
+    with open(path, "w") as f:
+        json.dump(schema, f, separators=(",", ":"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serializa el esquema OpenAPI de la API")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    
+    from app.main import app
+    
+    write_openapi_schema(app, args.output)
+    print(f"Esquema OpenAPI escrito en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
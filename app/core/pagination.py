@@ -0,0 +1,92 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Tuple
+from uuid import UUID
+
+
+class InvalidCursorError(ValueError):
+    """El cursor recibido no tiene un formato válido."""
+
+
+def encode_cursor(value: Any, task_id: UUID, sort: str = "created_at") -> str:
+    """
+    Codifica la posición ``(valor de ordenación, id)`` de la última tarea de una
+    página en un cursor opaco apto para URLs. El cursor recuerda la ordenación
+    para la que se generó.
+    """
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, task_id.hex], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(
+    cursor: str,
+    sort: str = "created_at",
+    parse: Callable[[Any], Any] = datetime.fromisoformat,
+) -> Tuple[Any, UUID]:
+    """
+    Decodifica un cursor generado por ``encode_cursor``.
+
+    Args:
+        cursor: Cursor recibido del cliente.
+        sort: Ordenación de la petición; debe coincidir con la del cursor.
+        parse: Convierte el valor de ordenación guardado a su tipo.
+
+    Returns:
+        El valor de ordenación y el id de la última tarea de la página anterior.
+
+    Raises:
+        InvalidCursorError: Si el cursor está corrupto, fue manipulado o es de
+            otra ordenación.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        if len(payload) == 2:
+            # Cursores emitidos antes de que la ordenación fuera configurable
+            payload = ["created_at", *payload]
+        cursor_sort, value, task_id = payload
+        if cursor_sort != sort:
+            raise InvalidCursorError("El cursor pertenece a otra ordenación")
+        return parse(value), UUID(hex=task_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(str(e)) from e
+
+
+def encode_sync_token(version: int, task_id: Optional[UUID], issued_at: int) -> str:
+    """
+    Codifica la posición del feed de cambios en un token opaco.
+
+    Args:
+        version: Versión de cambios hasta la que el cliente está al día.
+        task_id: Último id devuelto dentro de ``version`` cuando la respuesta se
+            cortó a mitad de una versión; ``None`` si la versión está completa.
+        issued_at: Instante (epoch en segundos) a partir del cual el cliente
+            necesita los tombstones; determina cuándo caduca el token.
+    """
+    raw = json.dumps(
+        ["sync", version, task_id.hex if task_id else None, issued_at], separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> Tuple[int, Optional[UUID], int]:
+    """
+    Decodifica un token generado por ``encode_sync_token``.
+
+    Returns:
+        La versión, el último id de la versión (o ``None``) y el instante de emisión.
+
+    Raises:
+        InvalidCursorError: Si el token está corrupto o fue manipulado.
+    """
+    try:
+        padding = "=" * (-len(token) % 4)
+        kind, version, task_id, issued_at = json.loads(base64.urlsafe_b64decode(token + padding))
+        if kind != "sync" or not isinstance(version, int) or not isinstance(issued_at, int):
+            raise InvalidCursorError("Token de sincronización inválido")
+        return version, UUID(hex=task_id) if task_id else None, issued_at
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError(str(e)) from e
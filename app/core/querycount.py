@@ -0,0 +1,84 @@
+"""
+Recuento de sentencias SQL a partir de los eventos del motor.
+
+- ``count_queries()`` cuenta todas las sentencias del proceso mientras está
+  activo (tests y scripts).
+- ``assert_max_queries(n)`` además falla si se superan ``n``; los tests lo usan
+  para fijar el presupuesto de consultas de cada endpoint y detectar N+1.
+- ``track_request_queries()`` cuenta solo las del contexto actual (la
+  petición en curso, incluidas las que se ejecutan en el threadpool); lo usa
+  ``QueryCountMiddleware`` para la cabecera ``X-Query-Count`` con
+  ``QUERY_COUNT_HEADER``.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryCounter:
+    """Sentencias SQL ejecutadas mientras el contador está activo."""
+    
+    def __init__(self):
+        self.statements: List[str] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+_counters: List[QueryCounter] = []
+_request_counter: ContextVar[Optional[QueryCounter]] = ContextVar(
+    "request_query_counter", default=None
+)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for counter in _counters:
+        counter.statements.append(statement)
+    counter = _request_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Cuenta las sentencias SQL de cualquier hilo o tarea mientras está activo."""
+    counter = QueryCounter()
+    _counters.append(counter)
+    try:
+        yield counter
+    finally:
+        _counters.remove(counter)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryCounter]:
+    """
+    Como ``count_queries``, pero falla al salir si se ejecutaron más de ``limit``
+    sentencias.
+    
+    Raises:
+        AssertionError: Con las sentencias ejecutadas, si se supera el límite.
+    """
+    with count_queries() as counter:
+        yield counter
+    if counter.count > limit:
+        statements = "\n".join(f"  {statement}" for statement in counter.statements)
+        raise AssertionError(
+            f"Se ejecutaron {counter.count} sentencias SQL (máximo {limit}):\n{statements}"
+        )
+
+
+@contextmanager
+def track_request_queries() -> Iterator[QueryCounter]:
+    """Cuenta las sentencias SQL del contexto actual (p. ej. una petición)."""
+    counter = QueryCounter()
+    token = _request_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _request_counter.reset(token)
@@ -0,0 +1,218 @@
+"""
+Límites de peticiones por ruta y por clave (IP, usuario o email).
+
+Cada límite de ``RATE_LIMITS`` es un token bucket ``"<clave>:<n>/<periodo>"``:
+admite ráfagas de ``n`` peticiones y repone ``n`` fichas por periodo. Se aplica
+como dependencia de la ruta, antes de consultar la base de datos o ejecutar
+bcrypt, de modo que rechazar una petición solo cuesta la consulta al backend:
+
+- ``memory``: buckets en el proceso (un contador por worker).
+- ``redis``: un script Lua atómico en Redis compartido por todos los workers.
+"""
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, params, status
+from fastapi.security.utils import get_authorization_scheme_param
+from jose import JWTError
+
+from app.core.config import settings
+from app.core.security import token_verifier
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"second": 1.0, "minute": 60.0, "hour": 3600.0, "day": 86400.0}
+
+
+class RateLimitRule:
+    """Límite ``<clave>:<n>/<periodo>`` ya interpretado."""
+    
+    def __init__(self, key: str, capacity: int, period: float):
+        self.key = key
+        self.capacity = capacity
+        self.period = period
+
+
+@lru_cache(maxsize=None)
+def parse_rule(spec: str) -> RateLimitRule:
+    """
+    Interpreta un límite como ``"email:5/minute"``.
+    
+    Raises:
+        ValueError: Si la clave, el número o el periodo no son válidos.
+    """
+    key, _, limit = spec.partition(":")
+    count, _, period = limit.partition("/")
+    if key not in KEY_FUNCTIONS or period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Límite de peticiones inválido: {spec!r}")
+    return RateLimitRule(key, int(count), PERIODS[period])
+
+
+class MemoryRateLimitBackend:
+    """
+    Token buckets en memoria. Guarda como mucho ``max_keys`` buckets y desaloja
+    los menos usados, de modo que una ráfaga de IPs distintas no agota la memoria.
+    """
+    
+    def __init__(self, max_keys: int, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+    
+    async def hit(self, key: str, capacity: int, period: float) -> float:
+        """
+        Consume una ficha del bucket ``key``.
+        
+        Returns:
+            0 si la petición se admite; si no, los segundos hasta la siguiente ficha.
+        """
+        now = self.clock()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * capacity / period)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) * period / capacity
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+    
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+# Token bucket atómico; devuelve el retraso como texto porque Redis trunca los
+# números de Lua a enteros
+REDIS_TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = time[1] + time[2] / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * capacity / period)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) * period / capacity
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(period))
+return tostring(retry_after)
+"""
+
+
+class RedisRateLimitBackend:
+    """
+    Token buckets compartidos en Redis (requiere el paquete ``redis``). Si Redis
+    no responde, las peticiones se admiten: el límite no debe tumbar el login.
+    """
+    
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        
+        self._client = redis.from_url(url)
+        self._script = self._client.register_script(REDIS_TOKEN_BUCKET)
+        self._errors = (redis.RedisError, OSError)
+    
+    async def hit(self, key: str, capacity: int, period: float) -> float:
+        try:
+            return float(await self._script(keys=[f"ratelimit:{key}"], args=[capacity, period]))
+        except self._errors as e:
+            logger.warning(f"Límite de peticiones no disponible: {e}")
+            return 0.0
+    
+    def clear(self) -> None:
+        pass
+
+
+_backend: Optional[Any] = None
+
+
+def get_rate_limit_backend() -> Any:
+    """Devuelve el backend configurado en ``RATE_LIMIT_BACKEND``."""
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _backend = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_KEYS)
+    return _backend
+
+
+async def _client_ip(request: Request) -> Optional[str]:
+    return request.client.host if request.client else None
+
+
+async def _user_id(request: Request) -> Optional[str]:
+    # Se verifica la firma para que un token falsificado no gaste el cupo de otro
+    # usuario; la verificación se sirve de caché y no consulta la base de datos
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return token_verifier.verify(token).get("sub")
+    except JWTError:
+        return None
+
+
+async def _email(request: Request) -> Optional[str]:
+    # Solo se lee el cuerpo en el formato que consume la ruta: FastAPI ya lo ha
+    # leído y Starlette lo guarda en la petición, pero aún no lo ha validado
+    body_field = getattr(request.scope.get("route"), "body_field", None)
+    if body_field is None:
+        return None
+    if isinstance(body_field.field_info, params.Form):
+        email = (await request.form()).get("username")
+    elif request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            body = await request.json()
+        except ValueError:
+            return None
+        email = body.get("email") if isinstance(body, dict) else None
+    else:
+        return None
+    return email.strip().lower() if isinstance(email, str) and email else None
+
+
+KEY_FUNCTIONS: Dict[str, Callable[[Request], Awaitable[Optional[str]]]] = {
+    "ip": _client_ip,
+    "user": _user_id,
+    "email": _email,
+}
+
+
+def rate_limit(name: str) -> Callable[[Request], Awaitable[None]]:
+    """
+    Dependencia que aplica los límites ``RATE_LIMITS[name]`` a la ruta.
+    
+    Raises:
+        HTTPException: 429 con ``Retry-After`` si se supera algún límite.
+    """
+    async def check_rate_limit(request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        backend = get_rate_limit_backend()
+        for spec in settings.RATE_LIMITS.get(name, ()):
+            rule = parse_rule(spec)
+            key = await KEY_FUNCTIONS[rule.key](request)
+            if key is None:
+                continue
+            retry_after = await backend.hit(f"{name}:{rule.key}:{key}", rule.capacity, rule.period)
+            if retry_after > 0:
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Demasiadas solicitudes; inténtalo de nuevo más tarde",
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
+    
+    return check_rate_limit
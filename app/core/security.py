@@ -1,23 +1,209 @@
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Optional, Union
+from typing import Any, Callable, Dict, Optional, Union
 
-from jose import jwt
-from passlib.context import CryptContext
+from jose import jwk, jwt
+from starlette.concurrency import run_in_threadpool
 
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableException
+
+# Configuración para el hash de contraseñas; passlib se importa al primer uso,
+# normalmente en los procesos del pool de bcrypt y no en los workers de la API
+_pwd_context: Optional[Any] = None
+
+
+def get_pwd_context() -> Any:
+    """Devuelve el ``CryptContext`` de bcrypt, creándolo si hace falta."""
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
-# Configuración para el hash de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Funciones para manejar contraseñas
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si la contraseña en texto plano coincide con el hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Genera un hash para la contraseña."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+class PasswordHasher:
+    """
+    Ejecuta bcrypt en un pool de procesos dedicado con una cola acotada.
+    
+    Así una ráfaga de logins no ocupa el threadpool compartido ni el event loop.
+    Cuando hay más de ``capacity`` operaciones en curso o en espera se responde
+    503 de inmediato en lugar de dejar crecer la latencia.
+    """
+    
+    def __init__(self, max_workers: Optional[int], max_queue: int):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        self.max_workers = max_workers
+        self.capacity = max(self.max_workers, 1) + max_queue
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+    
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise ServiceUnavailableException(
+                    "Demasiadas solicitudes de autenticación en curso, inténtalo de nuevo"
+                )
+            self._pending += 1
+        try:
+            if self.max_workers == 0:
+                return await run_in_threadpool(fn, *args)
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Versión asíncrona de ``verify_password``."""
+        return await self._run(verify_password, plain_password, hashed_password)
+    
+    async def hash(self, password: str) -> str:
+        """Versión asíncrona de ``get_password_hash``."""
+        return await self._run(get_password_hash, password)
+    
+    def shutdown(self) -> None:
+        """Detiene los procesos del pool; se vuelve a crear en el siguiente uso."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+)
+
+
+# Miembros de la clave pública que entran en su huella (RFC 7638)
+JWK_THUMBPRINT_MEMBERS = ("crv", "e", "kty", "n", "x", "y")
+
+
+class TokenVerifier:
+    """
+    Firma y verifica los tokens de acceso con claves construidas una sola vez.
+    
+    Las verificaciones correctas se guardan en caché, indexadas por un resumen
+    del token y como mucho hasta su ``exp``, de modo que un token repetido no se
+    vuelve a decodificar ni a comprobar su firma.
+    
+    Con ``HS*`` se usa el secreto compartido. Con un algoritmo asimétrico
+    (``RS*``/``ES*``) se firma con la clave privada y se verifica con la
+    pública, que se publica como JWKS para que otros servicios verifiquen los
+    tokens sin el secreto; un servicio que solo verifica basta con la pública.
+    """
+    
+    def __init__(
+        self,
+        algorithm: str,
+        secret_key: Optional[str] = None,
+        private_key: Optional[str] = None,
+        public_key: Optional[str] = None,
+        cache_size: int = 10000,
+    ):
+        self.algorithm = algorithm
+        self.key_id: Optional[str] = None
+        self._public_jwk: Optional[Dict[str, Any]] = None
+        if algorithm.startswith("HS"):
+            self._signing_key = self._verification_key = jwk.construct(secret_key, algorithm)
+        else:
+            self._signing_key = jwk.construct(private_key, algorithm) if private_key else None
+            self._verification_key = (
+                jwk.construct(public_key, algorithm)
+                if public_key
+                else self._signing_key.public_key()
+            )
+            self._public_jwk = self._verification_key.to_dict()
+            members = {
+                key: self._public_jwk[key]
+                for key in JWK_THUMBPRINT_MEMBERS
+                if key in self._public_jwk
+            }
+            thumbprint = hashlib.sha256(
+                json.dumps(members, separators=(",", ":"), sort_keys=True).encode()
+            ).digest()
+            self.key_id = base64.urlsafe_b64encode(thumbprint).decode().rstrip("=")
+        self.cache = TTLCache(
+            maxsize=cache_size, ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+    
+    def sign(self, claims: Dict[str, Any]) -> str:
+        """Firma los claims con la clave de firma."""
+        if self._signing_key is None:
+            raise RuntimeError("No hay clave privada configurada para firmar tokens")
+        headers = {"kid": self.key_id} if self.key_id else None
+        return jwt.encode(claims, self._signing_key, algorithm=self.algorithm, headers=headers)
+    
+    def verify(self, token: str) -> Dict[str, Any]:
+        """
+        Verifica la firma y la expiración del token.
+        
+        Returns:
+            Los claims del token. Se comparten entre peticiones: no modificarlos.
+        
+        Raises:
+            JWTError: Si el token es inválido o ha expirado.
+        """
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        claims = self.cache.get(digest)
+        if claims is not None:
+            return claims
+        
+        claims = jwt.decode(token, self._verification_key, algorithms=[self.algorithm])
+        expires_at = claims.get("exp")
+        if isinstance(expires_at, (int, float)):
+            ttl = expires_at - time.time()
+            if ttl > 0:
+                self.cache.set(digest, claims, ttl=ttl)
+        return claims
+    
+    def jwks(self) -> Dict[str, Any]:
+        """Clave pública en formato JWKS; vacío con algoritmos simétricos."""
+        if self._public_jwk is None:
+            return {"keys": []}
+        return {"keys": [{**self._public_jwk, "kid": self.key_id, "use": "sig"}]}
+
+
+token_verifier = TokenVerifier(
+    settings.ALGORITHM,
+    secret_key=settings.SECRET_KEY,
+    private_key=settings.JWT_PRIVATE_KEY,
+    public_key=settings.JWT_PUBLIC_KEY,
+    cache_size=settings.TOKEN_CACHE_SIZE,
+)
 
 
 # Funciones para manejar tokens JWT
@@ -42,7 +228,4 @@ def create_access_token(
         )
     
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    return token_verifier.sign(to_encode)
@@ -0,0 +1,107 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+import orjson
+from fastapi import Response
+
+from app.models.task import Task
+
+# Columnas de TaskResponse, en el mismo orden en que Pydantic las serializa
+TASK_RESPONSE_COLUMNS = (
+    Task.title,
+    Task.description,
+    Task.id,
+    Task.is_completed,
+    Task.created_at,
+    Task.updated_at,
+    Task.user_id,
+)
+TASK_RESPONSE_FIELDS = tuple(column.key for column in TASK_RESPONSE_COLUMNS)
+
+# Un texto que empieza por estos caracteres se prefija con "'" para que una hoja
+# de cálculo no lo evalúe como fórmula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def task_row_to_dict(row: Sequence[Any]) -> Dict[str, Any]:
+    """Convierte una fila de ``TASK_RESPONSE_COLUMNS`` en el dict de TaskResponse."""
+    return dict(zip(TASK_RESPONSE_FIELDS, row))
+
+
+def task_rows_response(
+    rows: Iterable[Sequence[Any]],
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serializa filas de tareas directamente con orjson.
+    
+    Evita hidratar objetos ORM y validar cada tarea con TaskResponse; el JSON
+    resultante es idéntico al de ``List[TaskResponse]``.
+    """
+    content = orjson.dumps([task_row_to_dict(row) for row in rows])
+    return Response(
+        content=content,
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
+
+
+def task_changes_response(
+    rows: Iterable[Sequence[Any]],
+    deleted: Iterable[Any],
+    next_token: str,
+    has_more: bool,
+) -> Response:
+    """Serializa una página del feed de cambios (TaskChangesResponse) con orjson."""
+    content = orjson.dumps({
+        "tasks": [task_row_to_dict(row) for row in rows],
+        "deleted": list(deleted),
+        "next_token": next_token,
+        "has_more": has_more,
+    })
+    return Response(content=content, media_type="application/json")
+
+
+def task_rows_ndjson(rows: Iterable[Sequence[Any]]) -> bytes:
+    """Serializa filas de tareas como NDJSON: un objeto TaskResponse por línea."""
+    return b"".join(orjson.dumps(task_row_to_dict(row)) + b"\n" for row in rows)
+
+
+def is_csv_escaped(value: str) -> bool:
+    """
+    Indica si un texto empieza por una fórmula, precedida o no de ``'``.
+    
+    La exportación prefija estos textos con ``'`` y la importación se lo quita;
+    contar los ``'`` previos hace el escape reversible (``'=1`` sale como
+    ``''=1``) sin tocar los textos que solo empiezan por un apóstrofo.
+    """
+    return value.lstrip("'").startswith(CSV_FORMULA_PREFIXES)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, str) and is_csv_escaped(value):
+        return "'" + value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+def task_rows_csv(rows: Iterable[Sequence[Any]], header: bool = False) -> bytes:
+    """
+    Serializa filas de tareas como CSV con las columnas de TaskResponse.
+    ``header`` antepone la fila con los nombres de las columnas.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(TASK_RESPONSE_FIELDS)
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
@@ -0,0 +1,59 @@
+import csv
+import io
+from typing import Any, Dict, List
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.task import Task
+
+# Columnas que se cargan con COPY; los valores por defecto del modelo no se
+# aplican, así que cada fila debe traerlas todas
+TASK_COPY_COLUMNS = (
+    "id", "title", "description", "is_completed", "created_at", "updated_at", "user_id",
+    "change_version",
+)
+
+
+def _copy_with_psycopg2(session: Session, rows: List[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([row[column] for column in TASK_COPY_COLUMNS])
+    buffer.seek(0)
+    
+    dbapi_connection = session.connection().connection.dbapi_connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY tasks ({', '.join(TASK_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer,
+        )
+
+
+async def bulk_insert_tasks(db: Any, rows: List[Dict[str, Any]]) -> None:
+    """
+    Inserta un lote de tareas dentro de la transacción de la sesión.
+    
+    En PostgreSQL se usa ``COPY FROM STDIN`` (``copy_records_to_table`` con
+    asyncpg, ``copy_expert`` con psycopg2); en el resto de bases de datos, un
+    ``executemany``.
+    
+    Args:
+        db: Sesión de base de datos (``AsyncSession`` o ``ThreadedSession``).
+        rows: Filas con todas las columnas de ``TASK_COPY_COLUMNS``.
+    """
+    if db.bind.dialect.name != "postgresql":
+        await db.execute(insert(Task), rows)
+        return
+    
+    if isinstance(db, AsyncSession):
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            "tasks",
+            records=[tuple(row[column] for column in TASK_COPY_COLUMNS) for row in rows],
+            columns=list(TASK_COPY_COLUMNS),
+        )
+    else:
+        await db.run_sync(_copy_with_psycopg2, rows)
@@ -1,22 +1,267 @@
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 
 from app.core.config import settings
+from app.core.metrics import registry, sample_lines
+from app.db.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool, describe_pool
+
 
-# Crear el motor de SQLAlchemy
-engine = create_engine(str(settings.DATABASE_URL))
+def engine_options(url: str, async_driver: bool = False) -> Dict[str, Any]:
+    """
+    Construye las opciones del pool y de conexión de un motor a partir de Settings.
+    
+    Args:
+        url: URL de la base de datos.
+        async_driver: Si las opciones son para el motor asíncrono (asyncpg).
+        
+    Returns:
+        Argumentos para ``create_engine`` / ``create_async_engine``.
+    """
+    options: Dict[str, Any] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    timeout = settings.DB_STATEMENT_TIMEOUT_MS
+    if timeout > 0 and make_url(url).get_backend_name() == "postgresql":
+        # Cada driver recibe los parámetros de sesión del servidor de forma distinta
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    return options
 
-# Crear una clase de sesión
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Crear una clase base para los modelos
 Base = declarative_base()
 
+
+# Drivers asíncronos equivalentes a cada backend
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Convierte una URL de base de datos síncrona a su driver asíncrono."""
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No hay driver asíncrono configurado para '{backend}'")
+    return url_obj.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(
+        hide_password=False
+    )
+
+
+# Los motores se crean al primer uso (o en el lifespan de la aplicación): importar
+# la aplicación no carga el driver ni exige el del modo que no se usa
+_engine: Optional[Engine] = None
+_session_factory: Optional[sessionmaker] = None
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_engine() -> Engine:
+    """Devuelve el motor síncrono, creándolo si hace falta."""
+    global _engine
+    if _engine is None:
+        _engine = create_engine(
+            str(settings.DATABASE_URL),
+            poolclass=TimedQueuePool,
+            **engine_options(str(settings.DATABASE_URL)),
+        )
+    return _engine
+
+
+def get_sessionmaker() -> sessionmaker:
+    """Devuelve la fábrica de sesiones síncronas, creando el motor si hace falta."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+    return _session_factory
+
+
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Devuelve la fábrica de sesiones asíncronas, creando el motor si hace falta."""
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        _async_engine = create_async_engine(
+            get_async_database_url(str(settings.DATABASE_URL)),
+            poolclass=TimedAsyncAdaptedQueuePool,
+            **engine_options(str(settings.DATABASE_URL), async_driver=True),
+        )
+        _async_session_factory = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+def get_engines() -> List[Tuple[str, Engine]]:
+    """Devuelve los motores creados en este proceso, identificados por su modo."""
+    engines = []
+    if _engine is not None:
+        engines.append(("sync", _engine))
+    if _async_engine is not None:
+        engines.append(("async", _async_engine.sync_engine))
+    # Importación diferida: app.db.replicas depende de este módulo
+    from app.db import replicas
+    
+    if replicas._replica_set is not None:
+        engines.extend(replicas._replica_set.engines())
+    return engines
+
+
+def get_pool_status() -> Dict[str, Dict[str, float]]:
+    """Devuelve el estado del pool de cada motor creado en este proceso."""
+    return {name: describe_pool(eng.pool) for name, eng in get_engines()}
+
+
+@registry.register_collector
+def _pool_metrics() -> Iterator[str]:
+    """Exporta el estado del pool de conexiones de cada motor."""
+    pools = [({"engine": name}, status) for name, status in get_pool_status().items()]
+    metrics = {
+        "db_pool_size": ("gauge", "Tamaño configurado del pool.", "size"),
+        "db_pool_checked_out": ("gauge", "Conexiones en uso.", "checked_out"),
+        "db_pool_checked_in": ("gauge", "Conexiones inactivas en el pool.", "idle"),
+        "db_pool_overflow": ("gauge", "Conexiones por encima del tamaño del pool.", "overflow"),
+        "db_pool_checkouts_total": ("counter", "Conexiones entregadas por el pool.", "checkouts"),
+        "db_pool_timeouts_total": ("counter", "Esperas del pool que agotaron el tiempo.", "timeouts"),
+        "db_pool_wait_seconds_total": ("counter", "Tiempo total esperando una conexión.", "wait_seconds"),
+    }
+    for name, (type_name, documentation, key) in metrics.items():
+        samples = [(labels, status[key]) for labels, status in pools if key in status]
+        yield from sample_lines(name, documentation, type_name, samples)
+
+
+class ThreadedResult:
+    """
+    Adapta un ``Result`` síncrono en streaming a la parte de ``AsyncResult``
+    que usan las rutas: cada tanda de filas se lee en el threadpool.
+    """
+    
+    def __init__(self, result: Any):
+        self.result = result
+    
+    async def partitions(self, size: Optional[int] = None) -> AsyncIterator[List[Any]]:
+        partitions = self.result.partitions(size)
+        while True:
+            rows = await run_in_threadpool(next, partitions, None)
+            if rows is None:
+                return
+            yield rows
+    
+    async def close(self) -> None:
+        await run_in_threadpool(self.result.close)
+
+
+class ThreadedSession:
+    """
+    Adapta una ``Session`` síncrona a la interfaz de ``AsyncSession``.
+
+    Cada operación de E/S se ejecuta en el threadpool, de modo que las rutas
+    ``async def`` funcionan igual con el driver síncrono (``DATABASE_ASYNC=false``).
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    @property
+    def bind(self) -> Any:
+        return self.sync_session.bind
+
+    @property
+    def info(self) -> dict:
+        return self.sync_session.info
+
+    def add(self, instance: Any) -> None:
+        self.sync_session.add(instance)
+
+    def add_all(self, instances: Any) -> None:
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement: Any, *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def stream(self, statement: Any, *args: Any, **kwargs: Any) -> ThreadedResult:
+        """Ejecuta la sentencia con un cursor del servidor (``stream_results``)."""
+        result = await run_in_threadpool(
+            self.sync_session.execute,
+            statement.execution_options(stream_results=True),
+            *args,
+            **kwargs,
+        )
+        return ThreadedResult(result)
+
+    async def get(self, entity: Any, ident: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance: Any) -> None:
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self) -> None:
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance: Any, *args: Any, **kwargs: Any) -> None:
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def commit(self) -> None:
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self) -> None:
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self) -> None:
+        await run_in_threadpool(self.sync_session.close)
+
+    async def run_sync(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def __aenter__(self) -> "ThreadedSession":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+
 # Función para obtener una sesión de base de datos
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    if settings.DATABASE_ASYNC:
+        async with get_async_sessionmaker()() as db:
+            yield db
+    else:
+        db = ThreadedSession(get_sessionmaker()(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
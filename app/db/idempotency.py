@@ -0,0 +1,184 @@
+"""
+Almacén de ``Idempotency-Key`` compartido en la base de datos (tabla
+``idempotency_keys``), para despliegues con varios workers.
+
+Las claves caducadas se borran al reutilizarse; para purgarlas todas (pensado
+para un cron diario)::
+
+    python -m app.db.idempotency
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from uuid import UUID
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.engine import Connection
+
+from app.core.idempotency import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    StoredResponse,
+)
+from app.db.task_stats import UPSERTS
+from app.models.idempotency_key import IdempotencyKey
+
+# Espera máxima entre dos comprobaciones de una clave en curso
+MAX_POLL_SECONDS = 0.5
+
+
+class DatabaseIdempotencyStore:
+    """
+    Reserva la clave con un ``INSERT ... ON CONFLICT DO NOTHING`` en una
+    transacción corta; los duplicados consultan la fila hasta que la petición
+    original guarda su respuesta. Una reserva sin respuesta más antigua que
+    ``lock_seconds`` (un worker caído) la puede tomar otra petición.
+    """
+    
+    def __init__(
+        self,
+        ttl: float,
+        wait_seconds: float,
+        lock_seconds: float,
+        session_factory: Optional[Any] = None,
+        poll_seconds: float = 0.02,
+    ):
+        self.ttl = ttl
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.poll_seconds = poll_seconds
+        self._session_factory = session_factory
+    
+    def _sessions(self) -> Any:
+        if self._session_factory is None:
+            from app.db.database import get_async_sessionmaker
+            
+            self._session_factory = get_async_sessionmaker()
+        return self._session_factory()
+    
+    @staticmethod
+    def _owned(user_id: UUID, key: str) -> Any:
+        return (IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    
+    async def _try_claim(self, user_id: UUID, key: str, fingerprint: str) -> Any:
+        """Intenta reservar la clave; devuelve ``True`` o la fila existente."""
+        now = datetime.utcnow()
+        async with self._sessions() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(
+                    *self._owned(user_id, key), IdempotencyKey.expires_at <= now
+                )
+            )
+            stmt = UPSERTS[db.bind.dialect.name](IdempotencyKey).values(
+                user_id=user_id,
+                key=key,
+                fingerprint=fingerprint,
+                locked_at=now,
+                expires_at=now + timedelta(seconds=self.ttl),
+            )
+            claimed = await db.scalar(
+                stmt.on_conflict_do_nothing().returning(IdempotencyKey.key)
+            )
+            row = None
+            if claimed is None:
+                row = (
+                    await db.execute(
+                        select(
+                            IdempotencyKey.fingerprint,
+                            IdempotencyKey.status_code,
+                            IdempotencyKey.headers,
+                            IdempotencyKey.body,
+                            IdempotencyKey.locked_at,
+                        ).where(*self._owned(user_id, key))
+                    )
+                ).first()
+                stale = now - timedelta(seconds=self.lock_seconds)
+                if row is not None and row.status_code is None and row.locked_at <= stale:
+                    # Reserva abandonada: se toma solo si nadie se adelantó
+                    result = await db.execute(
+                        update(IdempotencyKey)
+                        .where(
+                            *self._owned(user_id, key),
+                            IdempotencyKey.status_code.is_(None),
+                            IdempotencyKey.locked_at == row.locked_at,
+                        )
+                        .values(locked_at=now, fingerprint=fingerprint)
+                    )
+                    claimed = result.rowcount == 1 or None
+            await db.commit()
+        return True if claimed is not None else row
+    
+    async def claim(self, user_id: UUID, key: str, fingerprint: str) -> Optional[StoredResponse]:
+        """Ver ``MemoryIdempotencyStore.claim``."""
+        deadline = time.monotonic() + self.wait_seconds
+        delay = self.poll_seconds
+        while True:
+            row = await self._try_claim(user_id, key, fingerprint)
+            if row is True:
+                return None
+            if row is not None:
+                if row.fingerprint != fingerprint:
+                    raise IdempotencyKeyReused
+                if row.status_code is not None:
+                    return StoredResponse(
+                        row.fingerprint,
+                        row.status_code,
+                        StoredResponse.decode_headers(row.headers),
+                        row.body or b"",
+                    )
+                if time.monotonic() >= deadline:
+                    raise IdempotencyKeyInProgress
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_POLL_SECONDS)
+    
+    async def complete(self, user_id: UUID, key: str, response: StoredResponse) -> None:
+        async with self._sessions() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(*self._owned(user_id, key))
+                .values(
+                    status_code=response.status_code,
+                    headers=response.encode_headers(),
+                    body=response.body,
+                    expires_at=datetime.utcnow() + timedelta(seconds=self.ttl),
+                )
+            )
+            await db.commit()
+    
+    async def release(self, user_id: UUID, key: str) -> None:
+        async with self._sessions() as db:
+            await db.execute(
+                delete(IdempotencyKey).where(
+                    *self._owned(user_id, key), IdempotencyKey.status_code.is_(None)
+                )
+            )
+            await db.commit()
+    
+    def clear(self) -> None:
+        pass
+
+
+def purge_expired_idempotency_keys(connection: Connection) -> int:
+    """
+    Elimina las claves caducadas.
+    
+    Returns:
+        El número de claves eliminadas.
+    """
+    result = connection.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+    )
+    return result.rowcount
+
+
+def main() -> None:
+    from app.db.database import get_engine
+    
+    with get_engine().begin() as connection:
+        removed = purge_expired_idempotency_keys(connection)
+    print(f"Claves de idempotencia eliminadas: {removed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolWaitStats:
+    """Contadores acumulados de las esperas para obtener una conexión del pool."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+    
+    def record(self, wait_seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds += wait_seconds
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+    
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds": self.wait_seconds,
+            }
+
+
+class _TimedPoolMixin:
+    """Mide el tiempo que cada checkout espera a que el pool entregue una conexión."""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+    
+    def _do_get(self):
+        start_time = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - start_time, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - start_time)
+        return conn
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """``QueuePool`` con estadísticas de espera."""
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """``AsyncAdaptedQueuePool`` con estadísticas de espera."""
+
+
+def describe_pool(pool: Pool) -> Dict[str, float]:
+    """
+    Devuelve el estado actual de un pool: conexiones en uso, inactivas y de
+    overflow, más las estadísticas de espera si el pool las registra.
+    """
+    status: Dict[str, float] = {}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            # QueuePool cuenta el overflow desde -pool_size hasta llenar el pool
+            overflow=max(pool.overflow(), 0),
+        )
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(wait_stats.as_dict())
+    return status
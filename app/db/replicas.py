@@ -0,0 +1,245 @@
+import itertools
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db.database import ThreadedSession, engine_options, get_async_database_url
+from app.db.pool import TimedAsyncAdaptedQueuePool, TimedQueuePool
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """
+    Indica si el error significa que la réplica no está disponible: no se pudo
+    conectar o se perdió la conexión.
+    
+    Los errores de una sentencia concreta (``statement_timeout``, bloqueos,
+    conflictos de serialización) no cuentan: la réplica sigue sana.
+    """
+    if isinstance(error, (exc.InterfaceError, OSError)):
+        return True
+    if isinstance(error, exc.DBAPIError):
+        # Sin sentencia, el error se produjo al abrir la conexión
+        return error.connection_invalidated or error.statement is None
+    return False
+
+
+class Replica:
+    """Una réplica de lectura con su motor y su estado de salud."""
+    
+    def __init__(self, name: str, url: str, async_mode: bool):
+        self.name = name
+        self.url = url
+        self.async_mode = async_mode
+        # Momento (monotónico) hasta el que la réplica queda fuera de la rotación
+        self.ejected_until = 0.0
+        if async_mode:
+            self._async_engine = create_async_engine(
+                get_async_database_url(url),
+                poolclass=TimedAsyncAdaptedQueuePool,
+                **engine_options(url, async_driver=True),
+            )
+            self.engine: Engine = self._async_engine.sync_engine
+            self._session_factory: Any = async_sessionmaker(
+                self._async_engine, autoflush=False, expire_on_commit=False
+            )
+        else:
+            self.engine = create_engine(url, poolclass=TimedQueuePool, **engine_options(url))
+            self._session_factory = sessionmaker(
+                bind=self.engine, autoflush=False, expire_on_commit=False
+            )
+    
+    def session(self) -> Union[AsyncSession, ThreadedSession]:
+        """Abre una sesión contra la réplica; se usa como ``async with``."""
+        if self.async_mode:
+            return self._session_factory()
+        return ThreadedSession(self._session_factory())
+    
+    def is_healthy(self, now: float) -> bool:
+        return self.ejected_until <= now
+    
+    async def dispose(self) -> None:
+        if self.async_mode:
+            await self._async_engine.dispose()
+        else:
+            self.engine.dispose()
+
+
+class ReplicaReadSession:
+    """
+    Sesión de lectura contra una réplica con recuperación en el primario.
+    
+    Si una lectura falla porque la réplica no está disponible, la réplica sale
+    de la rotación y la lectura (y las siguientes de la petición) se repite en
+    la sesión del primario. El resto de atributos se delegan en la sesión activa.
+    """
+    
+    _READ_METHODS = frozenset({"execute", "scalar", "scalars", "stream", "get"})
+    
+    def __init__(
+        self,
+        replica_set: "ReplicaSet",
+        replica: Replica,
+        session: Union[AsyncSession, ThreadedSession],
+        primary: Any,
+    ):
+        self._replica_set = replica_set
+        self._replica = replica
+        self._primary = primary
+        self._session: Any = session
+    
+    @property
+    def primary(self) -> Any:
+        """Sesión del primario de la petición."""
+        return self._primary
+    
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._session, name)
+        if name not in self._READ_METHODS or self._session is self._primary:
+            return attr
+        
+        async def read(*args: Any, **kwargs: Any) -> Any:
+            try:
+                return await attr(*args, **kwargs)
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                self._replica_set.eject(self._replica)
+                self._session = self._primary
+                return await getattr(self._primary, name)(*args, **kwargs)
+        
+        return read
+
+
+class ReplicaSet:
+    """
+    Reparte las lecturas entre réplicas en round-robin.
+    
+    Una réplica que falla al conectar sale de la rotación durante
+    ``retry_seconds``. Los usuarios que acaban de escribir quedan fijados al
+    primario durante ``pin_seconds`` para que lean sus propias escrituras.
+    """
+    
+    def __init__(
+        self,
+        urls: Sequence[str],
+        async_mode: bool,
+        pin_seconds: float,
+        retry_seconds: float,
+        pin_cache_size: int = 100000,
+    ):
+        self.replicas = [
+            Replica(f"replica-{i}", url, async_mode) for i, url in enumerate(urls)
+        ]
+        self.retry_seconds = retry_seconds
+        self._pins = TTLCache(maxsize=pin_cache_size, ttl=pin_seconds)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+    
+    def choose(self, pin_key: Optional[str] = None) -> Optional[Replica]:
+        """
+        Devuelve la siguiente réplica sana, o None si la lectura debe ir al
+        primario (usuario fijado o ninguna réplica disponible).
+        """
+        if pin_key is not None and self._pins.get(pin_key) is not None:
+            return None
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                index = next(self._counter) % len(self.replicas)
+            replica = self.replicas[index]
+            if replica.is_healthy(now):
+                return replica
+        return None
+    
+    def eject(self, replica: Replica) -> None:
+        """Saca una réplica de la rotación hasta que pase ``retry_seconds``."""
+        replica.ejected_until = time.monotonic() + self.retry_seconds
+    
+    def pin(self, pin_key: str) -> None:
+        """Fija al usuario al primario durante la ventana configurada."""
+        self._pins.set(pin_key, True)
+    
+    def engines(self) -> List[Tuple[str, Engine]]:
+        return [(replica.name, replica.engine) for replica in self.replicas]
+    
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.dispose()
+
+
+_replica_set: Optional[ReplicaSet] = None
+_configured = False
+
+
+def configure_replicas(
+    urls: Sequence[str], async_mode: Optional[bool] = None
+) -> Optional[ReplicaSet]:
+    """
+    Crea el conjunto de réplicas del proceso (None si no hay réplicas).
+    
+    Args:
+        urls: URLs de las réplicas de lectura.
+        async_mode: Driver a usar; por defecto ``DATABASE_ASYNC``.
+    
+    Returns:
+        El conjunto de réplicas configurado.
+    """
+    global _replica_set, _configured
+    if async_mode is None:
+        async_mode = settings.DATABASE_ASYNC
+    _replica_set = (
+        ReplicaSet(
+            urls,
+            async_mode=async_mode,
+            pin_seconds=settings.DATABASE_REPLICA_PIN_SECONDS,
+            retry_seconds=settings.DATABASE_REPLICA_RETRY_SECONDS,
+        )
+        if urls
+        else None
+    )
+    _configured = True
+    return _replica_set
+
+
+def get_replica_set() -> Optional[ReplicaSet]:
+    """Devuelve las réplicas configuradas, creándolas desde Settings al primer uso."""
+    if not _configured:
+        configure_replicas(settings.DATABASE_REPLICA_URLS)
+    return _replica_set
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush(session: Session, flush_context: Any) -> None:
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_dml(orm_execute_state: Any) -> None:
+    # Los UPDATE/DELETE/INSERT explícitos no pasan por el flush
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _pin_writer(session: Session) -> None:
+    """Fija al primario al usuario de una sesión que confirmó escrituras."""
+    has_writes = session.info.pop("has_writes", False)
+    pin_key = session.info.get("replica_pin_key")
+    if has_writes and pin_key is not None and _replica_set is not None:
+        _replica_set.pin(pin_key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_writes(session: Session) -> None:
+    session.info.pop("has_writes", None)
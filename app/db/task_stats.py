@@ -0,0 +1,144 @@
+"""
+Contadores de tareas por usuario (tabla ``task_stats``).
+
+Las rutas que crean, completan o eliminan tareas ajustan los contadores en su
+misma transacción. Para recalcularlos desde la tabla de tareas::
+
+    python -m app.db.task_stats [--user-id <uuid>]
+"""
+import argparse
+from typing import Any, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import case, func, select, text
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+
+from app.models.task import Task
+from app.models.task_stats import TaskStats
+from app.models.user import User
+
+# INSERT ... ON CONFLICT de cada dialecto
+UPSERTS = {
+    "postgresql": postgresql_insert,
+    "sqlite": sqlite_insert,
+}
+
+
+async def adjust_task_stats(
+    db: Any, user_id: UUID, total: int = 0, completed: int = 0
+) -> None:
+    """
+    Suma los incrementos a los contadores del usuario con un único upsert.
+    
+    Args:
+        db: Sesión de base de datos de la escritura.
+        user_id: Usuario dueño de las tareas.
+        total: Variación del número de tareas.
+        completed: Variación del número de tareas completadas.
+    """
+    if not total and not completed:
+        return
+    stmt = UPSERTS[db.bind.dialect.name](TaskStats).values(
+        user_id=user_id, total=total, completed=completed
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskStats.user_id],
+        set_={
+            "total": TaskStats.total + stmt.excluded.total,
+            "completed": TaskStats.completed + stmt.excluded.completed,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def next_change_version(db: Any, user_id: UUID) -> int:
+    """
+    Asigna la siguiente versión de cambios del usuario con un único upsert.
+    
+    La fila de ``task_stats`` queda bloqueada hasta el final de la transacción,
+    así que las escrituras de un mismo usuario se serializan y las versiones se
+    hacen visibles en orden: un lector nunca ve la versión ``n`` sin las
+    anteriores. Las rutas la piden antes de tocar las tareas para bloquear
+    siempre en el mismo orden.
+    
+    Returns:
+        La versión con la que se marcan las tareas escritas en la transacción.
+    """
+    stmt = UPSERTS[db.bind.dialect.name](TaskStats).values(user_id=user_id, change_version=1)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskStats.user_id],
+        set_={"change_version": TaskStats.change_version + 1},
+    ).returning(TaskStats.change_version)
+    return await db.scalar(stmt)
+
+
+async def completion_delta(db: Any, conditions: Sequence[Any], is_completed: bool) -> int:
+    """
+    Calcula cuánto cambiará el número de tareas completadas al fijar
+    ``is_completed`` en las tareas que cumplen ``conditions``. Bloquea esas
+    filas (``FOR UPDATE``) para que dos actualizaciones concurrentes no cuenten
+    la misma transición.
+    """
+    changing = Task.is_completed.isnot(True) if is_completed else Task.is_completed.is_(True)
+    ids = (
+        await db.scalars(select(Task.id).where(*conditions, changing).with_for_update())
+    ).all()
+    return len(ids) if is_completed else -len(ids)
+
+
+def recompute_task_stats(connection: Connection, user_id: Optional[UUID] = None) -> int:
+    """
+    Recalcula los contadores desde la tabla de tareas con un único
+    ``INSERT ... SELECT ... GROUP BY ... ON CONFLICT``, que conserva la versión
+    de cambios de cada usuario.
+    
+    Args:
+        connection: Conexión con una transacción abierta.
+        user_id: Limita el recálculo a un usuario.
+    
+    Returns:
+        El número de usuarios recalculados.
+    """
+    if connection.dialect.name == "postgresql":
+        # Bloquea las escrituras de tareas mientras se recalcula, en el mismo
+        # orden que las rutas (primero task_stats con next_change_version y
+        # después tasks) para no provocar un interbloqueo con ellas
+        connection.execute(text("LOCK TABLE task_stats IN EXCLUSIVE MODE"))
+        connection.execute(text("LOCK TABLE tasks IN SHARE MODE"))
+    
+    completed = func.coalesce(func.sum(case((Task.is_completed.is_(True), 1), else_=0)), 0)
+    source = (
+        select(User.id, func.count(Task.id), completed)
+        .select_from(User)
+        .outerjoin(Task, Task.user_id == User.id)
+        .group_by(User.id)
+    )
+    if user_id is not None:
+        source = source.where(User.id == user_id)
+    
+    stmt = UPSERTS[connection.dialect.name](TaskStats).from_select(
+        ["user_id", "total", "completed"], source
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TaskStats.user_id],
+        set_={"total": stmt.excluded.total, "completed": stmt.excluded.completed},
+    )
+    return connection.execute(stmt).rowcount
+
+
+def main() -> None:
+    from app.db.database import get_engine
+    
+    parser = argparse.ArgumentParser(description="Recalcula los contadores de tareas por usuario")
+    parser.add_argument("--user-id", type=UUID, default=None)
+    args = parser.parse_args()
+    
+    with get_engine().begin() as connection:
+        users = recompute_task_stats(connection, args.user_id)
+    print(f"Contadores recalculados para {users} usuarios")
+
+
+if __name__ == "__main__":
+    main()
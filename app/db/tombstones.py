@@ -0,0 +1,72 @@
+"""
+Tombstones de tareas eliminadas (tabla ``task_tombstones``).
+
+Los borrados dejan un tombstone para que el feed de cambios
+(``GET /api/tasks/changes``) pueda informar de ellos. Para compactar los que
+superan la retención (pensado para un cron diario)::
+
+    python -m app.db.tombstones [--retention-days <días>]
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, insert
+from sqlalchemy.engine import Connection
+
+from app.models.task_tombstone import TaskTombstone
+
+
+async def add_task_tombstones(
+    db: Any, user_id: UUID, task_ids: Sequence[UUID], change_version: int
+) -> None:
+    """Registra en la transacción de la sesión el borrado de ``task_ids``."""
+    if not task_ids:
+        return
+    now = datetime.utcnow()
+    await db.execute(
+        insert(TaskTombstone),
+        [
+            {
+                "task_id": task_id,
+                "user_id": user_id,
+                "change_version": change_version,
+                "deleted_at": now,
+            }
+            for task_id in task_ids
+        ],
+    )
+
+
+def compact_task_tombstones(connection: Connection, retention_days: int) -> int:
+    """
+    Elimina los tombstones con más de ``retention_days`` días. Los tokens del
+    feed emitidos antes de ese plazo se rechazan, así que ningún cliente puede
+    depender de ellos.
+    
+    Returns:
+        El número de tombstones eliminados.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    result = connection.execute(delete(TaskTombstone).where(TaskTombstone.deleted_at < cutoff))
+    return result.rowcount
+
+
+def main() -> None:
+    from app.core.config import settings
+    from app.db.database import get_engine
+    
+    parser = argparse.ArgumentParser(description="Compacta los tombstones de tareas eliminadas")
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.TASK_TOMBSTONE_RETENTION_DAYS
+    )
+    args = parser.parse_args()
+    
+    with get_engine().begin() as connection:
+        removed = compact_task_tombstones(connection, args.retention_days)
+    print(f"Tombstones eliminados: {removed}")
+
+
+if __name__ == "__main__":
+    main()
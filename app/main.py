@@ -1,17 +1,46 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
 
-from app.api.routes import tasks, auth
+from app.api.routes import tasks, auth, metrics, internal
 from app.core.config import settings
-from app.core.middleware import setup_middleware
+from app.core.events import get_task_event_broker
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.middleware import setup_middleware, start_logging, stop_logging
+from app.core.openapi import install_openapi_schema
+from app.core.security import password_hasher
+from app.db.database import get_async_sessionmaker, get_sessionmaker
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Gestiona los recursos que viven mientras la aplicación está en marcha."""
+    start_logging()
+    # El motor del modo en uso se crea aquí, antes de aceptar peticiones, y no al
+    # importar la aplicación
+    if settings.DATABASE_ASYNC:
+        get_async_sessionmaker()
+    else:
+        get_sessionmaker()
+    await get_task_event_broker().start()
+    yield
+    await get_task_event_broker().stop()
+    password_hasher.shutdown()
+    stop_logging()
+
 
 app = FastAPI(
     title="Task List API",
     description="API para administrar una lista de tareas",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
+# Idempotency-Key en las escrituras de tareas (dentro de CORS)
+app.add_middleware(IdempotencyMiddleware, routes=app.routes)
+
 # Configuración de CORS
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +48,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor", "ETag", "Retry-After", "Idempotent-Replayed", "X-Query-Count",
+    ],
 )
 
 # Configurar middleware de logging
@@ -27,6 +59,12 @@ setup_middleware(app)
 # Incluir rutas
 app.include_router(auth.router, prefix="/api", tags=["auth"])
 app.include_router(tasks.router, prefix="/api", tags=["tasks"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router)
+if settings.INTERNAL_ENDPOINTS_ENABLED:
+    app.include_router(internal.router)
+
+install_openapi_schema(app, settings.OPENAPI_SCHEMA_PATH)
 
 @app.get("/", tags=["health"])
 async def health_check():
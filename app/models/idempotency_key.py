@@ -0,0 +1,24 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.database import Base
+
+
+class IdempotencyKey(Base):
+    """Respuesta guardada de una petición con ``Idempotency-Key`` (sin status: en curso)."""
+    
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        Index("ix_idempotency_keys_expires_at", "expires_at"),
+    )
+    
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    headers = Column(Text, nullable=True)
+    body = Column(LargeBinary, nullable=True)
+    locked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import BigInteger, Column, String, DateTime, Boolean, Text, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -9,6 +9,27 @@ from app.db.database import Base
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # Soporta el listado por usuario y la paginación por cursor (created_at, id)
+        Index("ix_tasks_user_id_created_at_id", "user_id", "created_at", "id"),
+        # Ordenación y filtros del listado (sort, updated_since, is_completed)
+        Index("ix_tasks_user_id_updated_at_id", "user_id", "updated_at", "id"),
+        Index("ix_tasks_user_id_title_id", "user_id", "title", "id"),
+        Index(
+            "ix_tasks_user_id_is_completed_created_at_id",
+            "user_id", "is_completed", "created_at", "id",
+        ),
+        # Índice parcial de las tareas pendientes por fecha de modificación; el
+        # predicado coincide con el literal que emite el filtro is_completed=false
+        Index(
+            "ix_tasks_pending_user_id_updated_at_id",
+            "user_id", "updated_at", "id",
+            postgresql_where=text("is_completed = false"),
+            sqlite_where=text("is_completed = 0"),
+        ),
+        # Feed de cambios: tareas modificadas después de una versión
+        Index("ix_tasks_user_id_change_version_id", "user_id", "change_version", "id"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     title = Column(String(255), nullable=False)
@@ -16,6 +37,8 @@ class Task(Base):
     is_completed = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Versión de cambios del usuario en la última escritura (ver next_change_version)
+    change_version = Column(BigInteger, nullable=False, default=0, server_default="0")
     
     # Relación con el usuario
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
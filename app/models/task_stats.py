@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.database import Base
+
+
+class TaskStats(Base):
+    """Contadores de tareas por usuario, mantenidos en la misma transacción que las escrituras."""
+    
+    __tablename__ = "task_stats"
+    
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True
+    )
+    total = Column(Integer, nullable=False, default=0, server_default="0")
+    completed = Column(Integer, nullable=False, default=0, server_default="0")
+    # Última versión de cambios asignada a las tareas del usuario (sincronización)
+    change_version = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.database import Base
+
+
+class TaskTombstone(Base):
+    """Rastro de una tarea eliminada para el feed de cambios; se compacta tras la retención."""
+    
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_id_change_version_task_id", "user_id", "change_version", "task_id"),
+        Index("ix_task_tombstones_deleted_at", "deleted_at"),
+    )
+    
+    task_id = Column(UUID(as_uuid=True), primary_key=True)
+    user_id = Column(
+        UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False
+    )
+    change_version = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
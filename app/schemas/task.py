@@ -1,8 +1,15 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
+
+
+# Ordenaciones admitidas en el listado; "-" delante indica orden descendente
+TaskSort = Literal["created_at", "-created_at", "updated_at", "-updated_at", "title", "-title"]
+
+# Formatos de exportación e importación de tareas
+TaskFileFormat = Literal["ndjson", "csv"]
 
 
 class TaskBase(BaseModel):
@@ -29,3 +36,64 @@ class TaskResponse(TaskBase):
 
     class Config:
         orm_mode = True
+
+
+class TaskBatchCreate(BaseModel):
+    items: List[TaskCreate] = Field(..., min_length=1)
+
+
+class TaskBatchUpdateItem(TaskUpdate):
+    id: UUID
+
+
+class TaskBatchUpdate(BaseModel):
+    items: List[TaskBatchUpdateItem] = Field(..., min_length=1)
+
+    @field_validator("items")
+    @classmethod
+    def unique_ids(cls, items: List[TaskBatchUpdateItem]) -> List[TaskBatchUpdateItem]:
+        # Las actualizaciones se agrupan por valores, así que no tienen orden
+        ids = [item.id for item in items]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Cada tarea solo puede aparecer una vez en el lote")
+        return items
+
+
+class TaskBatchDelete(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1)
+
+
+class TaskBatchResult(BaseModel):
+    id: UUID
+    status: Literal["created", "updated", "deleted", "not_found"]
+    task: Optional[TaskResponse] = None
+
+
+class TaskBatchResponse(BaseModel):
+    results: List[TaskBatchResult]
+
+
+class TaskImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: List[TaskImportError]
+    seconds: float
+    rows_per_second: float
+
+
+class TaskChangesResponse(BaseModel):
+    tasks: List[TaskResponse]
+    deleted: List[UUID]
+    next_token: str
+    has_more: bool
+
+
+class TaskStatsResponse(BaseModel):
+    total: int
+    completed: int
+    pending: int
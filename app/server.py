@@ -0,0 +1,265 @@
+"""
+Punto de entrada de producción: arranca ``SERVER_WORKERS`` procesos de uvicorn
+(por defecto uno por CPU) que comparten el socket::
+
+    python -m app.server
+
+Antes de lanzar los workers reparte entre ellos los recursos que se dimensionan
+por proceso:
+
+- Las conexiones a la base de datos: con ``DB_MAX_CONNECTIONS``, cada worker
+  reduce ``DB_POOL_SIZE`` y ``DB_MAX_OVERFLOW`` para que la suma de todos los
+  pools no supere el máximo (el mismo límite se aplica a cada réplica).
+- El pool de bcrypt: sin ``PASSWORD_HASH_WORKERS``, las CPU se reparten entre
+  los workers en lugar de lanzar un proceso por CPU en cada uno.
+
+Los valores se pasan a los workers como variables de entorno. Con SIGTERM o
+SIGINT cada worker deja de aceptar conexiones, cierra los streams de eventos
+(SSE), espera a las peticiones en curso (hasta
+``SERVER_GRACEFUL_SHUTDOWN_SECONDS``) y ejecuta el lifespan de cierre. Un worker
+que termina inesperadamente se reemplaza, salvo que se superen
+``WORKER_MAX_RESTARTS`` reinicios en ``WORKER_RESTART_WINDOW_SECONDS`` (p. ej. un
+worker que no llega a arrancar por una configuración errónea): entonces el
+supervisor se detiene con código de salida 1.
+
+Con varios workers, los eventos, la idempotencia y el rate limiting necesitan
+un backend compartido: si alguno es ``memory`` el servidor no arranca.
+"""
+import logging
+import os
+import socket
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+from uvicorn.supervisors import Multiprocess
+
+from app.core.config import settings
+from app.core.events import get_task_event_broker
+
+logger = logging.getLogger("uvicorn.error")
+
+# Segundos entre dos comprobaciones de los workers vivos
+WORKER_CHECK_SECONDS = 1.0
+# Reinicios de workers admitidos por ventana antes de detener el supervisor
+WORKER_MAX_RESTARTS = 5
+WORKER_RESTART_WINDOW_SECONDS = 60.0
+
+
+def split_pool_budget(
+    max_connections: int,
+    workers: int,
+    pool_size: int,
+    max_overflow: int,
+    pools: int = 1,
+    reserved: int = 0,
+) -> Tuple[int, int]:
+    """
+    Reparte el máximo de conexiones entre los workers.
+    
+    Args:
+        max_connections: Conexiones máximas entre todos los workers.
+        workers: Número de workers.
+        pool_size: ``DB_POOL_SIZE`` configurado.
+        max_overflow: ``DB_MAX_OVERFLOW`` configurado.
+        pools: Pools de conexiones que abre cada worker.
+        reserved: Conexiones de cada worker fuera de los pools.
+    
+    Returns:
+        ``(pool_size, max_overflow)`` de cada worker, de modo que
+        ``workers * (pools * (pool_size + max_overflow) + reserved)`` no supera
+        ``max_connections``.
+    
+    Raises:
+        ValueError: Si no alcanza para una conexión por pool en cada worker.
+    """
+    per_pool = (max_connections // workers - reserved) // pools
+    if per_pool < 1:
+        raise ValueError(
+            f"DB_MAX_CONNECTIONS={max_connections} no alcanza para {workers} workers; "
+            "reduce SERVER_WORKERS o aumenta el máximo"
+        )
+    pool_size = min(pool_size, per_pool)
+    return pool_size, min(max_overflow, per_pool - pool_size)
+
+
+def worker_environment(workers: int, cpu_count: int) -> Dict[str, str]:
+    """
+    Devuelve las variables de entorno que dimensionan los recursos de cada worker.
+    
+    Raises:
+        ValueError: Si ``DB_MAX_CONNECTIONS`` no alcanza para los workers.
+    """
+    env = {}
+    if settings.DB_MAX_CONNECTIONS is not None:
+        # El almacén de idempotencia en base de datos usa el motor asíncrono
+        # aunque las rutas usen el síncrono; el LISTEN de eventos es una conexión más
+        shared_async = settings.IDEMPOTENCY_BACKEND == "database" and not settings.DATABASE_ASYNC
+        pools = 2 if shared_async else 1
+        reserved = 1 if settings.TASK_EVENTS_BACKEND == "postgres" else 0
+        pool_size, max_overflow = split_pool_budget(
+            settings.DB_MAX_CONNECTIONS,
+            workers,
+            settings.DB_POOL_SIZE,
+            settings.DB_MAX_OVERFLOW,
+            pools=pools,
+            reserved=reserved,
+        )
+        env["DB_POOL_SIZE"] = str(pool_size)
+        env["DB_MAX_OVERFLOW"] = str(max_overflow)
+    if settings.PASSWORD_HASH_WORKERS is None:
+        env["PASSWORD_HASH_WORKERS"] = str(max(cpu_count // workers, 1))
+    return env
+
+
+def check_shared_backends(workers: int) -> None:
+    """
+    Comprueba que el estado que deben compartir los workers no sea por proceso.
+    
+    Con ``memory``, cada worker tendría sus propios eventos, respuestas de
+    idempotencia y buckets de rate limiting: un cliente SSE no vería los cambios
+    hechos en otro worker, un reintento que llega a otro worker se ejecutaría de
+    nuevo y cada límite se multiplicaría por el número de workers. La caché de
+    usuarios y los pins de lectura de las réplicas son siempre por worker, así
+    que solo se avisa de su efecto.
+    
+    Raises:
+        ValueError: Si hay varios workers y algún backend compartido es ``memory``.
+    """
+    if workers == 1:
+        return
+    backends = {
+        "TASK_EVENTS_BACKEND": settings.TASK_EVENTS_BACKEND,
+        "IDEMPOTENCY_BACKEND": settings.IDEMPOTENCY_BACKEND,
+    }
+    if settings.RATE_LIMIT_ENABLED:
+        backends["RATE_LIMIT_BACKEND"] = settings.RATE_LIMIT_BACKEND
+    local = [name for name, backend in backends.items() if backend == "memory"]
+    if local:
+        raise ValueError(
+            f"{workers} workers no pueden compartir el estado en memoria de "
+            f"{', '.join(local)}: configura un backend compartido o usa SERVER_WORKERS=1"
+        )
+    if settings.PRINCIPAL_CACHE_SIZE and settings.PRINCIPAL_CACHE_TTL_SECONDS:
+        logger.warning(
+            "La caché de usuarios es por worker: un usuario desactivado puede seguir "
+            "autenticándose en otros workers durante PRINCIPAL_CACHE_TTL_SECONDS (%ss)",
+            settings.PRINCIPAL_CACHE_TTL_SECONDS,
+        )
+    if settings.DATABASE_REPLICA_URLS:
+        logger.warning(
+            "Los pins de lectura de las réplicas son por worker: una lectura que llega "
+            "a otro worker tras una escritura puede no verla hasta que la réplica se ponga al día"
+        )
+
+
+class DrainingServer(uvicorn.Server):
+    """
+    Servidor de uvicorn que cierra los streams de eventos al recibir la señal
+    de parada.
+    
+    uvicorn espera a que terminen las peticiones en curso antes de ejecutar el
+    lifespan de cierre, y una conexión SSE no termina por sí sola: sin
+    cerrarlas aquí, cada parada agotaría ``SERVER_GRACEFUL_SHUTDOWN_SECONDS``.
+    """
+    
+    async def shutdown(self, sockets: Optional[List[socket.socket]] = None) -> None:
+        get_task_event_broker().close_subscriptions()
+        await super().shutdown(sockets=sockets)
+
+
+class WorkerSupervisor(Multiprocess):
+    """
+    Supervisor de uvicorn que además reemplaza los workers que terminan sin que
+    se haya pedido la parada (p. ej. por falta de memoria).
+    """
+    
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Momentos (monotónicos) de los últimos reinicios
+        self.restarts: Deque[float] = deque()
+        self.failed = False
+    
+    def run(self) -> None:
+        self.startup()
+        while not self.should_exit.wait(WORKER_CHECK_SECONDS):
+            if not self.restart_dead_workers():
+                break
+        self.shutdown()
+    
+    def restart_dead_workers(self) -> bool:
+        """
+        Reemplaza los workers caídos.
+        
+        Returns:
+            ``False`` si se superó el límite de reinicios y hay que detenerse.
+        """
+        for index, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            process.join()
+            now = time.monotonic()
+            while self.restarts and now - self.restarts[0] > WORKER_RESTART_WINDOW_SECONDS:
+                self.restarts.popleft()
+            if len(self.restarts) >= WORKER_MAX_RESTARTS:
+                logger.error(
+                    f"El worker [{process.pid}] terminó con código {process.exitcode} y ya "
+                    f"hubo {WORKER_MAX_RESTARTS} reinicios en {WORKER_RESTART_WINDOW_SECONDS:g}s; "
+                    "se detiene el servidor"
+                )
+                self.failed = True
+                return False
+            self.restarts.append(now)
+            logger.warning(
+                f"El worker [{process.pid}] terminó con código {process.exitcode}; se reemplaza"
+            )
+            replacement = get_subprocess(config=self.config, target=self.target, sockets=self.sockets)
+            replacement.start()
+            self.processes[index] = replacement
+        return True
+
+
+def build_config(workers: int) -> uvicorn.Config:
+    """Configuración de uvicorn a partir de Settings."""
+    return uvicorn.Config(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=workers,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+    )
+
+
+def main() -> None:
+    cpu_count = os.cpu_count() or 1
+    workers = settings.SERVER_WORKERS or cpu_count
+    try:
+        check_shared_backends(workers)
+        env = worker_environment(workers, cpu_count)
+    except ValueError as e:
+        sys.exit(str(e))
+    # Los workers se lanzan con spawn y leen Settings del entorno heredado
+    os.environ.update(env)
+    for name, value in env.items():
+        setattr(settings, name, int(value))
+    
+    config = build_config(workers)
+    server = DrainingServer(config)
+    if workers == 1:
+        server.run()
+    else:
+        sockets = [config.bind_socket()]
+        supervisor = WorkerSupervisor(config, target=server.run, sockets=sockets)
+        supervisor.run()
+        if supervisor.failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
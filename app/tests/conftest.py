@@ -1,15 +1,34 @@
 import os
+
+# Las métricas y los endpoints de diagnóstico están desactivados por defecto;
+# los tests los montan
+os.environ.setdefault("METRICS_ENABLED", "true")
+os.environ.setdefault("INTERNAL_ENDPOINTS_ENABLED", "true")
+
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool, StaticPool
 
 from app.core.config import settings
-from app.db.database import Base, get_db
+from app.core.deps import principal_cache
+from app.core.idempotency import get_idempotency_store
+from app.core.querycount import assert_max_queries
+from app.core.ratelimit import get_rate_limit_backend
+from app.db.database import Base, ThreadedSession, get_async_database_url, get_db
 from app.main import app
 from app.models.user import User
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash, password_hasher
+
+
+@compiles(PG_UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw) -> str:
+    """Permite crear las tablas en SQLite: los UUID se guardan como texto."""
+    return "CHAR(32)"
 
 
 # Configuración de la base de datos de prueba
@@ -22,6 +41,14 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor asíncrono (aiosqlite) sobre el mismo fichero de base de datos
+async_engine = create_async_engine(
+    get_async_database_url(TEST_DATABASE_URL), poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="function")
 def db():
@@ -41,22 +68,97 @@ def db():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(scope="session", autouse=True)
+def password_hashing_pool():
+    """
+    Reutiliza el pool de procesos de bcrypt en toda la sesión de tests en lugar
+    de recrearlo cada vez que un TestClient cierra la aplicación.
+    """
+    shutdown = password_hasher.shutdown
+    password_hasher.shutdown = lambda: None
+    yield
+    shutdown()
+
+
+@pytest.fixture(autouse=True)
+def clear_principal_cache():
+    """
+    Vacía la caché de usuarios autenticados entre tests.
+    """
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limits():
+    """
+    Reinicia los límites de peticiones entre tests.
+    """
+    get_rate_limit_backend().clear()
+    yield
+    get_rate_limit_backend().clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_idempotency_keys():
+    """
+    Reinicia las respuestas guardadas por Idempotency-Key entre tests.
+    """
+    get_idempotency_store().clear()
+    yield
+    get_idempotency_store().clear()
+
+
 @pytest.fixture(scope="function")
-def client(db):
+def max_queries():
+    """
+    Presupuesto de sentencias SQL: ``with max_queries(3): client.get(...)`` falla
+    si el bloque ejecuta más de 3 sentencias.
+    """
+    return assert_max_queries
+
+
+@pytest.fixture(scope="function", params=["sync", "async"])
+def db_mode(request):
+    """
+    Ejecuta cada test contra el driver síncrono (en el threadpool) y el asíncrono.
+    """
+    return request.param
+
+
+@pytest.fixture(scope="function")
+def client(db, db_mode):
     """
     Crea un cliente de prueba para la API.
     """
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass
+    if db_mode == "sync":
+        async def override_get_db():
+            yield ThreadedSession(db)
+    else:
+        async def override_get_db():
+            async with TestingAsyncSessionLocal() as session:
+                yield session
     
     app.dependency_overrides[get_db] = override_get_db
     with TestClient(app) as c:
+        if db_mode == "async":
+            # La API escribe con otra conexión: tras cada petición se expiran los
+            # atributos cargados en la sesión de prueba (salvo la clave primaria,
+            # que sigue siendo accesible aunque la fila se haya eliminado)
+            c.event_hooks["response"].append(lambda response: _expire_loaded_state(db))
         yield c
 
 
+def _expire_loaded_state(session):
+    for obj in list(session.identity_map.values()):
+        mapper = inspect(obj).mapper
+        session.expire(
+            obj,
+            [prop.key for prop in mapper.column_attrs if not prop.columns[0].primary_key],
+        )
+
+
 @pytest.fixture(scope="function")
 def test_user(db):
     """
@@ -1,18 +1,25 @@
+import time
+
 import pytest
+import rsa
 from fastapi import status
+from jose import JWTError, jwt
 
-from app.core.security import get_password_hash
+from app.core import security
+from app.core.deps import principal_cache
+from app.core.security import TokenVerifier, get_password_hash, password_hasher, token_verifier
 from app.models.user import User
 
 
-def test_register_user(client, db):
+def test_register_user(client, db, max_queries):
     """Test para registrar un nuevo usuario."""
     user_data = {
         "email": "newuser@example.com",
         "username": "newuser",
         "password": "password123",
     }
-    response = client.post("/api/auth/register", json=user_data)
+    with max_queries(4):
+        response = client.post("/api/auth/register", json=user_data)
     
     assert response.status_code == status.HTTP_201_CREATED
     data = response.json()
@@ -52,13 +59,14 @@ def test_register_user_duplicate_username(client, test_user):
     assert "nombre de usuario ya está registrado" in response.json()["detail"]
 
 
-def test_login_user(client, test_user):
+def test_login_user(client, test_user, max_queries):
     """Test para iniciar sesión con un usuario existente."""
     login_data = {
         "username": test_user.email,
         "password": "password123",
     }
-    response = client.post("/api/auth/login", data=login_data)
+    with max_queries(1):
+        response = client.post("/api/auth/login", data=login_data)
     
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
@@ -66,13 +74,106 @@ def test_login_user(client, test_user):
     assert data["token_type"] == "bearer"
 
 
-def test_login_user_invalid_credentials(client, test_user):
+def test_login_user_invalid_credentials(client, test_user, max_queries):
     """Test para verificar que no se puede iniciar sesión con credenciales inválidas."""
     login_data = {
         "username": test_user.email,
         "password": "wrongpassword",
     }
-    response = client.post("/api/auth/login", data=login_data)
+    with max_queries(1):
+        response = client.post("/api/auth/login", data=login_data)
     
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
     assert "Email o contraseña incorrectos" in response.json()["detail"]
+
+
+def test_current_user_is_cached(client, token_headers, max_queries):
+    """Test para verificar que las peticiones autenticadas reutilizan la caché de usuarios."""
+    client.get("/api/tasks", headers=token_headers)
+    misses = principal_cache.stats()["misses"]
+    
+    # Sin consultar el usuario: solo la versión del listado y las tareas
+    with max_queries(2):
+        response = client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert principal_cache.stats()["misses"] == misses
+    assert principal_cache.stats()["hits"] >= 1
+
+
+def test_deactivated_user_invalidates_cache(client, db, token_headers, test_user):
+    """Test para verificar que desactivar un usuario invalida su entrada en caché."""
+    assert client.get("/api/tasks", headers=token_headers).status_code == status.HTTP_200_OK
+    
+    test_user.is_active = False
+    db.commit()
+    
+    response = client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "Usuario inactivo" in response.json()["detail"]
+
+
+def test_login_rejected_when_hashing_pool_is_full(client, test_user, monkeypatch):
+    """Test para verificar que el login responde 503 si la cola de bcrypt está llena."""
+    monkeypatch.setattr(password_hasher, "capacity", 0)
+    login_data = {
+        "username": test_user.email,
+        "password": "password123",
+    }
+    response = client.post("/api/auth/login", data=login_data)
+    
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["Retry-After"] == "1"
+
+
+def test_verified_tokens_are_cached(client, token_headers, monkeypatch):
+    """Test para verificar que un token ya verificado no se vuelve a decodificar."""
+    client.get("/api/tasks", headers=token_headers)
+    
+    def fail_decode(*args, **kwargs):
+        raise AssertionError("El token no debería decodificarse de nuevo")
+    
+    monkeypatch.setattr(security.jwt, "decode", fail_decode)
+    response = client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert token_verifier.cache.stats()["hits"] >= 1
+
+
+def test_token_verifier_rejects_expired_and_tampered_tokens():
+    """Test para verificar que solo se aceptan tokens válidos y vigentes."""
+    verifier = TokenVerifier("HS256", secret_key="secreto")
+    token = verifier.sign({"sub": "user", "exp": int(time.time()) + 60})
+    assert verifier.verify(token)["sub"] == "user"
+    
+    with pytest.raises(JWTError):
+        verifier.verify(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+    with pytest.raises(JWTError):
+        verifier.verify(verifier.sign({"sub": "user", "exp": int(time.time()) - 1}))
+    assert verifier.jwks() == {"keys": []}
+
+
+def test_token_verifier_asymmetric():
+    """Test para verificar tokens RS256 con solo la clave pública publicada en el JWKS."""
+    public_key, private_key = rsa.newkeys(1024)
+    signer = TokenVerifier("RS256", private_key=private_key.save_pkcs1().decode())
+    verifier = TokenVerifier("RS256", public_key=public_key.save_pkcs1().decode())
+    token = signer.sign({"sub": "user", "exp": int(time.time()) + 60})
+    
+    assert verifier.verify(token)["sub"] == "user"
+    assert jwt.get_unverified_header(token)["kid"] == verifier.key_id
+    (jwk_key,) = signer.jwks()["keys"]
+    assert jwk_key["kid"] == signer.key_id == verifier.key_id
+    assert "d" not in jwk_key
+    assert jwt.decode(token, jwk_key, algorithms=["RS256"])["sub"] == "user"
+    with pytest.raises(RuntimeError):
+        verifier.sign({"sub": "user"})
+
+
+def test_jwks_endpoint(client):
+    """Test para verificar que el JWKS no expone el secreto compartido."""
+    response = client.get("/api/auth/jwks")
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"keys": []}
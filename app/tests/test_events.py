@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import status
+
+from app.core.events import (
+    RESYNC_EVENT,
+    TaskEventBroker,
+    get_task_event_broker,
+    record_task_event,
+    task_event_stream,
+)
+
+
+@pytest.fixture(scope="function")
+def event_loop_subscription(client, test_user):
+    """
+    Suscribe al usuario de prueba desde un bucle propio; los eventos que
+    publica la API se entregan en ese bucle al ejecutarlo.
+    """
+    broker = get_task_event_broker()
+    loop = asyncio.new_event_loop()
+    
+    async def subscribe():
+        return broker.subscribe(test_user.id)
+    
+    subscription = loop.run_until_complete(subscribe())
+    
+    async def received():
+        await asyncio.sleep(0)
+        events = []
+        while not subscription.queue.empty():
+            events.append(subscription.queue.get_nowait())
+        return events
+    
+    try:
+        yield lambda: loop.run_until_complete(received())
+    finally:
+        broker.unsubscribe(subscription)
+        loop.close()
+
+
+def test_task_routes_publish_events(client, token_headers, event_loop_subscription):
+    """Test para verificar que las escrituras publican un evento al confirmarse."""
+    task = client.post("/api/tasks", json={"title": "Tarea"}, headers=token_headers).json()
+    client.put(f"/api/tasks/{task['id']}", json={"title": "Renombrada"}, headers=token_headers)
+    client.delete(f"/api/tasks/{task['id']}", headers=token_headers)
+    # Una escritura rechazada no publica nada
+    client.put(f"/api/tasks/{uuid.uuid4()}", json={"title": "Otra"}, headers=token_headers)
+    
+    events = event_loop_subscription()
+    assert [event["type"] for event in events] == ["created", "updated", "deleted"]
+    assert all(event["ids"] == [task["id"]] for event in events)
+    assert [event["change_version"] for event in events] == [1, 2, 3]
+
+
+def test_task_events_discarded_on_rollback(db, test_user, event_loop_subscription):
+    """Test para verificar que una transacción revertida no publica eventos."""
+    record_task_event(db, test_user.id, "created", [uuid.uuid4()], 1)
+    db.rollback()
+    assert event_loop_subscription() == []
+    
+    record_task_event(db, test_user.id, "created", None, 2)
+    db.commit()
+    assert event_loop_subscription() == [{"type": "created", "ids": None, "change_version": 2}]
+
+
+def test_task_events_require_auth(client):
+    """Test para verificar que el canal de eventos exige autenticación."""
+    response = client.get("/api/tasks/events")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_slow_subscriber_gets_resync():
+    """Test para verificar que una cola llena se descarta y se pide resync."""
+    async def scenario():
+        broker = TaskEventBroker(queue_size=2)
+        user_id = uuid.uuid4()
+        subscription = broker.subscribe(user_id)
+        for version in range(1, 4):
+            broker.deliver(user_id, {"type": "updated", "ids": None, "change_version": version})
+        
+        assert await subscription.get(timeout=1) == RESYNC_EVENT
+        assert broker.overflows == 1
+        broker.deliver(user_id, {"type": "deleted", "ids": None, "change_version": 4})
+        assert (await subscription.get(timeout=1))["change_version"] == 4
+        assert await subscription.get(timeout=0.01) is None
+    
+    asyncio.run(scenario())
+
+
+def test_task_event_stream():
+    """Test para verificar el formato SSE, el heartbeat y el cierre del stream."""
+    async def scenario():
+        broker = TaskEventBroker(queue_size=10)
+        user_id = uuid.uuid4()
+        subscription = broker.subscribe(user_id)
+        stream = task_event_stream(broker, subscription, heartbeat=0.01)
+        
+        assert await stream.__anext__() == b"retry: 5000\n\n"
+        assert await stream.__anext__() == b": ping\n\n"
+        broker.deliver(user_id, {"type": "created", "ids": ["a"], "change_version": 7})
+        assert await stream.__anext__() == (
+            b'event: created\ndata: {"ids":["a"],"change_version":7}\n\n'
+        )
+        
+        await broker.stop()
+        with pytest.raises(StopAsyncIteration):
+            await stream.__anext__()
+        assert broker.connections == 0
+    
+    asyncio.run(scenario())
@@ -0,0 +1,141 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import status
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.idempotency import (
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+    MemoryIdempotencyStore,
+    StoredResponse,
+)
+from app.db.idempotency import DatabaseIdempotencyStore, purge_expired_idempotency_keys
+from app.models.idempotency_key import IdempotencyKey
+
+
+def test_idempotent_create_task_replayed(client, token_headers):
+    """Test para verificar que un reintento con la misma clave no crea otra tarea."""
+    headers = {**token_headers, "Idempotency-Key": "crear-1"}
+    first = client.post("/api/tasks", json={"title": "Tarea"}, headers=headers)
+    retry = client.post("/api/tasks", json={"title": "Tarea"}, headers=headers)
+    
+    assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+    assert retry.json() == first.json()
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert len(client.get("/api/tasks", headers=token_headers).json()) == 1
+    assert client.get("/api/tasks/stats", headers=token_headers).json()["total"] == 1
+    
+    # Sin la cabecera cada petición se ejecuta
+    client.post("/api/tasks", json={"title": "Tarea"}, headers=token_headers)
+    assert len(client.get("/api/tasks", headers=token_headers).json()) == 2
+
+
+def test_idempotency_key_errors(client, token_headers):
+    """Test para verificar los errores de una Idempotency-Key mal usada."""
+    headers = {**token_headers, "Idempotency-Key": "clave"}
+    task = client.post("/api/tasks", json={"title": "Tarea"}, headers=headers).json()
+    
+    # La misma clave con otro cuerpo o en otra ruta
+    response = client.post("/api/tasks", json={"title": "Otra"}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    response = client.delete(f"/api/tasks/{task['id']}", headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    response = client.post(
+        "/api/tasks", json={"title": "Tarea"}, headers={**token_headers, "Idempotency-Key": "x" * 256}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    # Un 404 también se guarda y se repite
+    headers = {**token_headers, "Idempotency-Key": "borrar"}
+    missing = f"/api/tasks/{uuid.uuid4()}"
+    assert client.delete(missing, headers=headers).status_code == status.HTTP_404_NOT_FOUND
+    response = client.delete(missing, headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert response.headers["idempotent-replayed"] == "true"
+
+
+def test_memory_store_waits_for_in_flight():
+    """Test para verificar que un duplicado espera a la petición en curso."""
+    async def scenario():
+        store = MemoryIdempotencyStore(ttl=60, max_keys=10, wait_seconds=1)
+        user_id = uuid.uuid4()
+        assert await store.claim(user_id, "k", "a") is None
+        
+        duplicate = asyncio.ensure_future(store.claim(user_id, "k", "a"))
+        await asyncio.sleep(0)
+        assert not duplicate.done()
+        with pytest.raises(IdempotencyKeyReused):
+            await store.claim(user_id, "k", "b")
+        
+        await store.complete(user_id, "k", StoredResponse("a", 201, [], b"{}"))
+        assert (await duplicate).status_code == 201
+        
+        # Tras liberar sin respuesta, el siguiente duplicado se ejecuta
+        assert await store.claim(user_id, "otra", "a") is None
+        await store.release(user_id, "otra")
+        assert await store.claim(user_id, "otra", "a") is None
+        
+        store.wait_seconds = 0.01
+        with pytest.raises(IdempotencyKeyInProgress):
+            await store.claim(user_id, "otra", "a")
+    
+    asyncio.run(scenario())
+
+
+def test_database_store():
+    """Test para verificar el almacén compartido en la tabla idempotency_keys."""
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with engine.begin() as connection:
+            await connection.run_sync(IdempotencyKey.__table__.create)
+        store = DatabaseIdempotencyStore(
+            ttl=60,
+            wait_seconds=1,
+            lock_seconds=60,
+            session_factory=async_sessionmaker(engine, expire_on_commit=False),
+            poll_seconds=0.01,
+        )
+        user_id = uuid.uuid4()
+        
+        assert await store.claim(user_id, "k", "a") is None
+        duplicate = asyncio.ensure_future(store.claim(user_id, "k", "a"))
+        await asyncio.sleep(0.03)
+        assert not duplicate.done()
+        with pytest.raises(IdempotencyKeyReused):
+            await store.claim(user_id, "k", "b")
+        
+        await store.complete(
+            user_id, "k", StoredResponse("a", 201, [("content-type", "application/json")], b"{}")
+        )
+        stored = await duplicate
+        assert (stored.status_code, stored.headers, stored.body) == (
+            201, [("content-type", "application/json")], b"{}"
+        )
+        
+        # Una reserva abandonada se toma al superar lock_seconds
+        assert await store.claim(user_id, "caida", "a") is None
+        store.wait_seconds = 0.02
+        with pytest.raises(IdempotencyKeyInProgress):
+            await store.claim(user_id, "caida", "a")
+        store.lock_seconds = 0
+        assert await store.claim(user_id, "caida", "a") is None
+        await store.release(user_id, "caida")
+        assert await store.claim(user_id, "caida", "a") is None
+        
+        # Purga de claves caducadas
+        async with engine.begin() as connection:
+            await connection.execute(
+                IdempotencyKey.__table__.update().values(
+                    expires_at=datetime.utcnow() - timedelta(seconds=1)
+                )
+            )
+            assert await connection.run_sync(purge_expired_idempotency_keys) == 2
+        await engine.dispose()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,78 @@
+import logging
+from logging.handlers import QueueHandler
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.middleware import (
+    LoggingMiddleware,
+    QueryCountMiddleware,
+    start_logging,
+    stop_logging,
+)
+from app.main import app as api_app
+
+
+def create_app(sample_rate: float) -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(LoggingMiddleware, sample_rate=sample_rate)
+    
+    @app.get("/ok")
+    async def ok():
+        return {"status": "ok"}
+    
+    @app.get("/missing")
+    async def missing():
+        raise HTTPException(status_code=404, detail="Not found")
+    
+    return app
+
+
+def test_logging_middleware_records_request(caplog):
+    """Test para verificar que se registran método, ruta, cliente y estado."""
+    with caplog.at_level(logging.INFO, logger="app.core.middleware"):
+        TestClient(create_app(sample_rate=1.0)).get("/ok")
+    
+    messages = [
+        record.getMessage() for record in caplog.records if record.name == "app.core.middleware"
+    ]
+    assert len(messages) == 1
+    assert "Request: GET /ok - Client: testclient - Status: 200" in messages[0]
+
+
+def test_logging_middleware_samples_successful_requests(caplog):
+    """Test para verificar que el muestreo descarta respuestas correctas pero no errores."""
+    client = TestClient(create_app(sample_rate=0.0))
+    with caplog.at_level(logging.INFO, logger="app.core.middleware"):
+        client.get("/ok")
+        client.get("/missing")
+    
+    messages = [
+        record.getMessage() for record in caplog.records if record.name == "app.core.middleware"
+    ]
+    assert len(messages) == 1
+    assert "GET /missing" in messages[0]
+    assert "Status: 404" in messages[0]
+
+
+def test_stop_logging_detaches_queue_handler():
+    """Test para verificar que tras la parada los registros no se acumulan en la cola."""
+    root = logging.getLogger()
+    stop_logging()
+    start_logging()
+    assert sum(isinstance(handler, QueueHandler) for handler in root.handlers) == 1
+    
+    stop_logging()
+    
+    assert not any(isinstance(handler, QueueHandler) for handler in root.handlers)
+
+
+def test_query_count_header(client, token_headers):
+    """Test para verificar que con QUERY_COUNT_HEADER las respuestas llevan X-Query-Count."""
+    debug_client = TestClient(QueryCountMiddleware(api_app))
+    
+    response = debug_client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == 200
+    assert int(response.headers["x-query-count"]) > 0
+    assert "x-query-count" not in client.get("/api/tasks", headers=token_headers).headers
@@ -0,0 +1,131 @@
+import pytest
+from fastapi import status
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import ratelimit
+from app.core.config import settings
+from app.core.ratelimit import MemoryRateLimitBackend, parse_rule
+from app.core.security import password_hasher
+
+
+@pytest.fixture(scope="function")
+def rate_limits(monkeypatch):
+    """Sustituye los límites configurados por los del test."""
+    def configure(**limits):
+        monkeypatch.setattr(settings, "RATE_LIMITS", limits)
+    return configure
+
+
+@pytest.fixture(scope="function")
+def statement_count():
+    """Cuenta las sentencias SQL que se ejecutan durante el test."""
+    statements = []
+    
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield lambda: len(statements)
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_login_rate_limited_by_email(client, test_user, rate_limits, statement_count, monkeypatch):
+    """Test para verificar que un login rechazado no consulta la base de datos ni ejecuta bcrypt."""
+    rate_limits(login=["email:2/minute"])
+    # Reloj fijo: bcrypt es lento y el cubo se repondría entre peticiones
+    monkeypatch.setattr(ratelimit, "_backend", MemoryRateLimitBackend(100, clock=lambda: 0.0))
+    email = test_user.email
+    credentials = {"username": email, "password": "incorrecta"}
+    for _ in range(2):
+        response = client.post("/api/auth/login", data=credentials)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    
+    verify_calls = []
+    monkeypatch.setattr(password_hasher, "verify", lambda *args: verify_calls.append(args))
+    before = statement_count()
+    response = client.post(
+        "/api/auth/login", data={**credentials, "username": email.upper()}
+    )
+    
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) == 30
+    assert statement_count() == before
+    assert verify_calls == []
+    
+    # Otro email tiene su propio cupo
+    response = client.post(
+        "/api/auth/login", data={"username": "otro@example.com", "password": "x"}
+    )
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_login_rate_limit_ignores_malformed_json(client, rate_limits):
+    """Test para verificar que un cuerpo JSON inválido en el login no rompe el límite por email."""
+    rate_limits(login=["email:2/minute"])
+    
+    for body in ("{no es json", ""):
+        response = client.post(
+            "/api/auth/login",
+            content=body,
+            headers={"Content-Type": "application/json"},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_register_rate_limited_by_ip(client, rate_limits):
+    """Test para verificar el límite de registros por IP."""
+    rate_limits(register=["ip:1/hour"])
+    user = {"email": "nuevo@example.com", "username": "nuevo", "password": "password123"}
+    assert client.post("/api/auth/register", json=user).status_code == status.HTTP_201_CREATED
+    
+    response = client.post(
+        "/api/auth/register", json={**user, "email": "otro@example.com", "username": "otro"}
+    )
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) == 3600
+
+
+def test_task_writes_rate_limited_by_user(client, token_headers, rate_limits):
+    """Test para verificar el límite de escrituras por usuario, que no afecta a las lecturas."""
+    rate_limits(task_write=["user:1/minute"])
+    response = client.post("/api/tasks", json={"title": "Tarea"}, headers=token_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    
+    response = client.post("/api/tasks", json={"title": "Otra"}, headers=token_headers)
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert response.headers["Retry-After"] == "60"
+    assert client.get("/api/tasks", headers=token_headers).status_code == status.HTTP_200_OK
+
+
+def test_memory_backend_token_bucket():
+    """Test para verificar la ráfaga, la reposición y el desalojo de buckets."""
+    import asyncio
+    
+    now = [0.0]
+    backend = MemoryRateLimitBackend(max_keys=2, clock=lambda: now[0])
+    
+    async def scenario():
+        assert await backend.hit("a", 2, 10) == 0
+        assert await backend.hit("a", 2, 10) == 0
+        assert await backend.hit("a", 2, 10) == pytest.approx(5.0)
+        now[0] = 5.0
+        assert await backend.hit("a", 2, 10) == 0
+        
+        # Al superar max_keys se desaloja el bucket menos usado
+        await backend.hit("b", 1, 10)
+        await backend.hit("c", 1, 10)
+        assert await backend.hit("a", 2, 10) == 0
+    
+    asyncio.run(scenario())
+
+
+def test_parse_rule_rejects_invalid_specs():
+    """Test para verificar la validación de los límites configurados."""
+    rule = parse_rule("email:5/minute")
+    assert (rule.key, rule.capacity, rule.period) == ("email", 5, 60.0)
+    for spec in ("email:5", "pais:5/minute", "ip:0/minute", "ip:5/week"):
+        with pytest.raises(ValueError):
+            parse_rule(spec)
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import status
+from sqlalchemy import create_engine, exc
+from sqlalchemy.orm import sessionmaker
+
+from app.db import replicas
+from app.db.database import Base
+from app.db.replicas import ReplicaSet, configure_replicas, is_connection_error
+from app.models.task import Task
+from app.models.user import User
+
+
+# Segunda base de datos local que hace de réplica
+REPLICA_DATABASE_URL = "sqlite:///./test_replica.db"
+
+
+def _reset_replicas():
+    replica_set = replicas._replica_set
+    configure_replicas([])
+    if replica_set is not None:
+        asyncio.run(replica_set.dispose())
+
+
+@pytest.fixture(scope="function")
+def replica_db(db_mode):
+    """
+    Crea la base de datos réplica y enruta las lecturas de la API hacia ella.
+    """
+    engine = create_engine(REPLICA_DATABASE_URL)
+    Base.metadata.create_all(bind=engine)
+    configure_replicas([REPLICA_DATABASE_URL], async_mode=db_mode == "async")
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        _reset_replicas()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+        os.remove("./test_replica.db")
+
+
+def _copy_user(session, user):
+    session.add(
+        User(
+            id=user.id,
+            email=user.email,
+            username=user.username,
+            hashed_password=user.hashed_password,
+        )
+    )
+    session.commit()
+
+
+def test_reads_go_to_replica(client, token_headers, test_user, replica_db):
+    """Test para verificar que las lecturas se sirven desde la réplica."""
+    _copy_user(replica_db, test_user)
+    task = Task(title="Solo en la réplica", user_id=test_user.id)
+    replica_db.add(task)
+    replica_db.commit()
+    
+    response = client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert [item["title"] for item in response.json()] == ["Solo en la réplica"]
+    response = client.get(f"/api/tasks/{task.id}", headers=token_headers)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_reads_after_write_use_primary(client, token_headers, test_user, replica_db):
+    """Test para verificar que un usuario lee sus propias escrituras."""
+    _copy_user(replica_db, test_user)
+    
+    response = client.post("/api/tasks", json={"title": "Nueva"}, headers=token_headers)
+    assert response.status_code == status.HTTP_201_CREATED
+    
+    response = client.get("/api/tasks", headers=token_headers)
+    assert [item["title"] for item in response.json()] == ["Nueva"]
+    response = client.get(f"/api/tasks/{response.json()[0]['id']}", headers=token_headers)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_new_user_missing_from_replica_is_read_from_primary(
+    client, token_headers, test_user, replica_db
+):
+    """Test para verificar que un usuario que aún no está en la réplica se autentica."""
+    response = client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == []
+
+
+def test_unavailable_replica_is_ejected(client, token_headers, test_user, db, db_mode):
+    """Test para verificar que una réplica caída sale de la rotación y se lee del primario."""
+    db.add(Task(title="En el primario", user_id=test_user.id))
+    db.commit()
+    replica_set = configure_replicas(
+        ["sqlite:///./no-existe/replica.db"], async_mode=db_mode == "async"
+    )
+    try:
+        response = client.get("/api/tasks", headers=token_headers)
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert [item["title"] for item in response.json()] == ["En el primario"]
+        assert not replica_set.replicas[0].is_healthy(time.monotonic())
+        assert replica_set.choose() is None
+    finally:
+        _reset_replicas()
+
+
+def test_statement_errors_do_not_eject_replica():
+    """Test para verificar que solo los fallos de conexión expulsan una réplica."""
+    canceled = Exception("canceling statement due to statement timeout")
+    
+    assert not is_connection_error(exc.OperationalError("SELECT 1", {}, canceled))
+    assert is_connection_error(exc.OperationalError(None, None, Exception("refused")))
+    assert is_connection_error(
+        exc.OperationalError("SELECT 1", {}, Exception("closed"), connection_invalidated=True)
+    )
+    assert is_connection_error(ConnectionRefusedError())
+
+
+def test_replica_set_round_robin():
+    """Test para verificar el reparto round-robin, la expulsión y el anclaje."""
+    replica_set = ReplicaSet(
+        ["sqlite:///./a.db", "sqlite:///./b.db"],
+        async_mode=False,
+        pin_seconds=60,
+        retry_seconds=60,
+    )
+    first, second = replica_set.replicas
+    
+    assert [replica_set.choose() for _ in range(3)] == [first, second, first]
+    replica_set.eject(first)
+    assert [replica_set.choose() for _ in range(2)] == [second, second]
+    replica_set.eject(second)
+    assert replica_set.choose() is None
+    
+    second.ejected_until = 0.0
+    replica_set.pin("user")
+    assert replica_set.choose("user") is None
+    assert replica_set.choose("other") is second
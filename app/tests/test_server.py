@@ -0,0 +1,131 @@
+import asyncio
+import uuid
+
+import pytest
+import uvicorn
+
+from app import server
+from app.core.config import settings
+from app.core.events import SubscriptionClosed, get_task_event_broker
+from app.server import (
+    DrainingServer,
+    WorkerSupervisor,
+    build_config,
+    check_shared_backends,
+    split_pool_budget,
+    worker_environment,
+)
+
+
+def test_split_pool_budget():
+    """Test para verificar que los pools de todos los workers no superan el máximo."""
+    assert split_pool_budget(100, 4, 5, 10) == (5, 10)
+    assert split_pool_budget(40, 4, 5, 10) == (5, 5)
+    assert split_pool_budget(12, 4, 5, 10) == (3, 0)
+    # Un LISTEN por worker y dos pools por worker
+    assert split_pool_budget(40, 4, 5, 10, reserved=1) == (5, 4)
+    assert split_pool_budget(40, 4, 5, 10, pools=2) == (5, 0)
+    for workers in range(1, 9):
+        pool_size, max_overflow = split_pool_budget(50, workers, 5, 10, pools=2, reserved=1)
+        assert workers * (2 * (pool_size + max_overflow) + 1) <= 50
+    
+    with pytest.raises(ValueError):
+        split_pool_budget(3, 4, 5, 10)
+
+
+def test_worker_environment(monkeypatch):
+    """Test para verificar los recursos de cada worker que se pasan por entorno."""
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", None)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", None)
+    assert worker_environment(workers=4, cpu_count=8) == {"PASSWORD_HASH_WORKERS": "2"}
+    
+    monkeypatch.setattr(settings, "DB_MAX_CONNECTIONS", 24)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", "memory")
+    assert worker_environment(workers=4, cpu_count=8) == {
+        "DB_POOL_SIZE": str(min(settings.DB_POOL_SIZE, 6)),
+        "DB_MAX_OVERFLOW": str(6 - min(settings.DB_POOL_SIZE, 6)),
+    }
+
+
+def test_check_shared_backends(monkeypatch):
+    """Test para verificar que varios workers exigen backends compartidos."""
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", "memory")
+    monkeypatch.setattr(settings, "IDEMPOTENCY_BACKEND", "memory")
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    check_shared_backends(workers=1)
+    with pytest.raises(ValueError, match="TASK_EVENTS_BACKEND, IDEMPOTENCY_BACKEND, RATE_LIMIT_BACKEND"):
+        check_shared_backends(workers=2)
+    
+    monkeypatch.setattr(settings, "TASK_EVENTS_BACKEND", "postgres")
+    monkeypatch.setattr(settings, "IDEMPOTENCY_BACKEND", "database")
+    with pytest.raises(ValueError, match="RATE_LIMIT_BACKEND"):
+        check_shared_backends(workers=2)
+    
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    check_shared_backends(workers=2)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "redis")
+    check_shared_backends(workers=2)
+
+
+class FakeProcess:
+    def __init__(self, alive):
+        self.alive = alive
+        self.pid = id(self)
+        self.exitcode = None if alive else 1
+        self.started = False
+    
+    def is_alive(self):
+        return self.alive
+    
+    def join(self):
+        pass
+    
+    def start(self):
+        self.started = True
+
+
+def test_supervisor_replaces_dead_workers(monkeypatch):
+    """Test para verificar que un worker caído se reemplaza y uno vivo se conserva."""
+    monkeypatch.setattr(server, "get_subprocess", lambda **kwargs: FakeProcess(alive=True))
+    supervisor = WorkerSupervisor(build_config(workers=2), target=lambda sockets: None, sockets=[])
+    alive, dead = FakeProcess(alive=True), FakeProcess(alive=False)
+    supervisor.processes = [alive, dead]
+    
+    assert supervisor.restart_dead_workers()
+    
+    assert supervisor.processes[0] is alive
+    assert supervisor.processes[1] is not dead and supervisor.processes[1].started
+
+
+def test_supervisor_stops_crash_looping_workers(monkeypatch):
+    """Test para verificar que un worker que no llega a arrancar no se reinicia sin fin."""
+    monkeypatch.setattr(server, "WORKER_MAX_RESTARTS", 2)
+    monkeypatch.setattr(server, "get_subprocess", lambda **kwargs: FakeProcess(alive=False))
+    supervisor = WorkerSupervisor(build_config(workers=1), target=lambda sockets: None, sockets=[])
+    supervisor.processes = [FakeProcess(alive=False)]
+    
+    assert [supervisor.restart_dead_workers() for _ in range(3)] == [True, True, False]
+    assert supervisor.failed
+
+
+def test_server_shutdown_closes_event_streams(monkeypatch):
+    """Test para verificar que la parada cierra los streams SSE antes de esperar a las peticiones."""
+    open_connections = []
+    
+    async def base_shutdown(self, sockets=None):
+        open_connections.append(get_task_event_broker().connections)
+    
+    monkeypatch.setattr(uvicorn.Server, "shutdown", base_shutdown)
+    
+    async def scenario():
+        subscription = get_task_event_broker().subscribe(uuid.uuid4())
+        await DrainingServer(build_config(workers=1)).shutdown()
+        with pytest.raises(SubscriptionClosed):
+            await subscription.get(timeout=1)
+    
+    asyncio.run(scenario())
+    
+    assert open_connections == [0]
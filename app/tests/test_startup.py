@@ -0,0 +1,52 @@
+import json
+import subprocess
+import sys
+
+from fastapi import FastAPI
+
+from app.core import openapi
+from app.core.openapi import FINGERPRINT_KEY, load_openapi_schema, write_openapi_schema
+from app.main import app
+
+
+def test_import_does_not_create_engines():
+    """Test para verificar que importar la aplicación no crea motores ni carga passlib."""
+    code = (
+        "import sys; import app.main; from app.db import database; "
+        "print(database._engine is None, database._async_engine is None, "
+        "'passlib' in sys.modules, 'psycopg2' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    assert output.split() == ["True", "True", "False", "False"]
+
+
+def test_precomputed_openapi_schema(tmp_path):
+    """Test para verificar que el esquema serializado se usa solo si es de estas rutas."""
+    path = str(tmp_path / "openapi.json")
+    write_openapi_schema(app, path)
+    try:
+        assert load_openapi_schema(app, path) == FastAPI.openapi(app)
+        
+        with open(path) as f:
+            schema = json.load(f)
+        schema[FINGERPRINT_KEY] = "otra"
+        with open(path, "w") as f:
+            json.dump(schema, f)
+        assert load_openapi_schema(app, path) is None
+        assert load_openapi_schema(app, str(tmp_path / "no-existe.json")) is None
+    finally:
+        app.openapi_schema = None
+
+
+def test_precomputed_openapi_schema_tracks_source(tmp_path, monkeypatch):
+    """Test para verificar que un cambio en el código (p. ej. un modelo) invalida el esquema."""
+    path = str(tmp_path / "openapi.json")
+    write_openapi_schema(app, path)
+    try:
+        monkeypatch.setattr(openapi, "source_digest", lambda: "otro código")
+        
+        assert load_openapi_schema(app, path) is None
+    finally:
+        app.openapi_schema = None
@@ -1,17 +1,30 @@
+import csv
+import io
+import json
 import uuid
+from datetime import datetime, timedelta
+
 import pytest
 from fastapi import status
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
 
+from app.core.config import settings
+from app.db.task_stats import recompute_task_stats
+from app.db.tombstones import compact_task_tombstones
 from app.models.task import Task
+from app.models.task_tombstone import TaskTombstone
+from app.schemas.task import TaskResponse
 
 
-def test_create_task(client, db, token_headers, test_user):
+def test_create_task(client, db, token_headers, test_user, max_queries):
     """Test para crear una nueva tarea."""
     task_data = {
         "title": "Test Task",
         "description": "This is a test task",
     }
-    response = client.post("/api/tasks", json=task_data, headers=token_headers)
+    with max_queries(5):
+        response = client.post("/api/tasks", json=task_data, headers=token_headers)
     
     assert response.status_code == status.HTTP_201_CREATED
     data = response.json()
@@ -29,7 +42,7 @@ def test_create_task(client, db, token_headers, test_user):
     assert task.user_id == test_user.id
 
 
-def test_get_tasks(client, db, token_headers, test_user):
+def test_get_tasks(client, db, token_headers, test_user, max_queries):
     """Test para obtener todas las tareas del usuario."""
     # Crear algunas tareas para el usuario
     tasks = [
@@ -39,7 +52,9 @@ def test_get_tasks(client, db, token_headers, test_user):
     db.add_all(tasks)
     db.commit()
     
-    response = client.get("/api/tasks", headers=token_headers)
+    # Usuario autenticado, versión del listado (ETag) y tareas; sin N+1 por tarea
+    with max_queries(3):
+        response = client.get("/api/tasks", headers=token_headers)
     
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
@@ -48,7 +63,582 @@ def test_get_tasks(client, db, token_headers, test_user):
     assert data[1]["title"] == "Task 2"
 
 
-def test_get_task(client, db, token_headers, test_user):
+def test_get_tasks_matches_task_response(client, db, token_headers, test_user):
+    """Test para verificar que el listado serializa igual que TaskResponse."""
+    task = Task(title="Task 1", description=None, user_id=test_user.id)
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+    
+    response = client.get("/api/tasks", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    expected = TaskResponse.model_validate(task, from_attributes=True).model_dump(mode="json")
+    assert response.json() == [expected]
+    assert list(response.json()[0]) == list(expected)
+
+
+def test_get_tasks_cursor_pagination(client, db, token_headers, test_user):
+    """Test para recorrer las tareas del usuario con paginación por cursor."""
+    base = datetime(2025, 1, 1)
+    tasks = [
+        Task(title=f"Task {i}", user_id=test_user.id, created_at=base + timedelta(minutes=i))
+        for i in range(5)
+    ]
+    db.add_all(tasks)
+    db.commit()
+    
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            "/api/tasks", params={"cursor": cursor, "limit": 2}, headers=token_headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        titles.extend(task["title"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+    
+    assert titles == [f"Task {i}" for i in range(5)]
+
+
+def test_get_tasks_invalid_cursor(client, token_headers):
+    """Test para verificar que se rechaza un cursor manipulado."""
+    response = client.get("/api/tasks", params={"cursor": "no-es-un-cursor"}, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"limit": 0},
+        {"limit": -1},
+        {"limit": 1001},
+        {"skip": -1},
+        {"cursor": "", "limit": 0},
+        {"cursor": "", "limit": -1},
+    ],
+)
+def test_get_tasks_invalid_page_params(client, token_headers, params):
+    """Test para verificar que se rechazan límites y desplazamientos fuera de rango."""
+    response = client.get("/api/tasks", params=params, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_tasks_filters(client, db, token_headers, test_user):
+    """Test para filtrar las tareas por estado y fechas."""
+    base = datetime(2025, 1, 1)
+    db.add_all([
+        Task(title="Antigua", user_id=test_user.id, created_at=base, updated_at=base),
+        Task(
+            title="Completada",
+            is_completed=True,
+            user_id=test_user.id,
+            created_at=base + timedelta(days=1),
+            updated_at=base + timedelta(days=1),
+        ),
+        Task(
+            title="Reciente",
+            user_id=test_user.id,
+            created_at=base + timedelta(days=2),
+            updated_at=base + timedelta(days=3),
+        ),
+    ])
+    db.commit()
+    
+    def titles(**params):
+        response = client.get("/api/tasks", params=params, headers=token_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return [task["title"] for task in response.json()]
+    
+    assert titles(is_completed=True) == ["Completada"]
+    assert titles(is_completed=False) == ["Antigua", "Reciente"]
+    assert titles(created_after="2025-01-01T12:00:00", created_before="2025-01-02T12:00:00") == ["Completada"]
+    assert titles(updated_since="2025-01-02T00:00:00+00:00") == ["Completada", "Reciente"]
+
+
+@pytest.mark.parametrize(
+    "sort, expected",
+    [
+        ("created_at", ["B", "C", "A"]),
+        ("-created_at", ["A", "C", "B"]),
+        ("title", ["A", "B", "C"]),
+        ("-updated_at", ["B", "A", "C"]),
+    ],
+)
+def test_get_tasks_sort(client, db, token_headers, test_user, sort, expected):
+    """Test para ordenar las tareas, también al paginar por cursor."""
+    base = datetime(2025, 1, 1)
+    for i, (title, updated_minutes) in enumerate([("B", 9), ("C", 1), ("A", 5)]):
+        db.add(Task(
+            title=title,
+            user_id=test_user.id,
+            created_at=base + timedelta(minutes=i),
+            updated_at=base + timedelta(minutes=updated_minutes),
+        ))
+    db.commit()
+    
+    response = client.get("/api/tasks", params={"sort": sort}, headers=token_headers)
+    assert [task["title"] for task in response.json()] == expected
+    
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            "/api/tasks", params={"sort": sort, "cursor": cursor, "limit": 2}, headers=token_headers
+        )
+        titles.extend(task["title"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+    assert titles == expected
+
+
+def test_get_tasks_invalid_sort(client, token_headers):
+    """Test para verificar que solo se admiten las ordenaciones permitidas."""
+    response = client.get("/api/tasks", params={"sort": "description"}, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.fixture
+def executed_statements():
+    """
+    Registra las sentencias SQL que se ejecutan durante el test.
+    """
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    
+    event.listen(Engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", capture)
+
+
+@pytest.mark.parametrize(
+    "params, index",
+    [
+        ({}, "ix_tasks_user_id_created_at_id"),
+        ({"sort": "-created_at"}, "ix_tasks_user_id_created_at_id"),
+        ({"sort": "-updated_at"}, "ix_tasks_user_id_updated_at_id"),
+        ({"sort": "title", "cursor": ""}, "ix_tasks_user_id_title_id"),
+        ({"is_completed": True}, "ix_tasks_user_id_is_completed_created_at_id"),
+        (
+            {"is_completed": True, "created_after": "2025-01-01T00:00:00"},
+            "ix_tasks_user_id_is_completed_created_at_id",
+        ),
+        (
+            {"is_completed": False, "sort": "-updated_at"},
+            "ix_tasks_pending_user_id_updated_at_id",
+        ),
+        (
+            {"created_after": "2025-01-01T00:00:00", "created_before": "2026-01-01T00:00:00"},
+            "ix_tasks_user_id_created_at_id",
+        ),
+        (
+            {"updated_since": "2025-01-01T00:00:00", "sort": "updated_at"},
+            "ix_tasks_user_id_updated_at_id",
+        ),
+        # Sin ordenar por updated_at, SQLite recorre el índice de created_at en orden
+        ({"updated_since": "2025-01-01T08:00:00"}, "ix_tasks_user_id_created_at_id"),
+    ],
+)
+def test_get_tasks_query_plan(
+    client, db, token_headers, test_user, executed_statements, params, index
+):
+    """Test para verificar que cada combinación de filtros usa un índice."""
+    # Una cuenta con muchas tareas, la mayoría completadas, y estadísticas al día
+    base = datetime(2025, 1, 1)
+    db.add_all([
+        Task(
+            title=f"Task {i}",
+            is_completed=i % 5 != 0,
+            user_id=test_user.id,
+            created_at=base + timedelta(minutes=i),
+            updated_at=base + timedelta(minutes=i, seconds=30),
+        )
+        for i in range(500)
+    ])
+    db.commit()
+    db.execute(text("ANALYZE"))
+    executed_statements.clear()
+    
+    response = client.get("/api/tasks", params=params, headers=token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    
+    statement, parameters = [
+        (statement, parameters)
+        for statement, parameters in executed_statements
+        if statement.lstrip().startswith("SELECT") and "ORDER BY" in statement
+    ][-1]
+    plan = " | ".join(
+        row[-1]
+        for row in db.connection().exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+    )
+    
+    assert f"SEARCH tasks USING INDEX {index} " in plan
+    assert "SCAN tasks" not in plan
+    assert "TEMP B-TREE" not in plan
+
+
+def test_get_tasks_etag(client, db, token_headers, test_user):
+    """Test para verificar el ETag del listado y la respuesta 304."""
+    db.add(Task(title="Task 1", user_id=test_user.id))
+    db.commit()
+    
+    response = client.get("/api/tasks", headers=token_headers)
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    
+    headers = {**token_headers, "If-None-Match": etag}
+    response = client.get("/api/tasks", headers=headers)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    
+    # Otra página u otra versión de las tareas cambian el ETag
+    response = client.get("/api/tasks", params={"limit": 1}, headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    client.post("/api/tasks", json={"title": "Task 2"}, headers=token_headers)
+    response = client.get("/api/tasks", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+    
+    # Una modificación que no cambia el número de tareas también lo cambia
+    headers["If-None-Match"] = response.headers["ETag"]
+    client.put(
+        f"/api/tasks/{response.json()[0]['id']}", json={"title": "Otro"}, headers=token_headers
+    )
+    response = client.get("/api/tasks", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_export_tasks_ndjson(client, db, token_headers, test_user, monkeypatch):
+    """Test para exportar las tareas en NDJSON leyendo el cursor por tandas."""
+    monkeypatch.setattr(settings, "TASK_EXPORT_BATCH_SIZE", 2)
+    base = datetime(2025, 1, 1)
+    tasks = [
+        Task(title=f"Task {i}", user_id=test_user.id, created_at=base + timedelta(minutes=i))
+        for i in range(5)
+    ]
+    db.add_all(tasks)
+    db.commit()
+    
+    response = client.get("/api/tasks/export", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [
+        TaskResponse.model_validate(task, from_attributes=True).model_dump(mode="json")
+        for task in tasks
+    ]
+
+
+def test_export_tasks_csv(client, db, token_headers, test_user, monkeypatch):
+    """Test para exportar las tareas en CSV."""
+    monkeypatch.setattr(settings, "TASK_EXPORT_BATCH_SIZE", 2)
+    db.add_all([
+        Task(title=f"Task {i}", description="a, \"b\"", user_id=test_user.id)
+        for i in range(3)
+    ])
+    db.commit()
+    
+    response = client.get("/api/tasks/export", params={"format": "csv"}, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 3
+    assert list(rows[0]) == list(TaskResponse.model_fields)
+    assert rows[0]["description"] == 'a, "b"'
+    assert rows[0]["is_completed"] == "false"
+
+
+def test_export_tasks_csv_escapes_formulas(client, db, token_headers, test_user):
+    """Test para verificar que el CSV no contiene fórmulas y se vuelve a importar igual."""
+    titles = ["=HYPERLINK(\"http://x\")", "+1", "-1", "@SUM(A1)", "'=1", "'cita", "normal"]
+    db.add_all(Task(title=title, user_id=test_user.id) for title in titles)
+    db.commit()
+    
+    exported = client.get(
+        "/api/tasks/export", params={"format": "csv"}, headers=token_headers
+    ).content
+    
+    rows = list(csv.DictReader(io.StringIO(exported.decode())))
+    assert sorted(row["title"] for row in rows) == sorted(
+        title if title in ("normal", "'cita") else "'" + title for title in titles
+    )
+    response = client.post(
+        "/api/tasks/import", params={"format": "csv"}, content=exported, headers=token_headers
+    )
+    assert response.json()["imported"] == len(titles)
+    imported = [task.title for task in db.query(Task).filter(Task.user_id == test_user.id)]
+    assert sorted(imported) == sorted(titles * 2)
+
+
+def test_import_tasks_csv_keeps_leading_apostrophe(client, db, token_headers, test_user):
+    """Test para verificar que un ' inicial que no escapa una fórmula se conserva."""
+    content = b"title,description\n'Tis the season,'quoted desc\n'=1,\n"
+    
+    response = client.post(
+        "/api/tasks/import", params={"format": "csv"}, content=content, headers=token_headers
+    )
+    
+    assert response.json()["imported"] == 2
+    imported = {
+        task.title: task.description
+        for task in db.query(Task).filter(Task.user_id == test_user.id)
+    }
+    assert imported == {"'Tis the season": "'quoted desc", "=1": None}
+
+
+def test_task_stats(client, token_headers):
+    """Test para verificar que los contadores se mantienen en cada escritura."""
+    def stats():
+        response = client.get("/api/tasks/stats", headers=token_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()
+    
+    assert stats() == {"total": 0, "completed": 0, "pending": 0}
+    
+    first = client.post("/api/tasks", json={"title": "Tarea 1"}, headers=token_headers).json()
+    batch = client.post(
+        "/api/tasks/batch",
+        json={"items": [{"title": "Tarea 2"}, {"title": "Tarea 3"}]},
+        headers=token_headers,
+    ).json()["results"]
+    client.post("/api/tasks/import", content=b'{"title": "Tarea 4"}\n', headers=token_headers)
+    assert stats() == {"total": 4, "completed": 0, "pending": 4}
+    
+    # Completar dos veces la misma tarea solo cuenta una transición
+    for _ in range(2):
+        client.put(f"/api/tasks/{first['id']}", json={"is_completed": True}, headers=token_headers)
+    client.patch(
+        "/api/tasks/batch",
+        json={"items": [{"id": item["id"], "is_completed": True} for item in batch]},
+        headers=token_headers,
+    )
+    client.put(f"/api/tasks/{batch[0]['id']}", json={"title": "Renombrada"}, headers=token_headers)
+    assert stats() == {"total": 4, "completed": 3, "pending": 1}
+    
+    client.put(f"/api/tasks/{batch[1]['id']}", json={"is_completed": False}, headers=token_headers)
+    client.delete(f"/api/tasks/{first['id']}", headers=token_headers)
+    client.request(
+        "DELETE", "/api/tasks/batch", json={"ids": [batch[0]["id"]]}, headers=token_headers
+    )
+    assert stats() == {"total": 2, "completed": 0, "pending": 2}
+
+
+def test_recompute_task_stats(client, db, token_headers, test_user):
+    """Test para recalcular los contadores desde la tabla de tareas."""
+    db.add_all([
+        Task(title=f"Task {i}", is_completed=i % 2 == 0, user_id=test_user.id)
+        for i in range(5)
+    ])
+    db.commit()
+    assert client.get("/api/tasks/stats", headers=token_headers).json()["total"] == 0
+    
+    assert recompute_task_stats(db.connection()) == 1
+    db.commit()
+    
+    response = client.get("/api/tasks/stats", headers=token_headers)
+    assert response.json() == {"total": 5, "completed": 3, "pending": 2}
+
+
+def test_task_changes(client, token_headers):
+    """Test para el feed de cambios: altas, modificaciones y bajas desde un token."""
+    def changes(since=None, limit=1000):
+        params = {"limit": limit}
+        if since is not None:
+            params["since"] = since
+        response = client.get("/api/tasks/changes", params=params, headers=token_headers)
+        assert response.status_code == status.HTTP_200_OK
+        return response.json()
+    
+    first = client.post("/api/tasks", json={"title": "Tarea 1"}, headers=token_headers).json()
+    second = client.post("/api/tasks", json={"title": "Tarea 2"}, headers=token_headers).json()
+    
+    full = changes()
+    assert [task["title"] for task in full["tasks"]] == ["Tarea 1", "Tarea 2"]
+    assert full["deleted"] == []
+    assert full["has_more"] is False
+    
+    # Sin cambios nuevos el feed está vacío
+    assert changes(full["next_token"])["tasks"] == []
+    
+    client.put(f"/api/tasks/{second['id']}", json={"title": "Renombrada"}, headers=token_headers)
+    client.delete(f"/api/tasks/{first['id']}", headers=token_headers)
+    third = client.post("/api/tasks", json={"title": "Tarea 3"}, headers=token_headers).json()
+    
+    delta = changes(full["next_token"])
+    assert [task["title"] for task in delta["tasks"]] == ["Renombrada", "Tarea 3"]
+    assert delta["deleted"] == [first["id"]]
+    assert changes(delta["next_token"]) == {
+        "tasks": [], "deleted": [], "next_token": delta["next_token"], "has_more": False,
+    }
+    
+    # Un lote comparte versión: la paginación se corta dentro de la versión
+    batch = client.post(
+        "/api/tasks/batch",
+        json={"items": [{"title": f"Lote {i}"} for i in range(3)]},
+        headers=token_headers,
+    ).json()["results"]
+    client.request(
+        "DELETE", "/api/tasks/batch", json={"ids": [third["id"]]}, headers=token_headers
+    )
+    seen_tasks, seen_deleted = [], []
+    token = delta["next_token"]
+    while True:
+        page = changes(token, limit=2)
+        assert len(page["tasks"]) + len(page["deleted"]) <= 2
+        seen_tasks += [task["id"] for task in page["tasks"]]
+        seen_deleted += page["deleted"]
+        token = page["next_token"]
+        if not page["has_more"]:
+            break
+    assert sorted(seen_tasks) == sorted(item["id"] for item in batch)
+    assert seen_deleted == [third["id"]]
+
+
+def test_task_changes_token_errors(client, token_headers, monkeypatch):
+    """Test para rechazar tokens corruptos (400) y caducados (410)."""
+    response = client.get("/api/tasks/changes?since=basura", headers=token_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    token = client.get("/api/tasks/changes", headers=token_headers).json()["next_token"]
+    monkeypatch.setattr(settings, "TASK_TOMBSTONE_RETENTION_DAYS", -1)
+    response = client.get(f"/api/tasks/changes?since={token}", headers=token_headers)
+    assert response.status_code == status.HTTP_410_GONE
+
+
+def test_compact_task_tombstones(client, db, token_headers):
+    """Test para compactar los tombstones que superan la retención."""
+    task = client.post("/api/tasks", json={"title": "Tarea"}, headers=token_headers).json()
+    client.delete(f"/api/tasks/{task['id']}", headers=token_headers)
+    
+    assert compact_task_tombstones(db.connection(), retention_days=1) == 0
+    assert compact_task_tombstones(db.connection(), retention_days=-1) == 1
+    db.commit()
+    assert db.query(TaskTombstone).count() == 0
+
+
+def _chunked(body: bytes, size: int = 7):
+    """Envía el cuerpo por trozos pequeños, cortando líneas y caracteres UTF-8."""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def test_import_tasks_ndjson(client, db, token_headers, test_user, monkeypatch):
+    """Test para importar tareas NDJSON por lotes, con errores por fila."""
+    monkeypatch.setattr(settings, "TASK_IMPORT_BATCH_SIZE", 2)
+    lines = [
+        json.dumps({"title": "Tarea 1", "description": "Descripción ñ"}),
+        "",
+        json.dumps({"title": ""}),
+        "{no es json",
+        json.dumps({"title": "Tarea 2"}),
+        json.dumps({"title": "Tarea 3"}),
+    ]
+    body = "\n".join(lines).encode()
+    
+    response = client.post(
+        "/api/tasks/import", content=_chunked(body), headers=token_headers
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["imported"] == 3
+    assert data["failed"] == 2
+    assert [error["line"] for error in data["errors"]] == [3, 4]
+    assert data["errors"][1]["detail"] == "JSON inválido"
+    assert data["rows_per_second"] > 0
+    tasks = db.query(Task).filter(Task.user_id == test_user.id).order_by(Task.title).all()
+    assert [task.title for task in tasks] == ["Tarea 1", "Tarea 2", "Tarea 3"]
+    assert tasks[0].description == "Descripción ñ"
+    assert tasks[0].is_completed is False
+
+
+def test_import_tasks_csv_round_trip(client, db, token_headers, test_user):
+    """Test para importar en CSV lo exportado, con campos de varias líneas."""
+    db.add(Task(title="Original", description='línea 1\n"línea 2"', user_id=test_user.id))
+    db.commit()
+    exported = client.get(
+        "/api/tasks/export", params={"format": "csv"}, headers=token_headers
+    ).content
+    
+    response = client.post(
+        "/api/tasks/import",
+        params={"format": "csv"},
+        content=_chunked(exported + b"sin,columnas\n"),
+        headers=token_headers,
+    )
+    
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["imported"] == 1
+    assert data["errors"] == [{"line": 4, "detail": "Número de columnas incorrecto"}]
+    descriptions = [
+        task.description for task in db.query(Task).filter(Task.user_id == test_user.id)
+    ]
+    assert descriptions == ['línea 1\n"línea 2"'] * 2
+
+
+def test_import_tasks_line_too_long(client, db, token_headers, test_user, monkeypatch):
+    """Test para verificar que una línea demasiado larga cancela la importación con 413."""
+    monkeypatch.setattr(settings, "TASK_IMPORT_MAX_LINE_BYTES", 64)
+    body = json.dumps({"title": "Corta"}).encode() + b"\n" + b"x" * 200
+    
+    response = client.post(
+        "/api/tasks/import", content=_chunked(body, size=16), headers=token_headers
+    )
+    
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert db.query(Task).filter(Task.user_id == test_user.id).count() == 0
+
+
+def test_import_tasks_locks_after_reading_body(client, db, token_headers, test_user, monkeypatch):
+    """
+    Test para verificar que la versión de cambios (y el bloqueo de task_stats)
+    se pide después de recibir el cuerpo, y solo si hay filas que cargar.
+    """
+    from app.api.routes import tasks as tasks_routes
+    
+    calls = []
+    spool_body = tasks_routes.spool_body
+    next_change_version = tasks_routes.next_change_version
+    
+    async def recording_spool_body(*args, **kwargs):
+        body = await spool_body(*args, **kwargs)
+        calls.append("body")
+        return body
+    
+    async def recording_next_change_version(*args, **kwargs):
+        calls.append("version")
+        return await next_change_version(*args, **kwargs)
+    
+    monkeypatch.setattr(tasks_routes, "spool_body", recording_spool_body)
+    monkeypatch.setattr(tasks_routes, "next_change_version", recording_next_change_version)
+    monkeypatch.setattr(settings, "TASK_IMPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "TASK_IMPORT_SPOOL_MEMORY_BYTES", 16)
+    body = b"".join(json.dumps({"title": f"Tarea {i}"}).encode() + b"\n" for i in range(3))
+    
+    response = client.post("/api/tasks/import", content=_chunked(body), headers=token_headers)
+    
+    assert response.json()["imported"] == 3
+    assert calls == ["body", "version"]
+    versions = {task.change_version for task in db.query(Task).filter(Task.user_id == test_user.id)}
+    assert len(versions) == 1
+    
+    calls.clear()
+    response = client.post("/api/tasks/import", content=b'{"title": ""}\n', headers=token_headers)
+    
+    assert response.json()["imported"] == 0
+    assert calls == ["body"]
+
+
+def test_get_task(client, db, token_headers, test_user, max_queries):
     """Test para obtener una tarea específica."""
     # Crear una tarea para el usuario
     task = Task(title="Test Task", description="Description", user_id=test_user.id)
@@ -56,7 +646,8 @@ def test_get_task(client, db, token_headers, test_user):
     db.commit()
     db.refresh(task)
     
-    response = client.get(f"/api/tasks/{task.id}", headers=token_headers)
+    with max_queries(2):
+        response = client.get(f"/api/tasks/{task.id}", headers=token_headers)
     
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
@@ -74,6 +665,25 @@ def test_get_task_not_found(client, token_headers):
     assert "Tarea no encontrada" in response.json()["detail"]
 
 
+def test_get_task_etag(client, db, token_headers, test_user):
+    """Test para verificar el ETag de una tarea y la respuesta 304."""
+    task = Task(title="Test Task", user_id=test_user.id)
+    db.add(task)
+    db.commit()
+    
+    etag = client.get(f"/api/tasks/{task.id}", headers=token_headers).headers["ETag"]
+    headers = {**token_headers, "If-None-Match": etag}
+    
+    response = client.get(f"/api/tasks/{task.id}", headers=headers)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers["ETag"] == etag
+    
+    client.put(f"/api/tasks/{task.id}", json={"is_completed": True}, headers=token_headers)
+    response = client.get(f"/api/tasks/{task.id}", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+
+
 def test_get_task_unauthorized(client, db, token_headers, test_user):
     """Test para verificar que no se puede obtener una tarea de otro usuario."""
     # Crear un usuario diferente
@@ -91,7 +701,7 @@ def test_get_task_unauthorized(client, db, token_headers, test_user):
     assert "No tienes permiso" in response.json()["detail"]
 
 
-def test_update_task(client, db, token_headers, test_user):
+def test_update_task(client, db, token_headers, test_user, max_queries):
     """Test para actualizar una tarea."""
     # Crear una tarea para el usuario
     task = Task(title="Original Title", description="Original Description", user_id=test_user.id)
@@ -104,7 +714,8 @@ def test_update_task(client, db, token_headers, test_user):
         "description": "Updated Description",
         "is_completed": True,
     }
-    response = client.put(f"/api/tasks/{task.id}", json=update_data, headers=token_headers)
+    with max_queries(6):
+        response = client.put(f"/api/tasks/{task.id}", json=update_data, headers=token_headers)
     
     assert response.status_code == status.HTTP_200_OK
     data = response.json()
@@ -119,7 +730,7 @@ def test_update_task(client, db, token_headers, test_user):
     assert updated_task.is_completed == update_data["is_completed"]
 
 
-def test_delete_task(client, db, token_headers, test_user):
+def test_delete_task(client, db, token_headers, test_user, max_queries):
     """Test para eliminar una tarea."""
     # Crear una tarea para el usuario
     task = Task(title="Task to Delete", description="Description", user_id=test_user.id)
@@ -127,10 +738,133 @@ def test_delete_task(client, db, token_headers, test_user):
     db.commit()
     db.refresh(task)
     
-    response = client.delete(f"/api/tasks/{task.id}", headers=token_headers)
+    with max_queries(5):
+        response = client.delete(f"/api/tasks/{task.id}", headers=token_headers)
     
-    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"message": "Tarea eliminada satisfactoriamente"}
     
     # Verificar que la tarea se eliminó de la base de datos
     deleted_task = db.query(Task).filter(Task.id == task.id).first()
     assert deleted_task is None
+
+
+def test_create_tasks_batch(client, db, token_headers, test_user, max_queries):
+    """Test para crear varias tareas en una sola petición."""
+    batch = {"items": [{"title": "Task 1"}, {"title": "Task 2", "description": "Description 2"}]}
+    with max_queries(5):
+        response = client.post("/api/tasks/batch", json=batch, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_201_CREATED
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["created", "created"]
+    assert [r["task"]["title"] for r in results] == ["Task 1", "Task 2"]
+    assert db.query(Task).filter(Task.user_id == test_user.id).count() == 2
+
+
+def test_update_tasks_batch(client, db, token_headers, test_user, max_queries):
+    """Test para actualizar varias tareas, ignorando las de otros usuarios."""
+    tasks = [Task(title=f"Task {i}", user_id=test_user.id) for i in range(3)]
+    other_task = Task(title="Other User Task", user_id=uuid.uuid4())
+    db.add_all(tasks + [other_task])
+    db.commit()
+    
+    batch = {
+        "items": [
+            {"id": str(tasks[0].id), "is_completed": True},
+            {"id": str(tasks[1].id), "is_completed": True},
+            {"id": str(tasks[2].id), "title": "Renamed"},
+            {"id": str(other_task.id), "is_completed": True},
+        ]
+    }
+    with max_queries(6):
+        response = client.patch("/api/tasks/batch", json=batch, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_200_OK
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["updated", "updated", "updated", "not_found"]
+    assert results[0]["task"]["is_completed"] is True
+    assert results[2]["task"]["title"] == "Renamed"
+    assert db.query(Task).filter(Task.id == other_task.id).first().is_completed is False
+
+
+def test_update_tasks_batch_rejects_duplicate_ids(client, db, token_headers, test_user):
+    """Test para verificar que una tarea repetida en el lote se rechaza con 422."""
+    tasks = [Task(title=f"Task {i}", user_id=test_user.id) for i in range(2)]
+    db.add_all(tasks)
+    db.commit()
+    
+    batch = {
+        "items": [
+            {"id": str(tasks[1].id), "title": "y"},
+            {"id": str(tasks[0].id), "title": "x"},
+            {"id": str(tasks[0].id), "title": "y"},
+        ]
+    }
+    response = client.patch("/api/tasks/batch", json=batch, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    db.expire_all()
+    assert sorted(task.title for task in db.query(Task)) == ["Task 0", "Task 1"]
+
+
+def test_delete_tasks_batch(client, db, token_headers, test_user, max_queries):
+    """Test para eliminar varias tareas en una sola petición."""
+    tasks = [Task(title=f"Task {i}", user_id=test_user.id) for i in range(2)]
+    db.add_all(tasks)
+    db.commit()
+    ids = [str(task.id) for task in tasks] + [str(uuid.uuid4())]
+    
+    with max_queries(5):
+        response = client.request(
+            "DELETE", "/api/tasks/batch", json={"ids": ids}, headers=token_headers
+        )
+    
+    assert response.status_code == status.HTTP_200_OK
+    assert [r["status"] for r in response.json()["results"]] == ["deleted", "deleted", "not_found"]
+    assert db.query(Task).filter(Task.user_id == test_user.id).count() == 0
+
+
+def test_batch_size_limit(client, token_headers, monkeypatch):
+    """Test para verificar que se rechazan los lotes demasiado grandes."""
+    monkeypatch.setattr(settings, "TASK_BATCH_MAX_SIZE", 2)
+    batch = {"items": [{"title": f"Task {i}"} for i in range(3)]}
+    
+    response = client.post("/api/tasks/batch", json=batch, headers=token_headers)
+    
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_update_task_not_found(client, token_headers):
+    """Test para verificar que no se puede actualizar una tarea que no existe."""
+    response = client.put(
+        f"/api/tasks/{uuid.uuid4()}", json={"title": "Updated Title"}, headers=token_headers
+    )
+    
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_update_task_unauthorized(client, db, token_headers):
+    """Test para verificar que no se puede actualizar una tarea de otro usuario."""
+    task = Task(title="Other User Task", user_id=uuid.uuid4())
+    db.add(task)
+    db.commit()
+    
+    response = client.put(
+        f"/api/tasks/{task.id}", json={"title": "Updated Title"}, headers=token_headers
+    )
+    
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert db.query(Task).filter(Task.id == task.id).first().title == "Other User Task"
+
+
+def test_delete_task_unauthorized(client, db, token_headers):
+    """Test para verificar que no se puede eliminar una tarea de otro usuario."""
+    task = Task(title="Other User Task", user_id=uuid.uuid4())
+    db.add(task)
+    db.commit()
+    
+    response = client.delete(f"/api/tasks/{task.id}", headers=token_headers)
+    
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    assert db.query(Task).filter(Task.id == task.id).first() is not None
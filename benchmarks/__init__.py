@@ -0,0 +1,9 @@
+"""Benchmarks de rendimiento de la API."""
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(PG_UUID, "sqlite")
+def _compile_uuid_sqlite(type_, compiler, **kw) -> str:
+    """Permite crear las tablas en SQLite: los UUID se guardan como texto."""
+    return "CHAR(32)"
@@ -0,0 +1,91 @@
+"""
+Mide el coste por petición de la dependencia de autenticación ``get_current_user``
+con el usuario ya en la caché de usuarios (sin base de datos).
+
+- ``uncached``: cada petición decodifica el token y comprueba su firma.
+- ``cached``: el token ya se verificó y se sirve de la caché de tokens.
+- ``reparse_key``: la clave se vuelve a interpretar en cada verificación, como
+  cuando se pasaba ``SECRET_KEY`` (o el PEM) a ``jwt.decode``.
+
+Se mide con HS256 y RS256 (clave RSA de 2048 bits).
+
+Uso::
+
+    python -m benchmarks.auth --iterations 2000
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict
+
+import rsa
+from jose import jwt
+
+from app.core import deps
+from app.core.deps import get_current_user, principal_cache
+from app.core.security import TokenVerifier
+from app.models.user import User
+
+
+def time_per_call(fn: Callable[[], Awaitable[Any]], iterations: int) -> float:
+    async def run() -> float:
+        await fn()  # calentamiento
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await fn()
+        return (time.perf_counter() - start) / iterations
+    
+    return asyncio.run(run())
+
+
+def measure(algorithm: str, verifier: TokenVerifier, raw_key: str, iterations: int) -> Dict[str, float]:
+    user_id = uuid.uuid4()
+    principal_cache.set(user_id, User(id=user_id, email="bench@example.com", username="bench"))
+    token = verifier.sign({"sub": str(user_id), "exp": int(time.time()) + 3600})
+    deps.token_verifier = verifier
+    
+    async def cached() -> Any:
+        return await get_current_user(db=None, token=token)
+    
+    async def uncached() -> Any:
+        verifier.cache.clear()
+        return await get_current_user(db=None, token=token)
+    
+    async def reparse_key() -> Any:
+        claims = jwt.decode(token, raw_key, algorithms=[algorithm])
+        return principal_cache.get(uuid.UUID(claims["sub"]))
+    
+    results = {
+        name: time_per_call(fn, iterations if name == "cached" else max(iterations // 10, 1))
+        for name, fn in (("cached", cached), ("uncached", uncached), ("reparse_key", reparse_key))
+    }
+    return {f"{name}_us_per_request": round(value * 1e6, 2) for name, value in results.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+    
+    secret = "benchmark-secret"
+    _, private_key = rsa.newkeys(2048)
+    private_pem = private_key.save_pkcs1().decode()
+    public_pem = rsa.PublicKey(private_key.n, private_key.e).save_pkcs1().decode()
+    
+    report = {
+        "iterations": args.iterations,
+        "HS256": measure("HS256", TokenVerifier("HS256", secret_key=secret), secret, args.iterations),
+        "RS256": measure(
+            "RS256",
+            TokenVerifier("RS256", private_key=private_pem, public_key=public_pem),
+            public_pem,
+            args.iterations,
+        ),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
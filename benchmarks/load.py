@@ -0,0 +1,528 @@
+"""
+Prueba de carga HTTP de la API.
+
+Siembra usuarios y tareas, arranca la API en un proceso aparte (ver
+``benchmarks.server``) y ejecuta cada endpoint con un cliente HTTP asíncrono
+concurrente. El resultado (rendimiento y latencias p50/p95/p99 por endpoint)
+se escribe en JSON. No necesita red: usa SQLite o un PostgreSQL local.
+
+Uso::
+
+    # Medición
+    python -m benchmarks.load --output bench.json
+    # Comparación con una medición anterior (sale con código 1 si hay regresión)
+    python -m benchmarks.load --compare bench.json --threshold 0.15
+
+Sale con código 1 si alguna petición no responde 2xx/3xx. Si ``METRICS_TOKEN`` o
+``INTERNAL_ENDPOINTS_TOKEN`` están configurados, el servidor los hereda y los
+escenarios envían el token correspondiente.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+from sqlalchemy import create_engine, insert
+
+from app.core.config import settings
+from app.core.security import get_password_hash
+from app.db.database import Base
+from app.db.task_stats import recompute_task_stats
+from app.models.task import Task
+from app.models import idempotency_key, task_tombstone  # Importar los modelos para que create_all cree sus tablas
+from app.models.user import User
+
+PASSWORD = "benchmark-password"
+
+
+@dataclass
+class Seed:
+    """Datos sembrados que usan los escenarios."""
+    
+    emails: List[str]
+    tasks: Dict[str, List[uuid.UUID]]
+    disposable: Dict[str, List[uuid.UUID]]
+    tokens: Dict[str, str] = field(default_factory=dict)
+    etags: Dict[str, str] = field(default_factory=dict)
+    sync_tokens: Dict[str, str] = field(default_factory=dict)
+
+
+def seed_database(
+    database_url: str, users: int, tasks_per_user: int, disposable_per_user: int
+) -> Seed:
+    """
+    Crea las tablas e inserta los usuarios y sus tareas. Las tareas
+    ``disposable`` se reservan para los escenarios que eliminan tareas.
+    """
+    engine = create_engine(database_url)
+    Base.metadata.create_all(bind=engine)
+    hashed_password = get_password_hash(PASSWORD)
+    run_id = uuid.uuid4().hex[:8]
+    base_time = datetime.utcnow() - timedelta(days=1)
+    seed = Seed(emails=[], tasks={}, disposable={})
+    with engine.begin() as conn:
+        for n in range(users):
+            user_id = uuid.uuid4()
+            email = f"bench-{run_id}-{n}@example.com"
+            conn.execute(
+                insert(User),
+                [
+                    {
+                        "id": user_id,
+                        "email": email,
+                        "username": f"bench-{run_id}-{n}",
+                        "hashed_password": hashed_password,
+                        "is_active": True,
+                    }
+                ],
+            )
+            rows = [
+                {
+                    "id": uuid.uuid4(),
+                    "title": f"Task {i}",
+                    "description": "Benchmark task",
+                    "is_completed": i % 3 == 0,
+                    "created_at": base_time + timedelta(seconds=i),
+                    "updated_at": base_time + timedelta(seconds=i),
+                    "user_id": user_id,
+                }
+                for i in range(tasks_per_user + disposable_per_user)
+            ]
+            if rows:
+                conn.execute(insert(Task), rows)
+            ids = [row["id"] for row in rows]
+            seed.emails.append(email)
+            seed.tasks[email] = ids[:tasks_per_user]
+            seed.disposable[email] = ids[tasks_per_user:]
+        # Las tareas sembradas no pasan por la API: se recalculan sus contadores
+        recompute_task_stats(conn)
+    engine.dispose()
+    return seed
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano sobre una lista ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+async def run_scenario(
+    request: Callable[[int], Awaitable[httpx.Response]], total: int, concurrency: int
+) -> Dict[str, Any]:
+    """Lanza ``total`` peticiones con ``concurrency`` workers y resume las latencias."""
+    latencies: List[float] = []
+    errors = 0
+    counter = itertools.count()
+    
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if i >= total:
+                return
+            start_time = time.perf_counter()
+            try:
+                response = await request(i)
+                failed = not 200 <= response.status_code < 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - start_time)
+            errors += failed
+    
+    start_time = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    elapsed = time.perf_counter() - start_time
+    
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "duration_s": round(elapsed, 4),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+Scenario = Callable[[httpx.AsyncClient, Seed, int], Awaitable[httpx.Response]]
+
+
+def _user(seed: Seed, i: int) -> str:
+    return seed.emails[i % len(seed.emails)]
+
+
+def _auth(seed: Seed, email: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {seed.tokens[email]}"}
+
+
+def _pop_disposable(seed: Seed, email: str, count: int = 1) -> List[str]:
+    ids = seed.disposable[email]
+    taken, seed.disposable[email] = ids[:count], ids[count:]
+    return [str(task_id) for task_id in taken]
+
+
+async def health(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    return await client.get("/")
+
+
+async def register(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    name = f"bench-register-{uuid.uuid4().hex}"
+    return await client.post(
+        "/api/auth/register",
+        json={"email": f"{name}@example.com", "username": name, "password": PASSWORD},
+    )
+
+
+async def login(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    return await client.post(
+        "/api/auth/login", data={"username": _user(seed, i), "password": PASSWORD}
+    )
+
+
+async def create_task(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.post(
+        "/api/tasks", json={"title": f"Load {i}"}, headers=_auth(seed, email)
+    )
+
+
+async def create_task_replayed(
+    client: httpx.AsyncClient, seed: Seed, i: int
+) -> httpx.Response:
+    # Misma clave y cuerpo por usuario: solo la primera petición crea la tarea
+    email = _user(seed, i)
+    headers = {**_auth(seed, email), "Idempotency-Key": "load-replay"}
+    return await client.post("/api/tasks", json={"title": "Load replay"}, headers=headers)
+
+
+async def list_tasks(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.get("/api/tasks", headers=_auth(seed, email))
+
+
+async def list_tasks_not_modified(
+    client: httpx.AsyncClient, seed: Seed, i: int
+) -> httpx.Response:
+    email = _user(seed, i)
+    headers = _auth(seed, email)
+    if email in seed.etags:
+        headers["If-None-Match"] = seed.etags[email]
+    response = await client.get("/api/tasks", headers=headers)
+    seed.etags[email] = response.headers.get("ETag", "")
+    return response
+
+
+async def list_tasks_filtered(
+    client: httpx.AsyncClient, seed: Seed, i: int
+) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.get(
+        "/api/tasks",
+        params={"is_completed": "false", "sort": "-updated_at", "limit": 50},
+        headers=_auth(seed, email),
+    )
+
+
+async def list_tasks_cursor(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.get(
+        "/api/tasks", params={"cursor": "", "limit": 50}, headers=_auth(seed, email)
+    )
+
+
+async def task_stats(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.get("/api/tasks/stats", headers=_auth(seed, email))
+
+
+async def task_changes(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    # Cliente que sondea el feed: la primera llamada sincroniza todo y las
+    # siguientes solo piden lo cambiado desde su token
+    email = _user(seed, i)
+    params = {"since": seed.sync_tokens[email]} if email in seed.sync_tokens else {}
+    response = await client.get("/api/tasks/changes", params=params, headers=_auth(seed, email))
+    if response.status_code == 200:
+        seed.sync_tokens[email] = response.json()["next_token"]
+    return response
+
+
+async def export_tasks(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.get(
+        "/api/tasks/export", params={"format": "ndjson"}, headers=_auth(seed, email)
+    )
+
+
+IMPORT_BODY = b"".join(
+    orjson.dumps({"title": f"Import {n}", "description": "Importada"}) + b"\n"
+    for n in range(1000)
+)
+
+
+async def import_tasks(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    return await client.post(
+        "/api/tasks/import",
+        params={"format": "ndjson"},
+        content=IMPORT_BODY,
+        headers=_auth(seed, email),
+    )
+
+
+async def read_task(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    task_id = random.choice(seed.tasks[email])
+    return await client.get(f"/api/tasks/{task_id}", headers=_auth(seed, email))
+
+
+async def update_task(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    task_id = random.choice(seed.tasks[email])
+    return await client.put(
+        f"/api/tasks/{task_id}",
+        json={"is_completed": bool(i % 2)},
+        headers=_auth(seed, email),
+    )
+
+
+async def delete_task(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    (task_id,) = _pop_disposable(seed, email)
+    return await client.delete(f"/api/tasks/{task_id}", headers=_auth(seed, email))
+
+
+async def create_batch(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    items = [{"title": f"Batch {i}-{n}"} for n in range(10)]
+    return await client.post(
+        "/api/tasks/batch", json={"items": items}, headers=_auth(seed, email)
+    )
+
+
+async def update_batch(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    ids = random.sample(seed.tasks[email], min(10, len(seed.tasks[email])))
+    items = [{"id": str(task_id), "is_completed": bool(i % 2)} for task_id in ids]
+    return await client.patch(
+        "/api/tasks/batch", json={"items": items}, headers=_auth(seed, email)
+    )
+
+
+async def delete_batch(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    email = _user(seed, i)
+    ids = _pop_disposable(seed, email, 10)
+    return await client.request(
+        "DELETE", "/api/tasks/batch", json={"ids": ids}, headers=_auth(seed, email)
+    )
+
+
+def _static_token(token: Optional[str]) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"} if token else {}
+
+
+async def metrics(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    return await client.get("/metrics", headers=_static_token(settings.METRICS_TOKEN))
+
+
+async def pool_status(client: httpx.AsyncClient, seed: Seed, i: int) -> httpx.Response:
+    return await client.get(
+        "/internal/pool", headers=_static_token(settings.INTERNAL_ENDPOINTS_TOKEN)
+    )
+
+
+# Escenarios por endpoint: (nombre, función, usa bcrypt, tareas desechables por petición)
+SCENARIOS: List[Tuple[str, Scenario, bool, int]] = [
+    ("GET /", health, False, 0),
+    ("POST /api/auth/register", register, True, 0),
+    ("POST /api/auth/login", login, True, 0),
+    ("POST /api/tasks", create_task, False, 0),
+    ("POST /api/tasks (Idempotency-Key repetida)", create_task_replayed, False, 0),
+    ("GET /api/tasks", list_tasks, False, 0),
+    ("GET /api/tasks (If-None-Match)", list_tasks_not_modified, False, 0),
+    ("GET /api/tasks?cursor", list_tasks_cursor, False, 0),
+    ("GET /api/tasks?is_completed&sort", list_tasks_filtered, False, 0),
+    ("GET /api/tasks/stats", task_stats, False, 0),
+    ("GET /api/tasks/changes?since", task_changes, False, 0),
+    ("GET /api/tasks/export", export_tasks, False, 0),
+    ("POST /api/tasks/import (1000 filas)", import_tasks, False, 0),
+    ("GET /api/tasks/{task_id}", read_task, False, 0),
+    ("PUT /api/tasks/{task_id}", update_task, False, 0),
+    ("DELETE /api/tasks/{task_id}", delete_task, False, 1),
+    ("POST /api/tasks/batch", create_batch, False, 0),
+    ("PATCH /api/tasks/batch", update_batch, False, 0),
+    ("DELETE /api/tasks/batch", delete_batch, False, 10),
+    ("GET /metrics", metrics, False, 0),
+    ("GET /internal/pool", pool_status, False, 0),
+]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_until_ready(client: httpx.AsyncClient, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("El servidor no respondió a tiempo")
+
+
+async def run_benchmark(args: argparse.Namespace, database_url: str) -> Dict[str, Any]:
+    disposable = sum(
+        per_request for _, _, _, per_request in SCENARIOS
+    ) * args.requests // args.users + 10
+    seed = seed_database(database_url, args.users, args.tasks_per_user, disposable)
+    
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.server",
+            "--database-url", database_url,
+            "--db-mode", args.db_mode,
+            "--port", str(port),
+        ],
+        stdout=None if args.verbose else subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    limits = httpx.Limits(max_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60
+        ) as client:
+            await _wait_until_ready(client)
+            for email in seed.emails:
+                response = await client.post(
+                    "/api/auth/login", data={"username": email, "password": PASSWORD}
+                )
+                response.raise_for_status()
+                seed.tokens[email] = response.json()["access_token"]
+            
+            endpoints = {}
+            for name, scenario, uses_bcrypt, _ in SCENARIOS:
+                if args.only and name not in args.only:
+                    continue
+                total = args.auth_requests if uses_bcrypt else args.requests
+                endpoints[name] = await run_scenario(
+                    lambda i, scenario=scenario: scenario(client, seed, i),
+                    total,
+                    args.concurrency,
+                )
+                print(f"{name}: {endpoints[name]}", file=sys.stderr)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    
+    return {
+        "meta": {
+            "database": database_url.split("://", 1)[0],
+            "db_mode": args.db_mode,
+            "users": args.users,
+            "tasks_per_user": args.tasks_per_user,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "auth_requests": args.auth_requests,
+        },
+        "endpoints": endpoints,
+    }
+
+
+def failures(result: Dict[str, Any]) -> List[str]:
+    """Devuelve los endpoints con alguna respuesta que no es 2xx/3xx."""
+    return [
+        f"{name}: {endpoint['errors']} de {endpoint['requests']} peticiones fallidas"
+        for name, endpoint in result["endpoints"].items()
+        if endpoint["errors"]
+    ]
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Devuelve las regresiones: p95 que sube o rendimiento que baja más de
+    ``threshold`` (fracción) respecto a la medición de referencia.
+    """
+    regressions = []
+    for name, now in current["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            continue
+        if now["errors"] > before["errors"]:
+            regressions.append(f"{name}: errores {before['errors']} -> {now['errors']}")
+        if before["p95_ms"] and now["p95_ms"] > before["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms")
+        if now["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: rendimiento {before['throughput_rps']} -> {now['throughput_rps']} req/s"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Prueba de carga HTTP de la API")
+    parser.add_argument(
+        "--database-url",
+        help="URL de la base de datos (por defecto, un fichero SQLite temporal)",
+    )
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="async")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--tasks-per-user", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500, help="Peticiones por endpoint")
+    parser.add_argument(
+        "--auth-requests", type=int, default=50, help="Peticiones para login y registro (bcrypt)"
+    )
+    parser.add_argument("--only", nargs="*", help="Limita la ejecución a estos endpoints")
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto, stdout)")
+    parser.add_argument("--compare", help="JSON de referencia con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--verbose", action="store_true", help="Muestra la salida del servidor")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+        result = asyncio.run(run_benchmark(args, database_url))
+    
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    failed = failures(result)
+    for failure in failed:
+        print(f"ERROR {failure}", file=sys.stderr)
+    regressions = []
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        for regression in regressions:
+            print(f"REGRESIÓN {regression}", file=sys.stderr)
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
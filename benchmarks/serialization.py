@@ -0,0 +1,103 @@
+"""
+Compara el coste de CPU por petición de serializar el listado de tareas.
+
+- ``orm``: carga objetos ``Task`` y los valida/serializa como ``List[TaskResponse]``,
+  igual que hacía FastAPI con ``response_model``.
+- ``rows``: selecciona filas planas y las serializa con orjson (ruta actual de
+  ``GET /api/tasks``).
+
+Uso::
+
+    python -m benchmarks.serialization --tasks 100 --iterations 500
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import Callable, List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.serialization import TASK_RESPONSE_COLUMNS, task_rows_response
+from app.db.database import Base
+from app.models.task import Task
+from app.models.user import User
+from app.schemas.task import TaskResponse
+
+task_list_adapter = TypeAdapter(List[TaskResponse])
+
+
+def seed(session: Session, tasks: int) -> uuid.UUID:
+    user = User(email="bench@example.com", username="bench", hashed_password="x")
+    session.add(user)
+    session.flush()
+    session.add_all(
+        Task(title=f"Task {i}", description="Description " * 5, user_id=user.id)
+        for i in range(tasks)
+    )
+    session.commit()
+    return user.id
+
+
+def orm_request(session: Session, user_id: uuid.UUID) -> bytes:
+    tasks = session.scalars(select(Task).where(Task.user_id == user_id)).all()
+    validated = task_list_adapter.validate_python(tasks, from_attributes=True)
+    content = task_list_adapter.dump_python(validated, mode="json")
+    body = json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+    session.expunge_all()
+    return body
+
+
+def rows_request(session: Session, user_id: uuid.UUID) -> bytes:
+    rows = session.execute(
+        select(*TASK_RESPONSE_COLUMNS).where(Task.user_id == user_id)
+    ).all()
+    return task_rows_response(rows).body
+
+
+def cpu_per_request(fn: Callable[[], bytes], iterations: int) -> float:
+    fn()  # calentamiento
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+    
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    user_id = seed(session, args.tasks)
+    
+    assert json.loads(orm_request(session, user_id)) == json.loads(
+        rows_request(session, user_id)
+    ), "Las dos rutas deben producir el mismo JSON"
+    
+    orm = cpu_per_request(lambda: orm_request(session, user_id), args.iterations)
+    rows = cpu_per_request(lambda: rows_request(session, user_id), args.iterations)
+    print(
+        json.dumps(
+            {
+                "tasks": args.tasks,
+                "iterations": args.iterations,
+                "orm_cpu_ms_per_request": round(orm * 1000, 3),
+                "rows_cpu_ms_per_request": round(rows * 1000, 3),
+                "speedup": round(orm / rows, 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Arranca la API con uvicorn contra la base de datos indicada.
+
+Lo usa ``benchmarks.load`` para levantar el servidor en un proceso aparte; la
+base de datos se inyecta sobrescribiendo ``get_db``, igual que en los tests, de
+modo que se puede usar SQLite o un PostgreSQL local.
+
+Uso::
+
+    python -m benchmarks.server --database-url sqlite:///./bench.db --port 8001
+"""
+import argparse
+import os
+
+# La prueba de carga incluye /metrics y /internal/pool, desactivados por defecto
+os.environ.setdefault("METRICS_ENABLED", "true")
+os.environ.setdefault("INTERNAL_ENDPOINTS_ENABLED", "true")
+
+import uvicorn
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.database import ThreadedSession, get_async_database_url, get_db
+from app.main import app
+
+
+def engine_options(database_url: str) -> dict:
+    if database_url.startswith("sqlite"):
+        return {"connect_args": {"check_same_thread": False, "timeout": 30}}
+    return {}
+
+
+def build_app(database_url: str, db_mode: str) -> FastAPI:
+    """Devuelve la aplicación con ``get_db`` apuntando a ``database_url``."""
+    if db_mode == "sync":
+        options = engine_options(database_url)
+        session_factory = sessionmaker(
+            bind=create_engine(database_url, **options),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        
+        async def override_get_db():
+            db = ThreadedSession(session_factory())
+            try:
+                yield db
+            finally:
+                await db.close()
+    else:
+        options = engine_options(database_url)
+        options.get("connect_args", {}).pop("check_same_thread", None)
+        async_session_factory = async_sessionmaker(
+            create_async_engine(get_async_database_url(database_url), **options),
+            autoflush=False,
+            expire_on_commit=False,
+        )
+        
+        async def override_get_db():
+            async with async_session_factory() as db:
+                yield db
+    
+    app.dependency_overrides[get_db] = override_get_db
+    # Los escenarios repiten login y escrituras con los mismos usuarios a
+    # propósito; los límites de peticiones falsearían las latencias
+    settings.RATE_LIMIT_ENABLED = False
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Servidor de la API para benchmarks")
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="async")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    
+    uvicorn.run(
+        build_app(args.database_url, args.db_mode),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Mide el arranque de un worker de la API, cada métrica como mediana de varias
+ejecuciones en procesos nuevos:
+
+- ``import_ms``: importar ``app.main``.
+- ``first_response_ms``: desde lanzar ``uvicorn app.main:app`` hasta la primera
+  respuesta de ``GET /`` (importación, lifespan y arranque del servidor).
+- ``first_openapi_ms``: primera petición a ``/openapi.json``, generando el esquema.
+- ``first_openapi_precomputed_ms``: la misma petición con el esquema serializado
+  en ``OPENAPI_SCHEMA_PATH``.
+
+Con ``--compare`` falla (código de salida 1) si alguna métrica empeora más de
+``--threshold`` respecto a la referencia.
+
+Uso::
+
+    python -m benchmarks.startup --runs 5 --output startup.json
+    python -m benchmarks.startup --compare startup.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_import() -> float:
+    """Segundos que tarda un proceso nuevo en importar ``app.main``."""
+    output = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", IMPORT_SNIPPET],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def measure_server(schema_path: Optional[str], timeout: float = 60.0) -> Dict[str, float]:
+    """
+    Lanza uvicorn y devuelve los segundos hasta la primera respuesta y los de la
+    primera petición a ``/openapi.json``.
+    """
+    port = _free_port()
+    env = dict(os.environ)
+    env.pop("OPENAPI_SCHEMA_PATH", None)
+    if schema_path:
+        env["OPENAPI_SCHEMA_PATH"] = schema_path
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            while True:
+                try:
+                    if client.get("/").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.perf_counter() - start > timeout:
+                    raise RuntimeError("El servidor no respondió a tiempo")
+                time.sleep(0.005)
+            first_response = time.perf_counter() - start
+            
+            openapi_start = time.perf_counter()
+            client.get("/openapi.json").raise_for_status()
+            first_openapi = time.perf_counter() - openapi_start
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"first_response": first_response, "first_openapi": first_openapi}
+
+
+def run_benchmark(runs: int) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {
+        "import_ms": [],
+        "first_response_ms": [],
+        "first_openapi_ms": [],
+        "first_openapi_precomputed_ms": [],
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        schema_path = os.path.join(tmpdir, "openapi.json")
+        subprocess.run(
+            [sys.executable, "-W", "ignore", "-m", "app.core.openapi", "--output", schema_path],
+            check=True,
+            capture_output=True,
+        )
+        for _ in range(runs):
+            samples["import_ms"].append(measure_import())
+            generated = measure_server(None)
+            samples["first_response_ms"].append(generated["first_response"])
+            samples["first_openapi_ms"].append(generated["first_openapi"])
+            precomputed = measure_server(schema_path)
+            samples["first_openapi_precomputed_ms"].append(precomputed["first_openapi"])
+    
+    return {
+        "meta": {"runs": runs, "python": sys.version.split()[0]},
+        "startup": {
+            name: round(statistics.median(values) * 1000, 2) for name, values in samples.items()
+        },
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Devuelve las métricas de arranque que suben más de ``threshold`` (fracción)."""
+    regressions = []
+    for name, now in current["startup"].items():
+        before = baseline.get("startup", {}).get(name)
+        if before and now > before * (1 + threshold):
+            regressions.append(f"{name}: {before}ms -> {now}ms")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tiempo de arranque de un worker de la API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto, stdout)")
+    parser.add_argument("--compare", help="JSON de referencia con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.20)
+    args = parser.parse_args()
+    
+    result = run_benchmark(args.runs)
+    
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.threshold)
+        for regression in regressions:
+            print(f"REGRESIÓN {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()